@@ -0,0 +1,178 @@
+"""
+Offline benchmark suite of the screening pipeline on synthetic price panels.
+Every stage is timed (best of several runs) and its peak memory is measured
+with tracemalloc. Results are appended to benchmarks/results/history.jsonl
+with the current commit and compared with the last run of another commit.
+Run from the main directory: python -m benchmarks.bench_pipeline --tickers 100 500 --years 1 5
+"""
+import argparse
+import json
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+import pandas as pd
+from pandas import DataFrame
+from robot.classes import DataFilter, MetricsCalculator, Screener
+from benchmarks.synthetic import SyntheticPriceSource, make_price_panel
+
+RESULTS_PATH: Path = Path(__file__).parent / "results" / "history.jsonl"
+DAYS_IN_YEAR: int = 252
+MA_WINDOW: int = 21
+MIN_DAYS: int = 5
+
+
+def current_commit() -> str:
+    """
+    Function returns the short hash of the checked out commit.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(function: Callable[[], Any], repeats: int) -> tuple[float, float]:
+    """
+    Function returns the best wall time in seconds and the peak traced memory in MB.
+    Timing runs are not traced, so tracing does not slow them down.
+    """
+    timings: list[float] = []
+    for _ in range(repeats):
+        started = perf_counter()
+        function()
+        timings.append(perf_counter() - started)
+    
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return min(timings), peak_bytes / 2 ** 20
+
+
+def pipeline_cases(price_data: DataFrame) -> dict[str, Callable[[], Any]]:
+    """
+    Function returns benchmarked stages prepared on a price panel.
+    Every stage gets the output of the previous ones, computed beforehand.
+    """
+    metrics = MetricsCalculator()
+    rs_data: DataFrame = metrics.rs_on_data(stocks_data=price_data, market_ticker="^SPX")
+    metrics_data: DataFrame = metrics.rs_ma_on_data(stocks_data=rs_data, ma_window=MA_WINDOW)
+    period_start = price_data.index[min(MA_WINDOW, len(price_data) - 1)]
+    period_end = price_data.index[-1] + pd.Timedelta(days=1)
+    
+    def scan() -> None:
+        screener = Screener(
+            price_source=SyntheticPriceSource(price_data=price_data),
+            get_tickers=lambda index_name, as_of: list(price_data["Close"].columns[:-1]),
+            market_tickers={"SYNTHETIC": "^SPX"}
+        )
+        screener.run_scan(
+            index_name="SYNTHETIC",
+            start=period_start,
+            end=period_end,
+            ma_window=MA_WINDOW,
+            min_days=MIN_DAYS
+        )
+    
+    return {
+        "rs_on_data": lambda: metrics.rs_on_data(stocks_data=price_data, market_ticker="^SPX"),
+        "rs_ma_on_data": lambda: metrics.rs_ma_on_data(stocks_data=rs_data, ma_window=MA_WINDOW),
+        "has_rs_grown": lambda: DataFilter.has_rs_grown(stocks_data=metrics_data),
+        "has_rs_crossed_ma": lambda: DataFilter.has_rs_crossed_ma(
+            stocks_data=metrics_data,
+            days_rs_holds_above_ma=MIN_DAYS
+        ),
+        "scan": scan
+    }
+
+
+def read_history() -> list[dict[str, Any]]:
+    if not RESULTS_PATH.exists():
+        return []
+    
+    return [json.loads(line) for line in RESULTS_PATH.read_text().splitlines() if line]
+
+
+def previous_result(
+    history: list[dict[str, Any]],
+    record: dict[str, Any]
+) -> dict[str, Any] | None:
+    """
+    Function returns the last result of the same case measured on another commit.
+    """
+    for old_record in reversed(history):
+        if old_record["commit"] != record["commit"] and all(
+            old_record[key] == record[key] for key in ("case", "tickers", "years")
+        ):
+            return old_record
+    
+    return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks the screening pipeline offline.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 500, 5000])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--nan-share", type=float, default=0.01)
+    parser.add_argument("--delisted-share", type=float, default=0.05)
+    parser.add_argument("--no-save", action="store_true", help="Do not store results.")
+    args = parser.parse_args(argv)
+    
+    history: list[dict[str, Any]] = read_history()
+    commit: str = current_commit()
+    run_at: str = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    
+    records: list[dict[str, Any]] = []
+    for tickers_count in args.tickers:
+        for years in args.years:
+            price_data: DataFrame = make_price_panel(
+                tickers_count=tickers_count,
+                days_count=years * DAYS_IN_YEAR,
+                nan_share=args.nan_share,
+                delisted_share=args.delisted_share
+            )
+            for case, function in pipeline_cases(price_data=price_data).items():
+                seconds, peak_mb = measure(function=function, repeats=args.repeats)
+                record: dict[str, Any] = {
+                    "commit": commit,
+                    "run_at": run_at,
+                    "case": case,
+                    "tickers": tickers_count,
+                    "years": years,
+                    "seconds": round(seconds, 6),
+                    "peak_mb": round(peak_mb, 2)
+                }
+                records.append(record)
+                
+                old_record = previous_result(history=history, record=record)
+                comparison: str = (
+                    f" (x{seconds / old_record['seconds']:.2f} time, "
+                    f"x{peak_mb / max(old_record['peak_mb'], 0.01):.2f} memory "
+                    f"vs {old_record['commit']})"
+                ) if old_record and old_record["seconds"] else ""
+                print(
+                    f"{case:<18} {tickers_count:>5} tickers {years:>2}y: "
+                    f"{seconds:.4f}s {peak_mb:.1f}MB{comparison}"
+                )
+    
+    if not args.no_save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with RESULTS_PATH.open("a") as results_file:
+            for record in records:
+                results_file.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Regression benchmark for MetricsCalculator.rs_on_data.
+Compares the former per-ticker loop with the broadcast implementation.
+Run from the main directory: python -m benchmarks.bench_rs
+"""
+import pandas as pd
+from pandas import DataFrame
+from time import perf_counter
+from robot.classes import MetricsCalculator
+from benchmarks.synthetic import make_price_panel
+
+
+def legacy_rs_on_data(
+    stocks_data: DataFrame,
+    market_ticker: str
+) -> DataFrame:
+    """
+    Function reproduces the former per-ticker rs_on_data loop.
+    """
+    results: dict[tuple[str, str], float] = {}
+    tickers = stocks_data.columns.get_level_values(1).unique()
+    for ticker in tickers:
+        results[("rs", ticker)] = MetricsCalculator.rs(
+            stock_price=stocks_data[("Close", ticker)],
+            market_price=stocks_data[("Close", market_ticker)]
+        )
+    results_df: DataFrame = pd.DataFrame(results)
+    
+    return pd.concat([stocks_data, results_df], axis=1)
+
+
+def time_call(function, repeats: int = 3) -> float:
+    """
+    Function returns the best wall time of several calls.
+    """
+    timings: list[float] = []
+    for _ in range(repeats):
+        started = perf_counter()
+        function()
+        timings.append(perf_counter() - started)
+    
+    return min(timings)
+
+
+def main() -> None:
+    metrics = MetricsCalculator()
+    for tickers_count in (500, 5000):
+        panel = make_price_panel(tickers_count=tickers_count, days_count=252)
+        legacy_time = time_call(
+            lambda: legacy_rs_on_data(panel, "^SPX")
+        )
+        vectorized_time = time_call(
+            lambda: metrics.rs_on_data(panel, "^SPX")
+        )
+        print(
+            f"{tickers_count} tickers: loop {legacy_time:.3f}s, "
+            f"broadcast {vectorized_time:.3f}s, "
+            f"speedup x{legacy_time / vectorized_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
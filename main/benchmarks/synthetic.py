@@ -0,0 +1,79 @@
+"""
+Synthetic price data for offline benchmarks.
+"""
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from datetime import datetime
+from robot.classes import PriceSource
+
+
+def make_price_panel(
+    tickers_count: int,
+    days_count: int,
+    market_ticker: str = "^SPX",
+    nan_share: float = 0.0,
+    delisted_share: float = 0.0,
+    fields: list[str] | None = None,
+    seed: int = 0
+) -> DataFrame:
+    """
+    Function builds a random yfinance-like price panel of business days.
+    nan_share of prices are missing at random, delisted_share of tickers
+    stop trading at a random day and have no prices after it.
+    """
+    rng = np.random.default_rng(seed)
+    fields = fields or ["Close"]
+    tickers: list[str] = [f"T{n:05d}" for n in range(tickers_count)]
+    tickers.append(market_ticker)
+    
+    returns = rng.normal(0.0003, 0.02, size=(days_count, len(tickers)))
+    close_prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    
+    # The market is never missing, stocks are.
+    is_missing = rng.random(close_prices.shape) < nan_share
+    delisted_columns = np.flatnonzero(rng.random(tickers_count) < delisted_share)
+    for column in delisted_columns:
+        is_missing[rng.integers(1, max(days_count, 2)):, column] = True
+    is_missing[:, -1] = False
+    close_prices[is_missing] = np.nan
+    
+    field_prices: dict[str, np.ndarray] = {
+        "Close": close_prices,
+        "Open": close_prices * (1 + rng.normal(0, 0.005, close_prices.shape)),
+        "High": close_prices * 1.01,
+        "Low": close_prices * 0.99,
+        "Volume": rng.integers(10 ** 5, 10 ** 7, close_prices.shape).astype(float)
+    }
+    columns = pd.MultiIndex.from_product([fields, tickers], names=["Price", "Ticker"])
+    dates = pd.bdate_range("2005-01-03", periods=days_count, name="Date")
+    
+    return DataFrame(
+        np.concatenate([field_prices[field] for field in fields], axis=1),
+        index=dates,
+        columns=columns
+    )
+
+
+class SyntheticPriceSource(PriceSource):
+    """
+    Class serves a synthetic price panel as a price source.
+    """
+    
+    def __init__(self, price_data: DataFrame):
+        self.price_data = price_data
+    
+    def get_price_data(
+        self,
+        tickers: str | list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> DataFrame:
+        price_data: DataFrame = self.price_data[
+            (self.price_data.index >= pd.Timestamp(period[0]))
+            & (self.price_data.index < pd.Timestamp(period[1]))
+        ]
+        if fields is not None:
+            price_data = price_data[fields]
+        
+        return price_data
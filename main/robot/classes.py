@@ -1,163 +1,3715 @@
-import yfinance as yf
 import pandas as pd
-from pandas import DataFrame
-from datetime import datetime
+import numpy as np
+from pandas import DataFrame, Series, Timestamp
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
+from abc import ABC, abstractmethod
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlsplit
+from io import StringIO
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+import cProfile
+import hashlib
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import uuid
 
+# Pyarrow is imported by methods of the result store only.
+if TYPE_CHECKING:
+    import pyarrow as pa
 
-class Yfinance:
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSource(ABC):
     """
-    Class implements yahoo finance manipulation.
+    Class is an interface of a price data source.
+    Sources return a yfinance-like frame: fields on the first column level,
+    tickers on the second one and dates as the index.
+    Sources reporting failures list tickers of the last request which failed
+    to download in failed_tickers, None means failures are not reported.
     """
     
+    failed_tickers: list[str] | None = None
+    
+    @abstractmethod
+    def get_price_data(
+        self,
+        tickers: str | list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> DataFrame:
+        """
+        Method returns price data for a period [start, end).
+        Only given fields (first level columns, e.g. "Close") are returned if set.
+        """
+    
     @staticmethod
+    def empty_price_data() -> DataFrame:
+        """
+        Method returns price data without dates and tickers, which keeps
+        the (Price, Ticker) columns levels of non-empty price data.
+        """
+        return DataFrame(
+            index=pd.DatetimeIndex([], name="Date"),
+            columns=pd.MultiIndex.from_tuples([], names=["Price", "Ticker"])
+        )
+
+
+class Yfinance(PriceSource):
+    """
+    Class implements yahoo finance manipulation.
+    """
+    
     def get_price_data(
+        self,
         tickers: str | list[str],
-        period: tuple[datetime]
+        period: tuple[datetime],
+        fields: list[str] | None = None
     ) -> DataFrame:
         """
         Method downloads price data from yahoo finance.
+        Yfinance is slow to import, so it is imported on the first download.
         """
+        import yfinance as yf
+        
         price_data: DataFrame = yf.download(
             tickers=tickers,
             start=period[0],
             end=period[1]
         )
+        # Yahoo always returns all fields, unneeded ones are dropped at once.
+        if fields is not None and not price_data.empty:
+            price_data = price_data[fields]
         return price_data
 
 
-class MetricsCalculator:
+class PriceStore:
     """
-    Class calculates metrics for stocks data that involved in analysis.
+    Class keeps price data on disk, one Parquet file per ticker indexed by date.
+    Date spans already fetched for a ticker are kept in a coverage file,
+    so spans without trading days are not fetched again.
     """
     
+    COVERAGE_FILE: str = "coverage.json"
+    
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.coverage: dict[str, list[list[str]]] = self._read_coverage()
+    
+    def _read_coverage(self) -> dict[str, list[list[str]]]:
+        coverage_path: Path = self.directory / self.COVERAGE_FILE
+        if not coverage_path.exists():
+            return {}
+        
+        return json.loads(coverage_path.read_text())
+    
+    def _write_coverage(self) -> None:
+        coverage_path: Path = self.directory / self.COVERAGE_FILE
+        temp_path: Path = coverage_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(self.coverage, indent=1))
+        temp_path.replace(coverage_path)
+    
+    def ticker_path(self, ticker: str) -> Path:
+        """
+        Method returns a file path of a ticker, e.g. ^SPX -> %5ESPX.parquet.
+        """
+        return self.directory / f"{quote(ticker, safe='.-')}.parquet"
+    
     @staticmethod
-    def rs(
-        stock_price: float,
-        market_price: float
-    ) -> float:
+    def merge_spans(spans: list[tuple[Timestamp, Timestamp]]) -> list[tuple[Timestamp, Timestamp]]:
         """
-        Method calculates a relative strength.
+        Method merges overlapping and adjacent [start, end) spans.
         """
-        rs: float = round(
-            number=(stock_price / market_price),
-            ndigits=2
-        )
-        return rs
+        merged: list[tuple[Timestamp, Timestamp]] = []
+        for span_start, span_end in sorted(spans):
+            if merged and span_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], span_end))
+            else:
+                merged.append((span_start, span_end))
+        
+        return merged
     
-    def rs_on_data(
+    def covered_spans(self, ticker: str) -> list[tuple[Timestamp, Timestamp]]:
+        """
+        Method returns date spans stored for a ticker.
+        """
+        return [
+            (pd.Timestamp(span_start), pd.Timestamp(span_end))
+            for span_start, span_end in self.coverage.get(ticker, [])
+        ]
+    
+    def missing_spans(
+        self,
+        ticker: str,
+        period: tuple[datetime]
+    ) -> list[tuple[Timestamp, Timestamp]]:
+        """
+        Method returns [start, end) spans of a period that are not stored for a ticker.
+        """
+        period_start, period_end = pd.Timestamp(period[0]), pd.Timestamp(period[1])
+        
+        gaps: list[tuple[Timestamp, Timestamp]] = []
+        gap_start: Timestamp = period_start
+        for span_start, span_end in self.covered_spans(ticker=ticker):
+            if span_end <= gap_start or span_start >= period_end:
+                continue
+            if span_start > gap_start:
+                gaps.append((gap_start, span_start))
+            gap_start = max(gap_start, span_end)
+        if gap_start < period_end:
+            gaps.append((gap_start, period_end))
+        
+        return gaps
+    
+    def read(
         self,
-        stocks_data: DataFrame,
-        market_ticker: str
+        ticker: str,
+        period: tuple[datetime] | None = None,
+        fields: list[str] | None = None
     ) -> DataFrame:
         """
-        Method calculates a relative strength for a dataframe with stock prices.
+        Method reads stored price data of a ticker, optionally for a period [start, end).
+        Only given fields are read from the file if set.
         """
-        results: dict[tuple[str, str], float] = {}
+        ticker_path: Path = self.ticker_path(ticker=ticker)
+        if not ticker_path.exists():
+            return DataFrame()
         
-        # Tickers are first lvl cols.
-        tickers = stocks_data.columns.get_level_values(1).unique()
-        for ticker in tickers:
-            results[("rs", ticker)] = self.rs(
-                stock_price=stocks_data[("Close", ticker)],
-                market_price=stocks_data[("Close", market_ticker)]
-            )
+        ticker_data: DataFrame = pd.read_parquet(ticker_path, columns=fields)
+        if period is not None:
+            ticker_data = ticker_data[
+                (ticker_data.index >= pd.Timestamp(period[0]))
+                & (ticker_data.index < pd.Timestamp(period[1]))
+            ]
+        
+        return ticker_data
+    
+    def write(
+        self,
+        ticker: str,
+        ticker_data: DataFrame,
+        period: tuple[datetime]
+    ) -> None:
+        """
+        Method stores price data of a ticker and marks the period as covered.
+        Newly fetched rows replace stored rows with the same date.
+        """
+        stored_data: DataFrame = self.read(ticker=ticker)
+        if not ticker_data.empty:
+            ticker_data = pd.concat([stored_data, ticker_data]) if not stored_data.empty \
+                else ticker_data
+            ticker_data = ticker_data[~ticker_data.index.duplicated(keep="last")] \
+                .sort_index()
+            ticker_data.to_parquet(self.ticker_path(ticker=ticker))
         
-        results_df: DataFrame = pd.DataFrame(results)
-        stocks_data = pd.concat([stocks_data, results_df], axis=1)
+        period_start, period_end = pd.Timestamp(period[0]), pd.Timestamp(period[1])
+        if period_end <= period_start:
+            return
         
-        return stocks_data
+        spans = self.covered_spans(ticker=ticker)
+        spans.append((period_start, period_end))
+        self.coverage[ticker] = [
+            [str(span_start.date()), str(span_end.date())]
+            for span_start, span_end in self.merge_spans(spans=spans)
+        ]
+        self._write_coverage()
+
+
+class LocalPriceSource(PriceSource):
+    """
+    Class serves price data from a price store only, without network access.
+    It stands in for yahoo finance in tests and offline runs.
+    """
     
-    @staticmethod
-    def rs_ma_on_data(
-        stocks_data: DataFrame,
-        ma_window: int
+    def __init__(self, store: PriceStore):
+        self.store = store
+    
+    def get_price_data(
+        self,
+        tickers: str | list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
     ) -> DataFrame:
         """
-        Method calculates a moving average of a relative strength.
-        Moving average can be calculated for period not surpassing 21 days (one month).
-        NB! Dataframe must contain a "rs" column
+        Method reads price data of tickers from the store.
         """
-        results: dict[tuple[str, str], float] = {}
-        
-        # Tickers are second lvl cols.
-        tickers = stocks_data.columns.get_level_values(1).unique()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        tickers_data: dict[str, DataFrame] = {}
         for ticker in tickers:
-            results[("rs_ma", ticker)] = stocks_data[("rs", ticker)].rolling(window=ma_window).mean()
+            ticker_data: DataFrame = self.store.read(
+                ticker=ticker,
+                period=period,
+                fields=fields
+            )
+            if not ticker_data.empty:
+                tickers_data[ticker] = ticker_data
         
-        results_df: DataFrame = pd.DataFrame(results)
-        stocks_data = pd.concat([stocks_data, results_df], axis=1)
+        return self.to_price_frame(tickers_data=tickers_data)
+    
+    @staticmethod
+    def to_price_frame(tickers_data: dict[str, DataFrame]) -> DataFrame:
+        """
+        Method joins per ticker frames to a (field, ticker) frame like yfinance returns.
+        """
+        if not tickers_data:
+            return PriceSource.empty_price_data()
         
-        return stocks_data
+        price_data: DataFrame = pd.concat(
+            tickers_data,
+            axis=1,
+            names=["Ticker", "Price"]
+        )
+        price_data = price_data \
+            .swaplevel(axis=1) \
+            .sort_index(axis=1, level=0, sort_remaining=False)
+        price_data.index.name = "Date"
         
+        return price_data
 
 
-class DataFilter:
+class CachedPriceSource(PriceSource):
     """
-    Class contains filters for stocks price data. 
+    Class reads price data from a price store and fetches only date spans
+    missing in the store from another source.
     """
-
-    @staticmethod
-    def has_rs_grown(stocks_data: DataFrame) -> DataFrame:
+    
+    def __init__(
+        self,
+        store: PriceStore,
+        source: PriceSource
+    ):
+        self.store = store
+        self.source = source
+    
+    def fetch_missing(
+        self,
+        tickers: list[str],
+        period: tuple[datetime]
+    ) -> None:
         """
-        Methods checks whether a relative strength coefficient has grown and
-        filters stocks.
-        NB! Tickers must be top level columns.
-        Data must contain the "rs" column.
+        Method fetches missing spans of tickers and stores them.
+        Tickers missing the same span are fetched with one request.
+        The current day is never marked as covered, because its bar is not final.
+        A span is marked as covered for tickers with prices. For tickers without prices
+        it is marked only when the source reports they have not failed, e.g. in a span
+        without sessions, since a failed download returns no prices as well.
         """
-        tickers = stocks_data.columns.get_level_values(1).unique()
+        today: Timestamp = pd.Timestamp.today().normalize()
+        
+        tickers_by_span: dict[tuple[Timestamp, Timestamp], list[str]] = {}
         for ticker in tickers:
-            rs_period_start: float = stocks_data.iloc[0][("rs", ticker)]
-            rs_period_end: float = stocks_data.iloc[len(stocks_data) - 1][("rs", ticker)]
-
-            stocks_data = stocks_data.drop(
-                columns=[ticker],
-                level=1
-            ) if not rs_period_end > rs_period_start else stocks_data
+            for span in self.store.missing_spans(ticker=ticker, period=period):
+                tickers_by_span.setdefault(span, []).append(ticker)
+        
+        for (span_start, span_end), span_tickers in tickers_by_span.items():
+            try:
+                span_data: DataFrame = self.source.get_price_data(
+                    tickers=span_tickers,
+                    period=(span_start, span_end)
+                )
+            except Exception as e:
+                logger.warning(f"Span {span_start.date()} - {span_end.date()} is not fetched: {e}")
+                continue
+            covered_end: Timestamp = max(span_start, min(span_end, today))
+            failed_tickers: list[str] | None = self.source.failed_tickers
+            
+            for ticker in span_tickers:
+                ticker_data: DataFrame = span_data.xs(ticker, axis=1, level=1) \
+                    .dropna(how="all") \
+                    if ticker in span_data.columns.get_level_values(1) else DataFrame()
+                if ticker_data.empty and (failed_tickers is None or ticker in failed_tickers):
+                    continue
+                self.store.write(
+                    ticker=ticker,
+                    ticker_data=ticker_data,
+                    period=(span_start, covered_end)
+                )
+    
+    def get_price_data(
+        self,
+        tickers: str | list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> DataFrame:
+        """
+        Method returns price data of tickers, fetching only spans missing in the store.
+        All fields are stored, only given fields are read back.
+        """
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self.fetch_missing(tickers=tickers, period=period)
         
-        return stocks_data
+        return LocalPriceSource(store=self.store).get_price_data(
+            tickers=tickers,
+            period=period,
+            fields=fields
+        )
+
 
+class DownloadScheduler(PriceSource):
+    """
+    Class downloads price data of a large universe in batches on a bounded thread pool.
+    Requests are rate limited, tickers without data are retried with exponential
+    backoff and finished batches are checkpointed, so an interrupted download
+    resumes from unfinished batches. A period without exchange sessions
+    has no bars, so its empty answer is final and not retried.
+    """
+    
+    def __init__(
+        self,
+        source: PriceSource,
+        batch_size: int = 50,
+        max_workers: int = 4,
+        requests_per_second: float | None = 2.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        checkpoint_dir: str | Path | None = None,
+        calendar: "TradingCalendar | None" = None
+    ):
+        self.source = source
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir is not None else None
+        self.calendar = calendar or TradingCalendar()
+        if self.checkpoint_dir is not None:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.failed_tickers: list[str] = []
+        self._lock = threading.Lock()
+        self._next_request_time: float = 0.0
+    
     @staticmethod
-    def has_rs_crossed_ma(
-        stocks_data: DataFrame,
-        days_rs_holds_above_ma: int
-    ) -> DataFrame:
+    def yahoo_ticker(ticker: str) -> str:
         """
-        Method checks if a relative strenght has crossed a moving average while growing and filters data.
-        The parameter days_rs_holds_above_ma means days, that stock has held its relative strength above ma.
-        NB! Data must contain the columns "rs" and "ma".
+        Method converts a Wikipedia symbol to a yahoo finance one, e.g. BRK.B -> BRK-B.
+        """
+        return ticker.strip().replace(".", "-")
+    
+    @staticmethod
+    def downloaded_tickers(price_data: DataFrame) -> list[str]:
         """
-        # The main idea of the algorithm is it starts from the end checking if rs is higher than ma.
-        # If a rs has been held above ma a defined amount of days a stock remains to a dataframe.
+        Method returns tickers that have at least one price in the data.
+        """
+        if price_data.empty:
+            return []
+        
+        has_prices: Series = price_data.notna().any().groupby(level=1).any()
+        
+        return list(has_prices.index[has_prices])
+    
+    def _wait_for_rate_limit(self) -> None:
+        if not self.requests_per_second:
+            return
+        
+        with self._lock:
+            now: float = time.monotonic()
+            wait_seconds: float = self._next_request_time - now
+            self._next_request_time = max(now, self._next_request_time) \
+                + 1 / self.requests_per_second
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+    
+    def _checkpoint_path(
+        self,
+        batch: list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> Path | None:
+        if self.checkpoint_dir is None:
+            return None
+        
+        batch_key: str = "|".join(
+            batch
+            + [str(pd.Timestamp(period[0]).date()), str(pd.Timestamp(period[1]).date())]
+            + (fields or [])
+        )
         
-        stocks_tickers: list[str] = list(stocks_data.columns.get_level_values(1).unique())
+        return self.checkpoint_dir / f"{hashlib.sha1(batch_key.encode()).hexdigest()}.parquet"
+    
+    def download_batch(
+        self,
+        batch: list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> DataFrame:
+        """
+        Method downloads a batch of yahoo tickers, retrying tickers without data.
+        A batch finished with data is checkpointed and read from its checkpoint
+        instead of being downloaded again, a batch with failed tickers is not.
+        """
+        checkpoint_path: Path | None = self._checkpoint_path(
+            batch=batch,
+            period=period,
+            fields=fields
+        )
+        if checkpoint_path is not None and checkpoint_path.exists():
+            return pd.read_parquet(checkpoint_path)
         
-        for ticker in stocks_tickers:
-            row_nr: int = len(stocks_data) - 1
-            count_days: int = 0
+        pending_tickers: list[str] = list(batch)
+        batch_frames: list[DataFrame] = []
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+            self._wait_for_rate_limit()
             
-            postive_result: bool = False
-            while row_nr != -1:
-                rs: float = stocks_data.iloc[row_nr][("rs", ticker)]
-                ma: float = stocks_data.iloc[row_nr][("rs_ma", ticker)]
-                
-                if rs < ma or pd.isna(ma):
-                    break
-                elif rs > ma:
-                    count_days += 1
-
-                row_nr -= 1
+            try:
+                price_data: DataFrame = self.source.get_price_data(
+                    tickers=pending_tickers,
+                    period=period,
+                    fields=fields
+                )
+            except Exception as e:
+                logger.warning(f"Download of {len(pending_tickers)} tickers failed: {e}")
+                continue
             
-            if count_days >= days_rs_holds_above_ma:
-                postive_result = True
+            # No bars in a period without sessions is a finished download,
+            # no bars in a period with sessions is a failed one.
+            if price_data.index.empty and self.calendar.sessions_in(*period).empty:
+                pending_tickers = []
+                break
+            downloaded: list[str] = self.downloaded_tickers(price_data=price_data)
+            if downloaded:
+                batch_frames.append(
+                    price_data.loc[:, price_data.columns.get_level_values(1).isin(downloaded)]
+                )
+            pending_tickers = [
+                ticker for ticker in pending_tickers if ticker not in downloaded
+            ]
+            if not pending_tickers:
+                break
+        
+        if pending_tickers:
+            logger.warning(f"No price data for {pending_tickers}.")
+            with self._lock:
+                self.failed_tickers.extend(pending_tickers)
+        
+        batch_data: DataFrame = pd.concat(batch_frames, axis=1) if batch_frames \
+            else self.empty_price_data()
+        # A resumed download must retry pending tickers, so their batch is not checkpointed.
+        if checkpoint_path is not None and not pending_tickers and batch_frames:
+            batch_data.to_parquet(checkpoint_path)
+        
+        return batch_data
+    
+    def get_price_data(
+        self,
+        tickers: str | list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None
+    ) -> DataFrame:
+        """
+        Method downloads price data of tickers batch by batch.
+        Columns keep the requested symbols, tickers without data are left out
+        and listed in failed_tickers.
+        """
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        requested_tickers: dict[str, str] = {}
+        for ticker in tickers:
+            requested_tickers.setdefault(self.yahoo_ticker(ticker), ticker)
+        
+        yahoo_tickers: list[str] = list(requested_tickers.keys())
+        batches: list[list[str]] = [
+            yahoo_tickers[n:n + self.batch_size]
+            for n in range(0, len(yahoo_tickers), self.batch_size)
+        ]
+        
+        self.failed_tickers = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            batch_frames: list[DataFrame] = list(executor.map(
+                lambda batch: self.download_batch(batch=batch, period=period, fields=fields),
+                batches
+            ))
+        self.failed_tickers = [requested_tickers[ticker] for ticker in self.failed_tickers]
+        
+        # The whole download has finished, checkpoints are not needed anymore.
+        for batch in batches:
+            checkpoint_path: Path | None = self._checkpoint_path(
+                batch=batch,
+                period=period,
+                fields=fields
+            )
+            if checkpoint_path is not None:
+                checkpoint_path.unlink(missing_ok=True)
+        
+        batch_frames = [batch_data for batch_data in batch_frames if not batch_data.empty]
+        if not batch_frames:
+            return self.empty_price_data()
+        
+        price_data: DataFrame = pd.concat(batch_frames, axis=1) \
+            .sort_index(axis=1, level=0, sort_remaining=False) \
+            .rename(columns=requested_tickers, level=1)
+        
+        return price_data
+
+
+class ConstituentsStore:
+    """
+    Class keeps dated snapshots of index constituents tables on disk,
+    one JSON file per index and snapshot date.
+    """
+    
+    def __init__(
+        self,
+        directory: str | Path,
+        ttl_days: int = 7
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_days = ttl_days
+    
+    def index_dir(self, index_name: str) -> Path:
+        """
+        Method returns a directory of index snapshots, e.g. S&P 500 -> S%26P%20500.
+        """
+        return self.directory / quote(index_name, safe="")
+    
+    def snapshot_dates(self, index_name: str) -> list[date]:
+        """
+        Method returns sorted dates of stored snapshots of an index.
+        """
+        index_dir: Path = self.index_dir(index_name=index_name)
+        if not index_dir.exists():
+            return []
+        
+        return sorted(
+            date.fromisoformat(snapshot_path.stem)
+            for snapshot_path in index_dir.glob("*.json")
+        )
+    
+    def save(
+        self,
+        index_name: str,
+        constituents: DataFrame,
+        snapshot_date: date | None = None
+    ) -> None:
+        """
+        Method stores a constituents table as a snapshot of a date (today by default).
+        """
+        snapshot_date = snapshot_date or date.today()
+        index_dir: Path = self.index_dir(index_name=index_name)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        
+        snapshot_path: Path = index_dir / f"{snapshot_date.isoformat()}.json"
+        temp_path: Path = snapshot_path.with_suffix(".tmp")
+        temp_path.write_text(constituents.to_json(orient="split", index=False))
+        temp_path.replace(snapshot_path)
+    
+    def load(
+        self,
+        index_name: str,
+        as_of: date | datetime | None = None
+    ) -> DataFrame | None:
+        """
+        Method returns the latest snapshot taken on or before a date (the latest one by default).
+        If all snapshots are newer than the date, the oldest one is returned.
+        """
+        snapshot_dates: list[date] = self.snapshot_dates(index_name=index_name)
+        if not snapshot_dates:
+            return None
+        
+        snapshot_date: date = snapshot_dates[-1]
+        if as_of is not None:
+            as_of = as_of.date() if isinstance(as_of, datetime) else as_of
+            earlier_dates: list[date] = [
+                earlier_date for earlier_date in snapshot_dates if earlier_date <= as_of
+            ]
+            if not earlier_dates:
+                logger.warning(
+                    f"No {index_name} snapshot as of {as_of}, "
+                    f"the oldest one from {snapshot_dates[0]} is used."
+                )
+            snapshot_date = earlier_dates[-1] if earlier_dates else snapshot_dates[0]
+        
+        snapshot_path: Path = self.index_dir(index_name=index_name) \
+            / f"{snapshot_date.isoformat()}.json"
+        
+        return pd.read_json(StringIO(snapshot_path.read_text()), orient="split", dtype=False)
+    
+    def is_stale(self, index_name: str) -> bool:
+        """
+        Method checks whether the latest snapshot of an index is older than the ttl.
+        """
+        snapshot_dates: list[date] = self.snapshot_dates(index_name=index_name)
+        
+        return not snapshot_dates \
+            or (date.today() - snapshot_dates[-1]).days >= self.ttl_days
+    
+    def get_constituents(
+        self,
+        index_name: str,
+        fetch_constituents: Callable[[], DataFrame],
+        as_of: date | datetime | None = None,
+        refresh: bool = False
+    ) -> DataFrame:
+        """
+        Method returns constituents of an index from the store.
+        A new snapshot is fetched when requested or when the latest one is stale.
+        """
+        if refresh or self.is_stale(index_name=index_name):
+            self.save(
+                index_name=index_name,
+                constituents=fetch_constituents()
+            )
+        
+        return self.load(index_name=index_name, as_of=as_of)
 
-            stocks_data = stocks_data.drop(
-                columns=[ticker],
-                level=1
-            ) if not postive_result else stocks_data
- 
-        return stocks_data
 
+class PricePanel:
+    """
+    Class keeps price data as contiguous 2-D arrays (dates x tickers), one per field,
+    with a date index and a ticker index. Only requested fields are kept.
+    A field is read as a zero-copy dataframe view, so code written for
+    yfinance-like frames, e.g. panel["Close"], works on a panel too.
+    Panels are saved as .npy files and can be memory-mapped back from disk.
+    """
+    
+    def __init__(
+        self,
+        fields: dict[str, np.ndarray],
+        dates: pd.DatetimeIndex,
+        tickers: pd.Index
+    ):
+        self.fields = fields
+        self.dates = pd.DatetimeIndex(dates, name="Date")
+        self.tickers = pd.Index(tickers, name="Ticker")
+    
+    @classmethod
+    def from_price_data(
+        cls,
+        price_data: DataFrame,
+        fields: list[str] | None = None,
+        dtype: type = np.float64
+    ) -> "PricePanel":
+        """
+        Method converts a yfinance-like frame to a panel, keeping only given fields.
+        """
+        fields = fields or list(price_data.columns.get_level_values(0).unique())
+        tickers = price_data.columns.get_level_values(1).unique()
+        
+        return cls(
+            fields={
+                field: np.ascontiguousarray(
+                    price_data[field].reindex(columns=tickers).to_numpy(dtype=dtype)
+                )
+                for field in fields
+            },
+            dates=price_data.index,
+            tickers=tickers
+        )
+    
+    @classmethod
+    def from_source(
+        cls,
+        source: "PriceSource",
+        tickers: list[str],
+        period: tuple[datetime],
+        fields: list[str] | None = None,
+        dtype: type = np.float64
+    ) -> "PricePanel":
+        """
+        Method fetches only given fields ("Close" by default) of tickers from a price source.
+        """
+        fields = fields or ["Close"]
+        price_data: DataFrame = source.get_price_data(
+            tickers=tickers,
+            period=period,
+            fields=fields
+        )
+        
+        return cls.from_price_data(price_data=price_data, fields=fields, dtype=dtype)
+    
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return self.dates
+    
+    @property
+    def columns(self) -> pd.MultiIndex:
+        """
+        Columns like in a yfinance-like frame: fields on the first level, tickers on the second one.
+        """
+        return pd.MultiIndex.from_product(
+            [list(self.fields.keys()), self.tickers],
+            names=["Price", "Ticker"]
+        )
+    
+    @property
+    def dtype(self) -> np.dtype:
+        return next(iter(self.fields.values())).dtype if self.fields else np.dtype(np.float64)
+    
+    @property
+    def empty(self) -> bool:
+        return not self.fields or len(self.dates) == 0 or len(self.tickers) == 0
+    
+    def __len__(self) -> int:
+        return len(self.dates)
     
+    def __getitem__(self, key: str | list[str]) -> "DataFrame | PricePanel":
+        """
+        A field name returns a zero-copy dataframe view, a list of fields returns a panel.
+        """
+        if isinstance(key, list):
+            return PricePanel(
+                fields={field: self.fields[field] for field in key},
+                dates=self.dates,
+                tickers=self.tickers
+            )
+        
+        return DataFrame(self.fields[key], index=self.dates, columns=self.tickers, copy=False)
+    
+    def with_field(
+        self,
+        field: str,
+        values: np.ndarray
+    ) -> "PricePanel":
+        """
+        Method returns a panel with an added field, existing arrays are shared.
+        """
+        return PricePanel(
+            fields={**self.fields, field: np.ascontiguousarray(values)},
+            dates=self.dates,
+            tickers=self.tickers
+        )
+    
+    def select_tickers(self, tickers: list[str]) -> "PricePanel":
+        """
+        Method returns a panel with given tickers only.
+        """
+        columns: np.ndarray = self.tickers.get_indexer(tickers)
+        
+        return PricePanel(
+            fields={
+                field: np.ascontiguousarray(values[:, columns])
+                for field, values in self.fields.items()
+            },
+            dates=self.dates,
+            tickers=self.tickers[columns]
+        )
+    
+    def loc_dates(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None
+    ) -> "PricePanel":
+        """
+        Method returns a panel of dates [start, end). Rows are sliced without copying.
+        """
+        start_row: int = self.dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+        end_row: int = self.dates.searchsorted(pd.Timestamp(end)) if end is not None \
+            else len(self.dates)
+        
+        return PricePanel(
+            fields={field: values[start_row:end_row] for field, values in self.fields.items()},
+            dates=self.dates[start_row:end_row],
+            tickers=self.tickers
+        )
+    
+    def to_frame(self) -> DataFrame:
+        """
+        Method returns a yfinance-like frame sharing the panel arrays.
+        """
+        return pd.concat(
+            {field: self[field] for field in self.fields},
+            axis=1,
+            names=["Price", "Ticker"]
+        )
+    
+    def save(
+        self,
+        directory: str | Path,
+        ticker_major: bool = False
+    ) -> None:
+        """
+        Method writes every field to a .npy file, dates and tickers to index files.
+        Ticker major files keep every ticker column contiguous on disk,
+        so column chunks of a memory-mapped panel are read sequentially.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for field, values in self.fields.items():
+            np.save(
+                directory / f"{quote(field, safe='')}.npy",
+                np.asfortranarray(values) if ticker_major else values
+            )
+        np.save(directory / "dates.npy", self.dates.to_numpy(dtype="datetime64[ns]"))
+        (directory / "index.json").write_text(json.dumps({
+            "fields": list(self.fields.keys()),
+            "tickers": list(self.tickers)
+        }))
+    
+    @classmethod
+    def load(
+        cls,
+        directory: str | Path,
+        fields: list[str] | None = None,
+        mmap: bool = True
+    ) -> "PricePanel":
+        """
+        Method reads a saved panel, memory-mapping field arrays by default.
+        """
+        directory = Path(directory)
+        index_data: dict[str, list[str]] = json.loads((directory / "index.json").read_text())
+        
+        return cls(
+            fields={
+                field: np.load(
+                    directory / f"{quote(field, safe='')}.npy",
+                    mmap_mode="r" if mmap else None
+                )
+                for field in fields or index_data["fields"]
+            },
+            dates=pd.DatetimeIndex(np.load(directory / "dates.npy")),
+            tickers=pd.Index(index_data["tickers"])
+        )
+
+
+class MetricsCalculator:
+    """
+    Class calculates metrics for stocks data that involved in analysis.
+    """
+    
+    # Period frequencies of bars longer than a day and their most sessions per bar.
+    TIMEFRAMES: dict[str, tuple[str, int]] = {
+        "weekly": ("W-FRI", 5),
+        "monthly": ("M", 23)
+    }
+    # Kernels of moving averages: simple, exponential and linearly weighted.
+    MA_KINDS: tuple[str, ...] = ("sma", "ema", "wma")
+    
+    @staticmethod
+    def rs(
+        stock_price: float,
+        market_price: float
+    ) -> float:
+        """
+        Method calculates a relative strength.
+        """
+        rs: float = round(
+            number=(stock_price / market_price),
+            ndigits=2
+        )
+        return rs
+    
+    @classmethod
+    def add_field(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        field: str,
+        values: DataFrame
+    ) -> DataFrame | PricePanel:
+        """
+        Method appends a ticker-wide block of values as a new top level field.
+        """
+        return cls.add_fields(stocks_data=stocks_data, fields={field: values})
+    
+    @staticmethod
+    def add_fields(
+        stocks_data: DataFrame | PricePanel,
+        fields: dict[str, DataFrame]
+    ) -> DataFrame | PricePanel:
+        """
+        Method appends ticker-wide blocks of values as new top level fields.
+        All blocks are concatenated at once, existing price blocks are shared
+        with the result instead of being copied (pandas copy-on-write).
+        """
+        if isinstance(stocks_data, PricePanel):
+            for field, values in fields.items():
+                stocks_data = stocks_data.with_field(
+                    field=field,
+                    values=values.reindex(columns=stocks_data.tickers).to_numpy(dtype=stocks_data.dtype)
+                )
+            return stocks_data
+        
+        blocks: list[DataFrame] = [
+            values.set_axis(
+                pd.MultiIndex.from_product(
+                    [[field], values.columns],
+                    names=stocks_data.columns.names
+                ),
+                axis=1
+            )
+            for field, values in fields.items()
+        ]
+        
+        return pd.concat([stocks_data, *blocks], axis=1)
+    
+    def rs_on_data(
+        self,
+        stocks_data: DataFrame | PricePanel,
+        market_ticker: str | list[str]
+    ) -> DataFrame | PricePanel:
+        """
+        Method calculates a relative strength for a dataframe with stock prices.
+        All "Close" prices are divided by a benchmark in one broadcast operation.
+        A single benchmark is stored as the "rs" field, several benchmarks
+        as "rs_<benchmark>" fields, e.g. "rs_^SPX" and "rs_^NDX".
+        """
+        close_prices: DataFrame = stocks_data["Close"]
+        
+        market_tickers: list[str] = [market_ticker] \
+            if isinstance(market_ticker, str) else list(market_ticker)
+        rs_fields: dict[str, DataFrame] = {
+            "rs" if isinstance(market_ticker, str) else f"rs_{benchmark}":
+                close_prices.div(close_prices[benchmark], axis=0).round(2)
+            for benchmark in market_tickers
+        }
+        
+        return self.add_fields(stocks_data=stocks_data, fields=rs_fields)
+    
+    @staticmethod
+    def rolling_means(
+        values: np.ndarray,
+        windows: list[int],
+        decimals: int = 8
+    ) -> dict[int, np.ndarray]:
+        """
+        Method calculates rolling means of columns for several windows from one
+        cumulative sum pass. Like pandas rolling(window).mean(), a mean is NaN
+        until a window is full and when a window contains a NaN.
+        Means are rounded to drop the float error of cumulative sums.
+        NB! Values are shaped (days, tickers).
+        """
+        is_nan: np.ndarray = np.isnan(values)
+        values_cumsum: np.ndarray = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(np.where(is_nan, 0.0, values), axis=0, out=values_cumsum[1:])
+        nan_cumsum: np.ndarray = np.zeros((len(values) + 1, values.shape[1]), dtype=int)
+        np.cumsum(is_nan, axis=0, out=nan_cumsum[1:])
+        
+        means: dict[int, np.ndarray] = {}
+        for window in windows:
+            window_means: np.ndarray = np.full(values.shape, np.nan)
+            if window <= len(values):
+                window_sums: np.ndarray = values_cumsum[window:] - values_cumsum[:-window]
+                window_nans: np.ndarray = nan_cumsum[window:] - nan_cumsum[:-window]
+                window_means[window - 1:] = np.where(
+                    window_nans == 0,
+                    np.round(window_sums / window, decimals),
+                    np.nan
+                )
+            means[window] = window_means
+        
+        return means
+    
+    @staticmethod
+    def exponential_means(
+        values: np.ndarray,
+        window: int,
+        decimals: int = 8
+    ) -> np.ndarray:
+        """
+        Method calculates exponential moving averages of columns with a smoothing
+        of 2 / (window + 1), all columns are updated together row by row.
+        Like pandas ewm(span=window, adjust=False, ignore_na=True, min_periods=window).mean(),
+        a mean starts from the first valid value, is NaN until window values are seen
+        and NaN values are skipped. Days with a NaN value are NaN.
+        NB! Values are shaped (days, tickers).
+        """
+        alpha: float = 2 / (window + 1)
+        means: np.ndarray = np.full(values.shape, np.nan)
+        last_means: np.ndarray = np.full(values.shape[1], np.nan)
+        seen_counts: np.ndarray = np.zeros(values.shape[1], dtype=int)
+        for row, row_values in enumerate(values):
+            is_valid: np.ndarray = ~np.isnan(row_values)
+            last_means = np.where(
+                is_valid,
+                np.where(
+                    seen_counts == 0,
+                    row_values,
+                    last_means + alpha * (row_values - last_means)
+                ),
+                last_means
+            )
+            seen_counts += is_valid
+            means[row] = np.where(is_valid & (seen_counts >= window), last_means, np.nan)
+        
+        return np.round(means, decimals)
+    
+    @staticmethod
+    def weighted_means(
+        values: np.ndarray,
+        window: int,
+        decimals: int = 8
+    ) -> np.ndarray:
+        """
+        Method calculates linearly weighted moving averages of columns, the last day
+        of a window weighs window and the first one 1, from two cumulative sum passes:
+        sum(weight * value) = sum(row * value) - (first row - 1) * sum(value).
+        Like rolling_means, a mean is NaN until a window is full and when a window
+        contains a NaN. Means are rounded to drop the float error of cumulative sums.
+        NB! Values are shaped (days, tickers).
+        """
+        means: np.ndarray = np.full(values.shape, np.nan)
+        if window > len(values):
+            return means
+        
+        is_nan: np.ndarray = np.isnan(values)
+        filled_values: np.ndarray = np.where(is_nan, 0.0, values)
+        rows: np.ndarray = np.arange(1, len(values) + 1)[:, np.newaxis]
+        values_cumsum: np.ndarray = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(filled_values, axis=0, out=values_cumsum[1:])
+        weighted_cumsum: np.ndarray = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(rows * filled_values, axis=0, out=weighted_cumsum[1:])
+        nan_cumsum: np.ndarray = np.zeros((len(values) + 1, values.shape[1]), dtype=int)
+        np.cumsum(is_nan, axis=0, out=nan_cumsum[1:])
+        
+        window_sums: np.ndarray = values_cumsum[window:] - values_cumsum[:-window]
+        window_weighted_sums: np.ndarray = (weighted_cumsum[window:] - weighted_cumsum[:-window]) \
+            - (rows[:len(values) - window + 1] - 1) * window_sums
+        window_nans: np.ndarray = nan_cumsum[window:] - nan_cumsum[:-window]
+        means[window - 1:] = np.where(
+            window_nans == 0,
+            np.round(window_weighted_sums / (window * (window + 1) / 2), decimals),
+            np.nan
+        )
+        
+        return means
+    
+    @classmethod
+    def moving_averages(
+        cls,
+        values: np.ndarray,
+        window: int,
+        ma_kind: str = "sma"
+    ) -> np.ndarray:
+        """
+        Method calculates moving averages of all columns in one pass with a kernel
+        of MA_KINDS: "sma" (simple), "ema" (exponential) or "wma" (linearly weighted).
+        NB! Values are shaped (days, tickers).
+        """
+        if ma_kind not in cls.MA_KINDS:
+            raise ValueError(f"Ma kind {ma_kind} is not valid.")
+        if ma_kind == "ema":
+            return cls.exponential_means(values=values, window=window)
+        if ma_kind == "wma":
+            return cls.weighted_means(values=values, window=window)
+        
+        return cls.rolling_means(values=values, windows=[window])[window]
+    
+    @staticmethod
+    def resample_values(
+        values: np.ndarray,
+        first_rows: np.ndarray,
+        last_rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Method takes the last valid value of every column within every bar of rows
+        [first_row, last_row], a column without valid values in a bar is NaN.
+        Last valid rows are found by one running maximum over all columns.
+        NB! Values are shaped (days, tickers).
+        """
+        row_numbers: np.ndarray = np.arange(len(values))[:, np.newaxis]
+        valid_rows: np.ndarray = np.maximum.accumulate(
+            np.where(np.isnan(values), -1, row_numbers),
+            axis=0
+        )[last_rows]
+        bar_values: np.ndarray = np.take_along_axis(values, np.maximum(valid_rows, 0), axis=0)
+        bar_values[valid_rows < first_rows[:, np.newaxis]] = np.nan
+        
+        return bar_values
+    
+    @classmethod
+    def resample(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        timeframe: str
+    ) -> DataFrame | PricePanel:
+        """
+        Method resamples daily bars to "weekly" or "monthly" bars in one pass over
+        all fields and tickers. A bar keeps the last valid value of its days,
+        e.g. the last close, and is dated by its last trading day.
+        """
+        if timeframe not in cls.TIMEFRAMES:
+            raise ValueError(f"Timeframe {timeframe} is not valid.")
+        if len(stocks_data) == 0:
+            return stocks_data
+        
+        periods: pd.PeriodIndex = stocks_data.index.to_period(cls.TIMEFRAMES[timeframe][0])
+        last_rows: np.ndarray = np.append(
+            np.flatnonzero(periods[1:] != periods[:-1]),
+            len(periods) - 1
+        )
+        first_rows: np.ndarray = np.append(0, last_rows[:-1] + 1)
+        bar_dates: pd.DatetimeIndex = stocks_data.index[last_rows]
+        
+        if isinstance(stocks_data, PricePanel):
+            return PricePanel(
+                fields={
+                    field: cls.resample_values(
+                        values=values,
+                        first_rows=first_rows,
+                        last_rows=last_rows
+                    )
+                    for field, values in stocks_data.fields.items()
+                },
+                dates=bar_dates,
+                tickers=stocks_data.tickers
+            )
+        
+        return DataFrame(
+            cls.resample_values(
+                values=stocks_data.to_numpy(dtype=float),
+                first_rows=first_rows,
+                last_rows=last_rows
+            ),
+            index=bar_dates,
+            columns=stocks_data.columns
+        )
+    
+    @classmethod
+    def rs_ma_on_data(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        ma_window: int,
+        ma_kind: str = "sma"
+    ) -> DataFrame | PricePanel:
+        """
+        Method calculates a moving average of a relative strength.
+        Moving average can be calculated for period not surpassing 21 days (one month).
+        Ma kind is one of MA_KINDS, a simple moving average by default.
+        NB! Dataframe must contain a "rs" column
+        """
+        rs_data: DataFrame = stocks_data["rs"]
+        rs_ma: np.ndarray = cls.moving_averages(
+            values=rs_data.to_numpy(dtype=float),
+            window=ma_window,
+            ma_kind=ma_kind
+        )
+        
+        return cls.add_field(
+            stocks_data=stocks_data,
+            field="rs_ma",
+            values=DataFrame(rs_ma, index=rs_data.index, columns=rs_data.columns)
+        )
+    
+    @staticmethod
+    def group_levels(
+        close_values: np.ndarray,
+        group_codes: np.ndarray,
+        groups_count: int,
+        shares: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Method chains daily returns of group members into composite levels of groups
+        based at 1 on the first row. A day return of a group is the mean return of its
+        members weighted equally, or by their caps of the previous day (shares * close)
+        when shares are given. Returns of all groups are reduced by one matrix product
+        with a membership matrix, members without a return or a cap are left out of a day
+        and a group without returns keeps its level. A group code of -1 marks no group.
+        NB! Close values are shaped (days, tickers), levels (days, groups).
+        """
+        previous_close: np.ndarray = close_values[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns: np.ndarray = close_values[1:] / previous_close - 1
+        weights: np.ndarray = np.ones(previous_close.shape) if shares is None \
+            else previous_close * shares
+        is_valid: np.ndarray = np.isfinite(returns) & np.isfinite(weights)
+        weights = np.where(is_valid, weights, 0.0)
+        
+        membership: np.ndarray = np.zeros((len(group_codes), groups_count))
+        is_member: np.ndarray = group_codes >= 0
+        membership[np.flatnonzero(is_member), group_codes[is_member]] = 1.0
+        weight_sums: np.ndarray = weights @ membership
+        return_sums: np.ndarray = (np.where(is_valid, returns, 0.0) * weights) @ membership
+        group_returns: np.ndarray = np.divide(
+            return_sums,
+            weight_sums,
+            out=np.zeros(return_sums.shape),
+            where=weight_sums > 0
+        )
+        
+        levels: np.ndarray = np.ones((len(close_values), groups_count))
+        np.cumprod(1 + group_returns, axis=0, out=levels[1:])
+        
+        return levels
+    
+    @classmethod
+    def group_rs(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        groups: dict[str, str],
+        market_ticker: str,
+        market_caps: Series | None = None
+    ) -> DataFrame:
+        """
+        Method calculates a relative strength of group composites, e.g. GICS sectors,
+        against a benchmark. Composites are equally weighted or weighted by market caps,
+        which are turned into shares by the last close. Rs is based at 100 on the first day.
+        Tickers out of groups, e.g. a benchmark, are not members of any composite.
+        Returns a dataframe of dates and groups.
+        """
+        close_data: DataFrame = stocks_data["Close"]
+        group_codes, group_names = pd.factorize(
+            Series(groups, dtype=object).reindex(close_data.columns)
+        )
+        shares: np.ndarray | None = None
+        if market_caps is not None:
+            last_close: Series = close_data.ffill().iloc[-1]
+            shares = (market_caps.reindex(close_data.columns) / last_close).to_numpy(dtype=float)
+        levels: np.ndarray = cls.group_levels(
+            close_values=close_data.to_numpy(dtype=float),
+            group_codes=group_codes,
+            groups_count=len(group_names),
+            shares=shares
+        )
+        market_close: Series = close_data[market_ticker]
+        market_levels: np.ndarray = (market_close / market_close.dropna().iloc[0]).to_numpy(dtype=float)
+        
+        return DataFrame(
+            np.round(100 * levels / market_levels[:, np.newaxis], 2),
+            index=close_data.index,
+            columns=pd.Index(group_names, name="Group")
+        )
+    
+    @classmethod
+    def group_rs_on_data(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        groups: dict[str, str],
+        market_ticker: str,
+        market_caps: Series | None = None
+    ) -> DataFrame | PricePanel:
+        """
+        Method adds group metrics of every ticker: "group_rs", the rs of its group
+        composite against a benchmark, and "rs_vs_group", its rs against the composite.
+        Composites are based at 100 on the first day and tickers on their first close.
+        Tickers out of groups get NaN.
+        """
+        close_data: DataFrame = stocks_data["Close"]
+        group_rs_data: DataFrame = cls.group_rs(
+            stocks_data=stocks_data,
+            groups=groups,
+            market_ticker=market_ticker,
+            market_caps=market_caps
+        )
+        ticker_groups: Series = Series(groups, dtype=object).reindex(close_data.columns)
+        group_columns: np.ndarray = group_rs_data.columns.get_indexer(ticker_groups)
+        
+        # Composite rs of every ticker, gathered from the groups in one indexing.
+        ticker_group_rs: np.ndarray = np.where(
+            group_columns >= 0,
+            group_rs_data.to_numpy()[:, np.maximum(group_columns, 0)],
+            np.nan
+        )
+        market_close: Series = close_data[market_ticker]
+        market_levels: np.ndarray = (market_close / market_close.dropna().iloc[0]).to_numpy(dtype=float)
+        relative_levels: np.ndarray = close_data.to_numpy(dtype=float) \
+            / market_levels[:, np.newaxis] / ticker_group_rs
+        # Every ticker is rebased on its first day with a group rs, e.g. a later listing.
+        first_rows: np.ndarray = np.argmax(~np.isnan(relative_levels), axis=0)
+        rs_vs_group: np.ndarray = np.round(
+            100 * relative_levels / relative_levels[first_rows, np.arange(len(first_rows))],
+            2
+        )
+        
+        return cls.add_fields(
+            stocks_data=stocks_data,
+            fields={
+                "group_rs": DataFrame(ticker_group_rs, index=close_data.index, columns=close_data.columns),
+                "rs_vs_group": DataFrame(rs_vs_group, index=close_data.index, columns=close_data.columns)
+            }
+        )
+
+
+class RsRanker:
+    """
+    Class ranks tickers against the whole universe by their rs growth.
+    Every day of a panel is ranked in one vectorized pass over sorted rows,
+    top tickers are picked by partial selection instead of a full sort.
+    """
+    
+    @staticmethod
+    def rs_growth(
+        rs_values: np.ndarray,
+        lookback: int | None = None
+    ) -> np.ndarray:
+        """
+        Method calculates the rs growth of every day against the rs lookback days back,
+        or against the first day when lookback is not given.
+        Rs levels depend on price levels, so tickers are ranked by the growth instead.
+        NB! Values are shaped (days, tickers).
+        """
+        rs_values = np.asarray(rs_values, dtype=float)
+        if lookback is None:
+            return rs_values / rs_values[:1] - 1
+        
+        growth: np.ndarray = np.full(rs_values.shape, np.nan)
+        if lookback < len(rs_values):
+            growth[lookback:] = rs_values[lookback:] / rs_values[:-lookback] - 1
+        
+        return growth
+    
+    @staticmethod
+    def percentile_ranks(values: np.ndarray) -> np.ndarray:
+        """
+        Method ranks values of every row against the other values of the row.
+        A percentile is 0 for the lowest and 100 for the highest value,
+        tied values get their average rank and NaN values stay NaN.
+        NB! Values are shaped (days, tickers).
+        """
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return np.full(values.shape, np.nan)
+        
+        # NaN values are sorted to the end of every row.
+        order: np.ndarray = np.argsort(values, axis=1)
+        sorted_values: np.ndarray = np.take_along_axis(values, order, axis=1)
+        valid_counts: np.ndarray = (~np.isnan(values)).sum(axis=1, keepdims=True)
+        
+        # A tie group spans from its first to its last position in a sorted row.
+        positions: np.ndarray = np.broadcast_to(
+            np.arange(values.shape[1], dtype=np.int32),
+            values.shape
+        )
+        group_starts: np.ndarray = np.ones(values.shape, dtype=bool)
+        np.not_equal(sorted_values[:, 1:], sorted_values[:, :-1], out=group_starts[:, 1:])
+        first_positions: np.ndarray = np.maximum.accumulate(
+            np.where(group_starts, positions, np.int32(0)),
+            axis=1
+        )
+        group_ends: np.ndarray = np.ones(values.shape, dtype=bool)
+        group_ends[:, :-1] = group_starts[:, 1:]
+        last_positions: np.ndarray = np.minimum.accumulate(
+            np.where(group_ends, positions, np.int32(values.shape[1] - 1))[:, ::-1],
+            axis=1
+        )[:, ::-1]
+        
+        # Percentile of the average rank, a single valid value is the highest.
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scales: np.ndarray = np.where(valid_counts > 1, 50 / (valid_counts - 1), np.nan)
+        sorted_percentiles: np.ndarray = (first_positions + last_positions) * scales
+        sorted_percentiles[(valid_counts == 1) & (positions == 0)] = 100.0
+        sorted_percentiles[positions >= valid_counts] = np.nan
+        
+        percentiles: np.ndarray = np.empty(values.shape)
+        np.put_along_axis(percentiles, order, sorted_percentiles, axis=1)
+        
+        return percentiles
+    
+    @staticmethod
+    def ratings(percentiles: np.ndarray) -> np.ndarray:
+        """
+        Method maps percentiles to ratings from 1 to 99, like an IBD rs rating.
+        """
+        return np.round(1 + 0.98 * percentiles)
+    
+    @classmethod
+    def rs_ratings(
+        cls,
+        rs_data: DataFrame,
+        lookback: int | None = None
+    ) -> DataFrame:
+        """
+        Method rates every ticker on every day by the percentile of its rs growth
+        in the universe.
+        """
+        percentiles: np.ndarray = cls.percentile_ranks(
+            values=cls.rs_growth(
+                rs_values=rs_data.to_numpy(dtype=float),
+                lookback=lookback
+            )
+        )
+        
+        return DataFrame(
+            cls.ratings(percentiles=percentiles),
+            index=rs_data.index,
+            columns=rs_data.columns
+        )
+    
+    @classmethod
+    def growth_ratings(cls, rs_growth: Series) -> Series:
+        """
+        Method rates tickers by the percentile of a single rs growth per ticker.
+        """
+        percentiles: np.ndarray = cls.percentile_ranks(
+            values=rs_growth.to_numpy(dtype=float)[np.newaxis, :]
+        )[0]
+        
+        return Series(cls.ratings(percentiles=percentiles), index=rs_growth.index)
+    
+    @staticmethod
+    def top_k(scores: Series, k: int) -> Series:
+        """
+        Method returns k tickers with the highest scores in descending order.
+        Only the k selected scores are sorted, NaN scores are never selected.
+        """
+        scores = scores.dropna()
+        if k >= len(scores):
+            return scores.sort_values(ascending=False, kind="stable")
+        if k <= 0:
+            return scores.iloc[:0]
+        
+        values: np.ndarray = scores.to_numpy(dtype=float)
+        selected: np.ndarray = np.argpartition(-values, k - 1)[:k]
+        selected = selected[np.argsort(-values[selected], kind="stable")]
+        
+        return scores.iloc[selected]
+
+
+class DataFilter:
+    """
+    Class contains filters for stocks price data. 
+    """
+
+    @staticmethod
+    def select_tickers(
+        stocks_data: DataFrame | PricePanel,
+        tickers_mask: Series
+    ) -> DataFrame | PricePanel:
+        """
+        Method keeps only tickers marked True in a mask, selecting columns once.
+        NB! Tickers must be second level columns.
+        """
+        selected_tickers = tickers_mask.index[tickers_mask.to_numpy(dtype=bool)]
+        if isinstance(stocks_data, PricePanel):
+            return stocks_data.select_tickers(
+                tickers=[ticker for ticker in stocks_data.tickers if ticker in selected_tickers]
+            )
+        
+        is_selected = stocks_data.columns.get_level_values(1).isin(selected_tickers)
+        
+        return stocks_data.loc[:, is_selected]
+
+    @staticmethod
+    def rs_grown_mask(
+        stocks_data: DataFrame | PricePanel,
+        field: str = "rs"
+    ) -> Series:
+        """
+        Method marks tickers which relative strength coefficient has grown
+        over the period. Another rs field, e.g. "group_rs", can be checked instead.
+        NB! Data must contain the "rs" column.
+        """
+        rs_data: DataFrame = stocks_data[field]
+        mask: Series = rs_data.iloc[-1] > rs_data.iloc[0]
+        
+        return mask.rename(f"{field}_grown")
+
+    @classmethod
+    def has_rs_grown(cls, stocks_data: DataFrame | PricePanel) -> DataFrame | PricePanel:
+        """
+        Methods checks whether a relative strength coefficient has grown and
+        filters stocks.
+        NB! Tickers must be second level columns.
+        Data must contain the "rs" column.
+        """
+        return cls.select_tickers(
+            stocks_data=stocks_data,
+            tickers_mask=cls.rs_grown_mask(stocks_data=stocks_data)
+        )
+
+    @staticmethod
+    def rs_above_ma_streaks(
+        rs_values: np.ndarray,
+        ma_values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Method counts for every column the trailing days a relative strength
+        has been held above its moving average.
+        Counting goes from the last row back and stops at a NaN ma or at rs < ma.
+        Days with rs == ma do not break a streak, but are not counted.
+        NB! Arrays are shaped (days, tickers).
+        """
+        with np.errstate(invalid="ignore"):
+            is_above: np.ndarray = rs_values > ma_values
+            is_stop: np.ndarray = (rs_values < ma_values) | np.isnan(ma_values)
+        
+        # Row of the last stop per column, -1 if a streak runs from the first row.
+        rows: np.ndarray = np.arange(len(rs_values))[:, None]
+        last_stop_row: np.ndarray = np.where(is_stop, rows, -1).max(axis=0, initial=-1)
+        
+        # Days above ma after the last stop = total days above - days above up to the stop.
+        # A leading zero row makes the cumulative count of "no rows" addressable.
+        above_cumsum: np.ndarray = np.zeros(
+            (len(rs_values) + 1, rs_values.shape[1]),
+            dtype=int
+        )
+        np.cumsum(is_above, axis=0, out=above_cumsum[1:])
+        columns: np.ndarray = np.arange(rs_values.shape[1])
+        
+        return above_cumsum[-1] - above_cumsum[last_stop_row + 1, columns]
+
+    @staticmethod
+    def rs_above_ma_streaks_history(
+        rs_values: np.ndarray,
+        ma_values: np.ndarray,
+        max_days: int | None = None
+    ) -> np.ndarray:
+        """
+        Method counts for every row and column the days a relative strength has been
+        held above its moving average up to that row, with the rules of rs_above_ma_streaks.
+        With max_days only the last max_days rows up to a row are looked at, like in a scan
+        of a period of max_days rows ending at that row.
+        NB! Arrays are shaped (days, tickers).
+        """
+        with np.errstate(invalid="ignore"):
+            is_above: np.ndarray = rs_values > ma_values
+            is_stop: np.ndarray = (rs_values < ma_values) | np.isnan(ma_values)
+        
+        rows: np.ndarray = np.arange(len(rs_values))[:, None]
+        last_stop_row: np.ndarray = np.maximum.accumulate(np.where(is_stop, rows, -1), axis=0)
+        if max_days is not None:
+            last_stop_row = np.maximum(last_stop_row, rows - max_days)
+        
+        above_cumsum: np.ndarray = np.zeros(
+            (len(rs_values) + 1, rs_values.shape[1]),
+            dtype=int
+        )
+        np.cumsum(is_above, axis=0, out=above_cumsum[1:])
+        columns: np.ndarray = np.arange(rs_values.shape[1])
+        
+        return above_cumsum[1:] - above_cumsum[last_stop_row + 1, columns]
+
+    @classmethod
+    def days_rs_above_ma(cls, stocks_data: DataFrame | PricePanel) -> Series:
+        """
+        Method returns the current streak of days a relative strength has
+        been held above its moving average for every ticker.
+        NB! Data must contain the columns "rs" and "rs_ma".
+        """
+        rs_data: DataFrame = stocks_data["rs"]
+        ma_data: DataFrame = stocks_data["rs_ma"][rs_data.columns]
+        streaks: np.ndarray = cls.rs_above_ma_streaks(
+            rs_values=rs_data.to_numpy(dtype=float),
+            ma_values=ma_data.to_numpy(dtype=float)
+        )
+        
+        return Series(streaks, index=rs_data.columns, name="days_rs_above_ma")
+
+    @classmethod
+    def rs_crossed_ma_mask(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        days_rs_holds_above_ma: int
+    ) -> Series:
+        """
+        Method marks tickers which relative strength has been held above
+        its moving average at least days_rs_holds_above_ma days.
+        NB! Data must contain the columns "rs" and "rs_ma".
+        """
+        streaks: Series = cls.days_rs_above_ma(stocks_data=stocks_data)
+        mask: Series = streaks >= days_rs_holds_above_ma
+        
+        return mask.rename("rs_crossed_ma")
+
+    @classmethod
+    def has_rs_crossed_ma(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        days_rs_holds_above_ma: int
+    ) -> DataFrame | PricePanel:
+        """
+        Method checks if a relative strenght has crossed a moving average while growing and filters data.
+        The parameter days_rs_holds_above_ma means days, that stock has held its relative strength above ma.
+        NB! Data must contain the columns "rs" and "rs_ma".
+        """
+        return cls.select_tickers(
+            stocks_data=stocks_data,
+            tickers_mask=cls.rs_crossed_ma_mask(
+                stocks_data=stocks_data,
+                days_rs_holds_above_ma=days_rs_holds_above_ma
+            )
+        )
+
+
+class CrossoverIndex:
+    """
+    Class keeps every day a relative strength crossed its moving average as events
+    (ticker, date, direction), direction 1 is a cross up and -1 a cross down.
+    Events of all tickers are found once by sign changes of rs - ma, so queries
+    like "crossed up in the last N days" are binary searches over event dates.
+    Like streaks, days with rs == ma keep the previous side and a NaN ma resets it.
+    """
+    
+    UP: int = 1
+    DOWN: int = -1
+    
+    def __init__(
+        self,
+        dates: pd.DatetimeIndex,
+        tickers: pd.Index,
+        event_rows: np.ndarray,
+        event_columns: np.ndarray,
+        directions: np.ndarray
+    ):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        # Events are sorted by rows of dates.
+        self.event_rows = event_rows
+        self.event_columns = event_columns
+        self.directions = directions
+    
+    def __len__(self) -> int:
+        return len(self.event_rows)
+    
+    @classmethod
+    def from_values(
+        cls,
+        rs_values: np.ndarray,
+        ma_values: np.ndarray,
+        dates: pd.DatetimeIndex,
+        tickers: pd.Index
+    ) -> "CrossoverIndex":
+        """
+        Method finds crossovers of all columns in one vectorized pass.
+        The side of rs against ma is carried over days with rs == ma
+        by a running maximum of rows with a side or a NaN, like resample_values.
+        NB! Arrays are shaped (days, tickers).
+        """
+        with np.errstate(invalid="ignore"):
+            sides: np.ndarray = np.sign(rs_values - ma_values)
+        
+        row_numbers: np.ndarray = np.arange(len(sides))[:, np.newaxis]
+        side_rows: np.ndarray = np.maximum.accumulate(
+            np.where(sides != 0, row_numbers, -1), # NaN != 0, so NaN rows reset the side.
+            axis=0
+        )
+        columns: np.ndarray = np.arange(sides.shape[1])
+        carried_sides: np.ndarray = np.where(
+            side_rows >= 0,
+            sides[np.maximum(side_rows, 0), columns],
+            np.nan
+        )
+        
+        with np.errstate(invalid="ignore"):
+            is_event: np.ndarray = (carried_sides[1:] * carried_sides[:-1]) < 0
+        event_rows, event_columns = np.nonzero(is_event)
+        event_rows += 1
+        
+        return cls(
+            dates=dates,
+            tickers=tickers,
+            event_rows=event_rows,
+            event_columns=event_columns,
+            directions=carried_sides[event_rows, event_columns].astype(np.int8)
+        )
+    
+    @classmethod
+    def from_data(cls, stocks_data: DataFrame | PricePanel) -> "CrossoverIndex":
+        """
+        Method finds crossovers of stocks data.
+        NB! Data must contain the columns "rs" and "rs_ma".
+        """
+        rs_data: DataFrame = stocks_data["rs"]
+        
+        return cls.from_values(
+            rs_values=rs_data.to_numpy(dtype=float),
+            ma_values=stocks_data["rs_ma"].to_numpy(dtype=float),
+            dates=rs_data.index,
+            tickers=rs_data.columns
+        )
+    
+    def to_frame(self) -> DataFrame:
+        """
+        Method returns events as a dataframe with "ticker", "date" and "direction" columns.
+        """
+        return DataFrame({
+            "ticker": self.tickers[self.event_columns],
+            "date": self.dates[self.event_rows],
+            "direction": self.directions
+        })
+    
+    def crossed_within(
+        self,
+        days: int,
+        direction: int = UP,
+        as_of: datetime | None = None
+    ) -> list[str]:
+        """
+        Method returns tickers which rs crossed ma in a direction during the last days
+        sessions up to as_of (the last date by default), in the order of their first crossing.
+        """
+        last_row: int = len(self.dates) - 1 if as_of is None \
+            else int(self.dates.searchsorted(pd.Timestamp(as_of), side="right")) - 1
+        first_event: int = int(self.event_rows.searchsorted(last_row - days + 1, side="left"))
+        last_event: int = int(self.event_rows.searchsorted(last_row, side="right"))
+        
+        event_columns: np.ndarray = self.event_columns[first_event:last_event][
+            self.directions[first_event:last_event] == direction
+        ]
+        _, first_positions = np.unique(event_columns, return_index=True)
+        
+        return list(self.tickers[event_columns[np.sort(first_positions)]])
+    
+    def crossed_mask(
+        self,
+        stocks_data: DataFrame | PricePanel,
+        days: int,
+        direction: int = UP
+    ) -> Series:
+        """
+        Method marks tickers of stocks data which rs crossed ma in a direction
+        during the last days sessions up to the last date of the data.
+        Fits a filter pipeline stage, e.g. mask_filter=index.crossed_mask.
+        """
+        rs_data: DataFrame = stocks_data["rs"]
+        crossed_tickers: list[str] = self.crossed_within(
+            days=days,
+            direction=direction,
+            as_of=rs_data.index[-1]
+        )
+        
+        return Series(rs_data.columns.isin(crossed_tickers), index=rs_data.columns) \
+            .rename("rs_crossed_up" if direction == self.UP else "rs_crossed_down")
+
+
+class FilterPipeline:
+    """
+    Class chains ticker filters as boolean masks.
+    Every filter gets the full data, or its own data such as weekly bars,
+    and returns a mask over tickers.
+    Masks are combined with "and"/"or" and columns are selected once at the end.
+    """
+    
+    def __init__(self):
+        self.filters: list[
+            tuple[str, Callable[..., Series], str, DataFrame | PricePanel | None, dict[str, Any]]
+        ] = []
+        self.removed_tickers: dict[str, int] = {}
+    
+    def add_filter(
+        self,
+        name: str,
+        mask_filter: Callable[..., Series],
+        how: str = "and",
+        filter_data: "DataFrame | PricePanel | None" = None,
+        **filter_kwargs: Any
+    ) -> "FilterPipeline":
+        """
+        Method adds a filter stage.
+        The "and" stage keeps tickers passed both earlier stages and the filter,
+        the "or" stage keeps tickers passed either earlier stages or the filter.
+        A stage with filter data masks tickers on it instead of the pipeline data.
+        """
+        if how not in ("and", "or"):
+            raise ValueError(f"Combination {how} is not valid.")
+        
+        self.filters.append((name, mask_filter, how, filter_data, filter_kwargs))
+        
+        return self
+    
+    def get_mask(self, stocks_data: DataFrame | PricePanel) -> Series:
+        """
+        Method combines masks of all filter stages and counts how many tickers
+        each stage removed (an "or" stage can only return tickers, so its count is <= 0).
+        """
+        tickers = stocks_data.columns.get_level_values(1).unique()
+        mask: Series = Series(True, index=tickers)
+        
+        self.removed_tickers = {}
+        for name, mask_filter, how, filter_data, filter_kwargs in self.filters:
+            tickers_left: int = int(mask.sum())
+            
+            stage_data = stocks_data if filter_data is None else filter_data
+            stage_mask: Series = mask_filter(stocks_data=stage_data, **filter_kwargs) \
+                .reindex(tickers, fill_value=False) \
+                .astype(bool)
+            mask = mask & stage_mask if how == "and" else mask | stage_mask
+            
+            self.removed_tickers[name] = tickers_left - int(mask.sum())
+        
+        return mask
+    
+    def run(self, stocks_data: DataFrame | PricePanel) -> DataFrame | PricePanel:
+        """
+        Method filters stocks data with all filter stages.
+        """
+        return DataFilter.select_tickers(
+            stocks_data=stocks_data,
+            tickers_mask=self.get_mask(stocks_data=stocks_data)
+        )
+
+    
+@dataclass
+class ScanResult:
+    """
+    Class keeps a result of a scan: passed tickers with their last rs and ma
+    and the days rs has been held above ma.
+    """
+    index_name: str
+    period: tuple[datetime, datetime]
+    ma_window: int
+    days_rs_holds_above_ma: int
+    tickers: list[str]
+    rs: Series
+    days_rs_above_ma: Series
+    removed_tickers: dict[str, int] = field(default_factory=dict)
+    rs_rating: Series = field(default_factory=lambda: Series(dtype=float))
+    ma_kind: str = "sma"
+    group_rs: Series = field(default_factory=lambda: Series(dtype=float))
+    rs_ma: Series = field(default_factory=lambda: Series(dtype=float))
+    
+    def to_frame(self) -> DataFrame:
+        """
+        Method returns passed tickers with their metrics as a dataframe.
+        The rs of ticker groups is added by scans with a group level.
+        """
+        metrics: dict[str, Series] = {
+            "rs": self.rs,
+            "rs_ma": self.rs_ma,
+            "days_rs_above_ma": self.days_rs_above_ma,
+            "rs_rating": self.rs_rating
+        }
+        if not self.group_rs.empty:
+            metrics["group_rs"] = self.group_rs
+        
+        return DataFrame(metrics, index=pd.Index(self.tickers, name="Ticker"))
+    
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Method returns the result as a json serializable dict.
+        """
+        return {
+            "index_name": self.index_name,
+            "period": [pd.Timestamp(day).date().isoformat() for day in self.period],
+            "ma_window": self.ma_window,
+            "ma_kind": self.ma_kind,
+            "min_days": self.days_rs_holds_above_ma,
+            "tickers": self.tickers,
+            "metrics": json.loads(self.to_frame().reset_index().to_json(orient="records")),
+            "removed_tickers": self.removed_tickers
+        }
+    
+    def top(self, k: int, by: str = "rs_rating") -> DataFrame:
+        """
+        Method returns k passed tickers with the highest "rs_rating",
+        "days_rs_above_ma" or "rs" in descending order.
+        """
+        result_frame: DataFrame = self.to_frame()
+        top_scores: Series = RsRanker.top_k(scores=result_frame[by], k=k)
+        
+        return result_frame.loc[top_scores.index]
+
+
+class ResultStore:
+    """
+    Class keeps scan results in an append-only columnar store of Arrow IPC files,
+    one file per scan in hive partitions of index and scan date, e.g.
+    index=S%26P%20500/scan_date=2024-03-01/<run id>.arrow.
+    Files are written once and never changed. They are not compressed,
+    so readers memory-map them without copying, and history queries
+    open only partitions of asked indexes and dates.
+    """
+    
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+    
+    @staticmethod
+    def schema() -> "pa.Schema":
+        """
+        Method returns the schema of result files, a row per passed ticker
+        with parameters of its scan. Index and scan date are partition fields.
+        """
+        import pyarrow as pa
+        
+        return pa.schema([
+            ("run_id", pa.string()),
+            ("written_at", pa.timestamp("us")),
+            ("start", pa.date32()),
+            ("end", pa.date32()),
+            ("ma_window", pa.int32()),
+            ("ma_kind", pa.string()),
+            ("min_days", pa.int32()),
+            ("ticker", pa.string()),
+            ("rs", pa.float64()),
+            ("rs_ma", pa.float64()),
+            ("days_rs_above_ma", pa.int32()),
+            ("rs_rating", pa.float64())
+        ])
+    
+    def partition_dir(self, index_name: str, scan_date: date) -> Path:
+        """
+        Method returns a directory of results of an index scanned on a date.
+        """
+        return self.directory \
+            / f"index={quote(index_name, safe='')}" \
+            / f"scan_date={scan_date.isoformat()}"
+    
+    def write(
+        self,
+        result: ScanResult,
+        scan_date: date | None = None
+    ) -> Path:
+        """
+        Method appends a scan result as a new file of its partition (today by default).
+        A scan without passed tickers is kept as a row without a ticker,
+        so a day without passed tickers differs from a day without scans.
+        The file is renamed into place, so readers never see a partial file.
+        """
+        import pyarrow as pa
+        from pyarrow import ipc
+        
+        scan_date = scan_date or date.today()
+        frame: DataFrame = result.to_frame()
+        if frame.empty:
+            frame = DataFrame(
+                {column: [np.nan] for column in frame.columns},
+                index=pd.Index([None], name="Ticker")
+            )
+        rows: int = len(frame)
+        run_id: str = uuid.uuid4().hex
+        table = pa.table(
+            {
+                "run_id": [run_id] * rows,
+                "written_at": [datetime.now()] * rows,
+                "start": [pd.Timestamp(result.period[0]).date()] * rows,
+                "end": [pd.Timestamp(result.period[1]).date()] * rows,
+                "ma_window": [result.ma_window] * rows,
+                "ma_kind": [result.ma_kind] * rows,
+                "min_days": [result.days_rs_holds_above_ma] * rows,
+                "ticker": list(frame.index),
+                "rs": frame["rs"].to_numpy(dtype=float),
+                "rs_ma": frame["rs_ma"].to_numpy(dtype=float),
+                "days_rs_above_ma": pa.array(
+                    frame["days_rs_above_ma"].to_numpy(dtype=float),
+                    type=pa.int32(),
+                    from_pandas=True
+                ),
+                "rs_rating": frame["rs_rating"].to_numpy(dtype=float)
+            },
+            schema=self.schema()
+        )
+        
+        partition_dir: Path = self.partition_dir(index_name=result.index_name, scan_date=scan_date)
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        file_name: str = f"{run_id}.arrow"
+        # Files with a leading dot are skipped by readers until they are renamed.
+        temp_path: Path = partition_dir / f".{file_name}"
+        with ipc.new_file(str(temp_path), table.schema) as writer:
+            writer.write_table(table)
+        result_path: Path = partition_dir / file_name
+        temp_path.replace(result_path)
+        
+        return result_path
+    
+    def read(
+        self,
+        index_name: str | None = None,
+        since: date | None = None,
+        until: date | None = None
+    ) -> "pa.Table":
+        """
+        Method returns stored results with "index" and "scan_date" columns,
+        optionally of an index and scan dates [since, until].
+        Files are memory-mapped, so columns are read without copying.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+        
+        partitioning = ds.partitioning(
+            pa.schema([("index", pa.string()), ("scan_date", pa.date32())]),
+            flavor="hive"
+        )
+        if not self.directory.exists():
+            return self.schema().empty_table() \
+                .append_column("index", pa.array([], pa.string())) \
+                .append_column("scan_date", pa.array([], pa.date32()))
+        
+        dataset = ds.dataset(
+            str(self.directory),
+            schema=self.schema().append(pa.field("index", pa.string()))
+                .append(pa.field("scan_date", pa.date32())),
+            format="ipc",
+            partitioning=partitioning,
+            filesystem=fs.LocalFileSystem(use_mmap=True)
+        )
+        conditions: list = []
+        if index_name is not None:
+            conditions.append(ds.field("index") == index_name)
+        if since is not None:
+            conditions.append(ds.field("scan_date") >= pd.Timestamp(since).date())
+        if until is not None:
+            conditions.append(ds.field("scan_date") <= pd.Timestamp(until).date())
+        
+        scan_filter = None
+        for condition in conditions:
+            scan_filter = condition if scan_filter is None else scan_filter & condition
+        
+        return dataset.to_table(filter=scan_filter)
+    
+    def passed_by_day(
+        self,
+        index_name: str,
+        days: int = 30,
+        as_of: date | None = None,
+        **parameters: Any
+    ) -> Series:
+        """
+        Method returns tickers passed scans of an index on every scan date of
+        the last days calendar days up to as_of (today by default), e.g.
+        "which tickers passed on each of the last 30 days", without rerunning scans.
+        Scans are selected by parameters, e.g. ma_window=21, min_days=5,
+        the latest scan of a date is taken.
+        """
+        as_of = pd.Timestamp(as_of or date.today()).date()
+        results: DataFrame = self.read(
+            index_name=index_name,
+            since=as_of - timedelta(days=days - 1),
+            until=as_of
+        ).to_pandas()
+        for parameter, value in parameters.items():
+            results = results[results[parameter] == value]
+        
+        last_runs: Series = results \
+            .sort_values("written_at", kind="stable") \
+            .groupby("scan_date")["run_id"] \
+            .last()
+        results = results[results["run_id"].isin(last_runs)]
+        
+        return results \
+            .groupby("scan_date")["ticker"] \
+            .agg(lambda tickers: sorted(tickers.dropna())) \
+            .rename("tickers")
+
+
+class TradingCalendar:
+    """
+    Class keeps trading sessions and holidays of the New York Stock Exchange,
+    precomputed locally from holiday rules and known special closures.
+    Sessions of a year range are computed once per process and shared by instances.
+    """
+    
+    # Unscheduled closures: national days of mourning, 9/11 and hurricane Sandy.
+    SPECIAL_CLOSURES: list[str] = [
+        "1994-04-27", "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",
+        "2004-06-11", "2007-01-02", "2012-10-29", "2012-10-30", "2018-12-05",
+        "2025-01-09"
+    ]
+    _sessions_cache: dict[tuple[int, int], tuple[pd.DatetimeIndex, pd.DatetimeIndex]] = {}
+    
+    def __init__(
+        self,
+        first_year: int = 1990,
+        last_year: int = 2035
+    ):
+        self.first_year = first_year
+        self.last_year = last_year
+        if (first_year, last_year) not in self._sessions_cache:
+            holidays = pd.DatetimeIndex(sorted(
+                holiday
+                for year in range(first_year, last_year + 1)
+                for holiday in self.year_holidays(year=year)
+            ) + [
+                pd.Timestamp(closure) for closure in self.SPECIAL_CLOSURES
+                if first_year <= pd.Timestamp(closure).year <= last_year
+            ]).sort_values()
+            days: np.ndarray = np.arange(
+                np.datetime64(f"{first_year}-01-01"),
+                np.datetime64(f"{last_year + 1}-01-01")
+            )
+            is_session: np.ndarray = np.is_busday(
+                days,
+                holidays=holidays.to_numpy(dtype="datetime64[D]")
+            )
+            self._sessions_cache[(first_year, last_year)] = (
+                pd.DatetimeIndex(days[is_session].astype("datetime64[ns]")),
+                holidays
+            )
+        self.sessions, self.holidays = self._sessions_cache[(first_year, last_year)]
+    
+    @staticmethod
+    def easter(year: int) -> date:
+        """
+        Method returns the Gregorian easter sunday (anonymous Gregorian algorithm).
+        """
+        a, b, c = year % 19, year // 100, year % 100
+        d, e = divmod(b, 4)
+        g = (8 * b + 13) // 25
+        h = (19 * a + b - d - g + 15) % 30
+        i, k = divmod(c, 4)
+        l = (32 + 2 * e + 2 * i - h - k) % 7
+        m = (a + 11 * h + 19 * l) // 433
+        month, day = divmod(h + l - 7 * m + 90, 25)
+        
+        return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+    
+    @staticmethod
+    def observed(holiday: date) -> date:
+        """
+        Method moves a holiday on saturday to friday and on sunday to monday.
+        """
+        if holiday.weekday() == 5:
+            return holiday - timedelta(days=1)
+        if holiday.weekday() == 6:
+            return holiday + timedelta(days=1)
+        return holiday
+    
+    @staticmethod
+    def nth_weekday(year: int, month: int, weekday: int, nth: int) -> date:
+        """
+        Method returns the nth weekday of a month, the last one for nth=-1.
+        """
+        if nth > 0:
+            first_day = date(year, month, 1)
+            return first_day + timedelta(days=(weekday - first_day.weekday()) % 7 + 7 * (nth - 1))
+        
+        last_day = date(year, month + 1, 1) - timedelta(days=1) if month < 12 \
+            else date(year, 12, 31)
+        return last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+    
+    @classmethod
+    def year_holidays(cls, year: int) -> list[Timestamp]:
+        """
+        Method returns regular exchange holidays of a year falling on weekdays.
+        """
+        holidays: list[date] = [
+            cls.nth_weekday(year=year, month=2, weekday=0, nth=3), # Washington's birthday
+            cls.easter(year=year) - timedelta(days=2), # Good friday
+            cls.nth_weekday(year=year, month=5, weekday=0, nth=-1), # Memorial day
+            cls.observed(holiday=date(year, 7, 4)),
+            cls.nth_weekday(year=year, month=9, weekday=0, nth=1), # Labor day
+            cls.nth_weekday(year=year, month=11, weekday=3, nth=4), # Thanksgiving
+            cls.observed(holiday=date(year, 12, 25))
+        ]
+        # New year's day on saturday is not moved to the previous year.
+        if date(year, 1, 1).weekday() != 5:
+            holidays.append(cls.observed(holiday=date(year, 1, 1)))
+        if year >= 1998:
+            holidays.append(cls.nth_weekday(year=year, month=1, weekday=0, nth=3)) # MLK day
+        if year >= 2022:
+            holidays.append(cls.observed(holiday=date(year, 6, 19))) # Juneteenth
+        
+        return [pd.Timestamp(holiday) for holiday in holidays]
+    
+    def is_session(self, days: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Method marks trading sessions among days.
+        """
+        return pd.DatetimeIndex(days).normalize().isin(self.sessions)
+    
+    def sessions_in(
+        self,
+        start: datetime,
+        end: datetime
+    ) -> pd.DatetimeIndex:
+        """
+        Method returns sessions of [start, end).
+        """
+        start_row, end_row = self.sessions.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        
+        return self.sessions[start_row:end_row]
+    
+    def sessions_back(
+        self,
+        day: datetime,
+        sessions_count: int
+    ) -> Timestamp:
+        """
+        Method returns the session sessions_count sessions before the first
+        session on or after a day, e.g. the start of a ma warm-up.
+        """
+        day_row: int = self.sessions.searchsorted(pd.Timestamp(day))
+        if day_row - sessions_count < 0:
+            raise ValueError(f"Sessions before {self.sessions[0].date()} are not known.")
+        
+        return self.sessions[day_row - sessions_count]
+
+
+class StageRecorder:
+    """
+    Class records wall time, peak memory and input and output sizes of pipeline stages
+    and writes them as one json record per run.
+    A disabled recorder returns a shared no-op stage, so instrumented code costs
+    nothing when it is off. Memory is traced only when trace_memory is set.
+    One stage can be profiled with cProfile, its stats are dumped to profile_dir.
+    """
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        trace_memory: bool = True,
+        profile_stage: str | None = None,
+        profile_dir: str | Path = "."
+    ):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profile_dir = Path(profile_dir)
+        
+        self.run_id: str = uuid.uuid4().hex
+        self.started_at: datetime = datetime.now()
+        self.stages: list[dict[str, Any]] = []
+        self.profile_paths: list[Path] = []
+        # Absolute traced peaks of open stages, a nested stage resets the peak.
+        self._open_peaks: list[int] = []
+    
+    def stage(self, name: str, **counts: int) -> "_RecordedStage | _DisabledStage":
+        """
+        Method returns a context manager recording a stage.
+        Counts such as input tickers and rows are passed here,
+        output counts are set on the entered stage.
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        
+        return _RecordedStage(recorder=self, name=name, counts=counts)
+    
+    def to_record(self) -> dict[str, Any]:
+        """
+        Method returns the run as a json serializable record.
+        """
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(sum(
+                stage["seconds"] for stage in self.stages if stage["depth"] == 0
+            ), 6),
+            "stages": self.stages,
+            "profiles": [str(path) for path in self.profile_paths]
+        }
+    
+    def write(self, path: str | Path, **run_info: Any) -> None:
+        """
+        Method appends the run record with extra run info as a json line to a file.
+        """
+        if not self.enabled:
+            return
+        
+        with open(path, "a") as run_log:
+            run_log.write(json.dumps({**run_info, **self.to_record()}, default=str) + "\n")
+
+
+class _RecordedStage:
+    """
+    Class measures one stage of a StageRecorder.
+    """
+    
+    def __init__(self, recorder: StageRecorder, name: str, counts: dict[str, int]):
+        self.recorder = recorder
+        self.record: dict[str, Any] = {"name": name, **counts}
+        self.profiler: cProfile.Profile | None = None
+    
+    def set(self, **counts: int) -> None:
+        """
+        Method records output counts of the stage.
+        """
+        self.record.update(counts)
+    
+    def __enter__(self) -> "_RecordedStage":
+        recorder = self.recorder
+        self.record["depth"] = len(recorder._open_peaks)
+        recorder.stages.append(self.record)
+        
+        if recorder.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            else:
+                self.started_tracing = False
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            if recorder._open_peaks:
+                recorder._open_peaks[-1] = max(recorder._open_peaks[-1], peak_bytes)
+            tracemalloc.reset_peak()
+            self.start_bytes: int = current_bytes
+        recorder._open_peaks.append(0)
+        
+        if self.record["name"] == recorder.profile_stage:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started: float = time.perf_counter()
+        
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.record["seconds"] = round(time.perf_counter() - self.started, 6)
+        recorder = self.recorder
+        
+        if self.profiler is not None:
+            self.profiler.disable()
+            recorder.profile_dir.mkdir(parents=True, exist_ok=True)
+            profile_path = recorder.profile_dir / (
+                f"{self.record['name']}-{recorder.run_id}-{len(recorder.profile_paths)}.prof"
+            )
+            self.profiler.dump_stats(profile_path)
+            recorder.profile_paths.append(profile_path)
+        
+        nested_peak_bytes: int = recorder._open_peaks.pop()
+        if recorder.trace_memory:
+            peak_bytes: int = max(tracemalloc.get_traced_memory()[1], nested_peak_bytes)
+            self.record["peak_mb"] = round((peak_bytes - self.start_bytes) / 2 ** 20, 3)
+            if recorder._open_peaks:
+                recorder._open_peaks[-1] = max(recorder._open_peaks[-1], peak_bytes)
+            if self.started_tracing:
+                tracemalloc.stop()
+        
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+
+
+class _DisabledStage:
+    """
+    Class is a no-op stage of a disabled StageRecorder.
+    """
+    
+    def set(self, **counts: int) -> None:
+        pass
+    
+    def __enter__(self) -> "_DisabledStage":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class Screener:
+    """
+    Class runs scans of indexes without user interaction.
+    Loaded price panels, rs and rs moving averages are kept between scans,
+    so scans over an already loaded period do not fetch or recompute them.
+    Panels keep trading sessions only, so ma windows and warm-ups count sessions.
+    Stages are measured by a recorder, which is disabled by default.
+    """
+    
+    def __init__(
+        self,
+        price_source: PriceSource,
+        get_tickers: Callable[[str, datetime], list[str]],
+        market_tickers: dict[str, str], # index: benchmark ticker
+        dtype: type = np.float64,
+        recorder: StageRecorder | None = None,
+        calendar: TradingCalendar | None = None,
+        get_groups: Callable[[str, datetime, str], dict[str, str]] | None = None,
+        market_caps: Series | None = None
+    ):
+        self.price_source = price_source
+        self.get_tickers = get_tickers
+        self.market_tickers = market_tickers
+        self.get_groups = get_groups # (index, as_of, "sector" | "industry") -> {ticker: group}
+        self.market_caps = market_caps
+        self.dtype = dtype
+        self.calendar = calendar or TradingCalendar()
+        self.recorder = recorder or StageRecorder(enabled=False)
+        
+        self.metrics = MetricsCalculator()
+        self.panels: dict[str, tuple[tuple[Timestamp, Timestamp], PricePanel]] = {}
+        self.panel_members: dict[str, list[str]] = {}
+        self.members: dict[tuple[str, Timestamp], list[str]] = {}
+        self.rs_panels: dict[str, PricePanel] = {}
+        self.rs_ma_panels: dict[tuple[str, int, str], PricePanel] = {}
+        self.timeframe_rs_panels: dict[tuple[str, str], PricePanel] = {}
+        self.timeframe_rs_ma_panels: dict[tuple[str, str, int, str], PricePanel] = {}
+        self.crossover_indexes: dict[tuple[str, int, str], CrossoverIndex] = {}
+        self.group_panels: dict[tuple[str, str, bool], PricePanel] = {}
+    
+    def load_panel(
+        self,
+        index_name: str,
+        period: tuple[datetime, datetime],
+        warmup_sessions: int = 0
+    ) -> PricePanel:
+        """
+        Method returns a close prices panel of an index covering a period
+        with warmup_sessions sessions before it, e.g. ma_window sessions for a ma.
+        Tickers are the index constituents as of the period start.
+        A loaded panel of the same constituents is reused, a period outside it
+        reloads the joined period, other constituents reload the period only.
+        """
+        if index_name not in self.market_tickers:
+            raise KeyError(f"Index {index_name} is not valid.")
+        
+        fetch_start: Timestamp = self.calendar.sessions_back(
+            day=period[0],
+            sessions_count=warmup_sessions
+        )
+        fetch_end: Timestamp = pd.Timestamp(period[1])
+        tickers: list[str] = self.get_members(index_name=index_name, as_of=period[0])
+        if index_name in self.panels and self.panel_members[index_name] == tickers:
+            (loaded_start, loaded_end), panel = self.panels[index_name]
+            if loaded_start <= fetch_start and fetch_end <= loaded_end:
+                return panel
+            fetch_start, fetch_end = min(loaded_start, fetch_start), max(loaded_end, fetch_end)
+        
+        tickers = tickers + [self.market_tickers[index_name]] # For rs calculating.
+        with self.recorder.stage("prices", input_tickers=len(tickers)) as stage:
+            price_data: DataFrame = self.price_source.get_price_data(
+                tickers=tickers,
+                period=(fetch_start, fetch_end),
+                fields=["Close"]
+            )
+            # Bars out of sessions, e.g. of foreign tickers on exchange holidays, are dropped.
+            price_data = price_data[self.calendar.is_session(price_data.index)]
+            if price_data.empty:
+                raise ValueError(f"No price data for {index_name}.")
+            panel = PricePanel.from_price_data(
+                price_data=price_data,
+                fields=["Close"],
+                dtype=self.dtype
+            )
+            stage.set(output_tickers=len(panel.tickers), rows=len(panel))
+        
+        self.panels[index_name] = ((fetch_start, fetch_end), panel)
+        self.panel_members[index_name] = tickers[:-1]
+        self.drop_metrics(index_name=index_name)
+        
+        return panel
+    
+    def get_members(
+        self,
+        index_name: str,
+        as_of: datetime
+    ) -> list[str]:
+        """
+        Method returns constituents of an index as of a date, read once per date.
+        """
+        members_key: tuple[str, Timestamp] = (index_name, pd.Timestamp(as_of).normalize())
+        if members_key not in self.members:
+            with self.recorder.stage("constituents") as stage:
+                self.members[members_key] = list(self.get_tickers(index_name, as_of))
+                stage.set(output_tickers=len(self.members[members_key]))
+        
+        return self.members[members_key]
+    
+    def drop_metrics(self, index_name: str) -> None:
+        """
+        Method drops computed metrics of an index after its panel has changed.
+        """
+        self.rs_panels.pop(index_name, None)
+        for metrics_panels in (
+            self.rs_ma_panels,
+            self.timeframe_rs_panels,
+            self.timeframe_rs_ma_panels,
+            self.crossover_indexes,
+            self.group_panels
+        ):
+            for metrics_key in [key for key in metrics_panels if key[0] == index_name]:
+                del metrics_panels[metrics_key]
+    
+    def refresh_panel(
+        self,
+        index_name: str,
+        end: datetime | None = None
+    ) -> Timestamp | None:
+        """
+        Method appends bars newer than the loaded panel of an index until end
+        (tomorrow by default), only these bars are fetched.
+        The last loaded bar is fetched again, since it can be an unfinished day.
+        Returns the first changed date or None when no bars were fetched.
+        Metrics of the index are recomputed by the next scan.
+        """
+        (loaded_start, loaded_end), panel = self.panels[index_name]
+        end = pd.Timestamp(end) if end is not None \
+            else pd.Timestamp(date.today()) + timedelta(days=1)
+        last_date: Timestamp = panel.dates[-1]
+        
+        with self.recorder.stage("prices", input_tickers=len(panel.tickers)) as stage:
+            price_data: DataFrame = self.price_source.get_price_data(
+                tickers=list(panel.tickers),
+                period=(last_date, end),
+                fields=["Close"]
+            )
+            price_data = price_data[self.calendar.is_session(price_data.index)]
+            stage.set(rows=len(price_data))
+        if price_data.empty:
+            return None
+        
+        new_close: DataFrame = price_data["Close"].reindex(columns=panel.tickers)
+        kept_panel: PricePanel = panel.loc_dates(end=last_date)
+        self.panels[index_name] = (
+            (loaded_start, max(loaded_end, end)),
+            PricePanel(
+                fields={
+                    "Close": np.concatenate([
+                        kept_panel.fields["Close"],
+                        new_close.to_numpy(dtype=self.dtype)
+                    ])
+                },
+                dates=kept_panel.dates.append(pd.DatetimeIndex(new_close.index)),
+                tickers=panel.tickers
+            )
+        )
+        self.drop_metrics(index_name=index_name)
+        
+        return last_date
+    
+    def get_rs(self, index_name: str) -> DataFrame:
+        """
+        Method returns rs of the loaded panel of an index, computed once per panel.
+        """
+        if index_name not in self.rs_panels:
+            _, panel = self.panels[index_name]
+            with self.recorder.stage("rs", input_tickers=len(panel.tickers), rows=len(panel)):
+                self.rs_panels[index_name] = self.metrics.rs_on_data(
+                    stocks_data=panel,
+                    market_ticker=self.market_tickers[index_name]
+                )
+        
+        return self.rs_panels[index_name]["rs"]
+    
+    def get_timeframe_metrics(
+        self,
+        index_name: str,
+        ma_window: int,
+        timeframe: str,
+        ma_kind: str = "sma"
+    ) -> PricePanel:
+        """
+        Method returns "weekly" or "monthly" bars of the loaded panel of an index
+        with "rs" and "rs_ma" fields. Ma window is counted in bars.
+        Bars are resampled from the daily panel, so no prices are fetched,
+        and bars with rs are kept per timeframe like daily rs.
+        """
+        if (index_name, timeframe) not in self.timeframe_rs_panels:
+            _, panel = self.panels[index_name]
+            with self.recorder.stage("resample", input_tickers=len(panel.tickers), rows=len(panel)):
+                bars: PricePanel = self.metrics.resample(stocks_data=panel, timeframe=timeframe)
+            with self.recorder.stage("rs", input_tickers=len(bars.tickers), rows=len(bars)):
+                self.timeframe_rs_panels[(index_name, timeframe)] = self.metrics.rs_on_data(
+                    stocks_data=bars,
+                    market_ticker=self.market_tickers[index_name]
+                )
+        
+        if (index_name, timeframe, ma_window, ma_kind) not in self.timeframe_rs_ma_panels:
+            rs_panel: PricePanel = self.timeframe_rs_panels[(index_name, timeframe)]
+            with self.recorder.stage("rs_ma", input_tickers=len(rs_panel.tickers), rows=len(rs_panel)):
+                self.timeframe_rs_ma_panels[(index_name, timeframe, ma_window, ma_kind)] = \
+                    self.metrics.rs_ma_on_data(
+                        stocks_data=rs_panel,
+                        ma_window=ma_window,
+                        ma_kind=ma_kind
+                    )
+        
+        return self.timeframe_rs_ma_panels[(index_name, timeframe, ma_window, ma_kind)]
+    
+    def get_metrics(
+        self,
+        index_name: str,
+        ma_window: int,
+        timeframe: str = "daily",
+        ma_kind: str = "sma"
+    ) -> PricePanel:
+        """
+        Method returns the loaded panel of an index with "rs" and "rs_ma" fields.
+        Rs is shared between ma windows and kinds, both are computed once per loaded panel.
+        """
+        if timeframe != "daily":
+            return self.get_timeframe_metrics(
+                index_name=index_name,
+                ma_window=ma_window,
+                timeframe=timeframe,
+                ma_kind=ma_kind
+            )
+        
+        self.get_rs(index_name=index_name)
+        if (index_name, ma_window, ma_kind) not in self.rs_ma_panels:
+            rs_panel: PricePanel = self.rs_panels[index_name]
+            with self.recorder.stage(
+                "rs_ma",
+                input_tickers=len(rs_panel.tickers),
+                rows=len(rs_panel)
+            ):
+                self.rs_ma_panels[(index_name, ma_window, ma_kind)] = self.metrics.rs_ma_on_data(
+                    stocks_data=rs_panel,
+                    ma_window=ma_window,
+                    ma_kind=ma_kind
+                )
+        
+        return self.rs_ma_panels[(index_name, ma_window, ma_kind)]
+    
+    def get_crossovers(
+        self,
+        index_name: str,
+        ma_window: int,
+        ma_kind: str = "sma"
+    ) -> CrossoverIndex:
+        """
+        Method returns rs and ma crossovers of the loaded panel of an index,
+        found once per panel, so later queries over recent days are lookups.
+        """
+        if (index_name, ma_window, ma_kind) not in self.crossover_indexes:
+            metrics_data: PricePanel = self.get_metrics(
+                index_name=index_name,
+                ma_window=ma_window,
+                ma_kind=ma_kind
+            )
+            with self.recorder.stage(
+                "crossovers",
+                input_tickers=len(metrics_data.tickers),
+                rows=len(metrics_data)
+            ):
+                self.crossover_indexes[(index_name, ma_window, ma_kind)] = \
+                    CrossoverIndex.from_data(stocks_data=metrics_data)
+        
+        return self.crossover_indexes[(index_name, ma_window, ma_kind)]
+    
+    def get_group_metrics(
+        self,
+        index_name: str,
+        group_level: str = "sector",
+        cap_weighted: bool = False
+    ) -> PricePanel:
+        """
+        Method returns the loaded panel of an index with "group_rs" and "rs_vs_group"
+        fields of GICS "sector" or "industry" (sub-industry) groups, computed once per panel.
+        Groups are taken as of the last loaded date, composites are weighted by
+        market caps of the screener when cap_weighted.
+        """
+        if self.get_groups is None:
+            raise ValueError("Screener has no ticker groups.")
+        if cap_weighted and self.market_caps is None:
+            raise ValueError("Screener has no market caps.")
+        
+        if (index_name, group_level, cap_weighted) not in self.group_panels:
+            _, panel = self.panels[index_name]
+            groups: dict[str, str] = self.get_groups(index_name, panel.dates[-1], group_level)
+            with self.recorder.stage(
+                "group_rs",
+                input_tickers=len(panel.tickers),
+                rows=len(panel)
+            ) as stage:
+                self.group_panels[(index_name, group_level, cap_weighted)] = \
+                    self.metrics.group_rs_on_data(
+                        stocks_data=panel,
+                        groups=groups,
+                        market_ticker=self.market_tickers[index_name],
+                        market_caps=self.market_caps if cap_weighted else None
+                    )
+                stage.set(groups=len(set(groups.values())))
+        
+        return self.group_panels[(index_name, group_level, cap_weighted)]
+    
+    def run_scan(
+        self,
+        index_name: str,
+        start: datetime,
+        end: datetime,
+        ma_window: int,
+        min_days: int,
+        timeframes: dict[str, tuple[int, int]] | None = None,
+        ma_kind: str = "sma",
+        crossed_up_days: int | None = None,
+        group_level: str | None = None,
+        cap_weighted: bool = False
+    ) -> ScanResult:
+        """
+        Method scans an index for stocks which rs has grown over a period [start, end)
+        and has been held above its moving average at least min_days days.
+        Timeframes {"weekly" | "monthly": (ma_window, min_bars)} additionally require
+        the same conditions on longer bars resampled from the same daily panel.
+        Ma kind is one of MetricsCalculator.MA_KINDS for all timeframes.
+        With crossed_up_days rs must also have crossed up its ma during
+        the last crossed_up_days days of the period.
+        With a group level ("sector" or "industry") the rs of the group composite
+        against the index and the rs of the stock against its group must also grow.
+        """
+        timeframes = timeframes or {}
+        warmup_sessions: int = max(
+            [ma_window] + [
+                # A bar more than the window, since the first bar can be partial.
+                (timeframe_ma_window + 1) * MetricsCalculator.TIMEFRAMES[timeframe][1]
+                for timeframe, (timeframe_ma_window, _) in timeframes.items()
+            ]
+        )
+        self.load_panel(
+            index_name=index_name,
+            period=(start, end),
+            warmup_sessions=warmup_sessions
+        )
+        metrics_data: PricePanel = self.get_metrics(
+            index_name=index_name,
+            ma_window=ma_window,
+            ma_kind=ma_kind
+        )
+        
+        # Cutting the warm-up days for ma calculating.
+        stocks_data: PricePanel = metrics_data.loc_dates(start=start, end=end)
+        
+        filter_pipeline = FilterPipeline() \
+            .add_filter(
+                name="rs_grown",
+                mask_filter=DataFilter.rs_grown_mask
+            ) \
+            .add_filter(
+                name="rs_crossed_ma",
+                mask_filter=DataFilter.rs_crossed_ma_mask,
+                days_rs_holds_above_ma=min_days
+            )
+        for timeframe, (timeframe_ma_window, min_bars) in timeframes.items():
+            timeframe_data: PricePanel = self.get_timeframe_metrics(
+                index_name=index_name,
+                ma_window=timeframe_ma_window,
+                timeframe=timeframe,
+                ma_kind=ma_kind
+            ).loc_dates(start=start, end=end)
+            filter_pipeline \
+                .add_filter(
+                    name=f"rs_grown_{timeframe}",
+                    mask_filter=DataFilter.rs_grown_mask,
+                    filter_data=timeframe_data
+                ) \
+                .add_filter(
+                    name=f"rs_crossed_ma_{timeframe}",
+                    mask_filter=DataFilter.rs_crossed_ma_mask,
+                    filter_data=timeframe_data,
+                    days_rs_holds_above_ma=min_bars
+                )
+        if crossed_up_days is not None:
+            filter_pipeline.add_filter(
+                name="rs_crossed_up",
+                mask_filter=self.get_crossovers(
+                    index_name=index_name,
+                    ma_window=ma_window,
+                    ma_kind=ma_kind
+                ).crossed_mask,
+                days=crossed_up_days
+            )
+        group_data: PricePanel | None = None
+        if group_level is not None:
+            group_data = self.get_group_metrics(
+                index_name=index_name,
+                group_level=group_level,
+                cap_weighted=cap_weighted
+            ).loc_dates(start=start, end=end)
+            filter_pipeline \
+                .add_filter(
+                    name=f"{group_level}_rs_grown",
+                    mask_filter=DataFilter.rs_grown_mask,
+                    filter_data=group_data,
+                    field="group_rs"
+                ) \
+                .add_filter(
+                    name=f"rs_vs_{group_level}_grown",
+                    mask_filter=DataFilter.rs_grown_mask,
+                    filter_data=group_data,
+                    field="rs_vs_group"
+                )
+        with self.recorder.stage(
+            "filters",
+            input_tickers=len(stocks_data.tickers),
+            rows=len(stocks_data)
+        ) as stage:
+            mask: Series = filter_pipeline.get_mask(stocks_data=stocks_data)
+            tickers: list[str] = list(mask.index[mask])
+            stage.set(output_tickers=len(tickers))
+        
+        # Tickers are rated by the rs growth over the period against the whole index.
+        rs_data: DataFrame = stocks_data["rs"].drop(columns=self.market_tickers[index_name])
+        rs_rating: Series = RsRanker.growth_ratings(
+            rs_growth=rs_data.iloc[-1] / rs_data.iloc[0] - 1
+        )
+        
+        return ScanResult(
+            index_name=index_name,
+            period=(start, end),
+            ma_window=ma_window,
+            days_rs_holds_above_ma=min_days,
+            tickers=tickers,
+            rs=stocks_data["rs"].iloc[-1][tickers],
+            days_rs_above_ma=DataFilter.days_rs_above_ma(stocks_data=stocks_data)[tickers],
+            removed_tickers=filter_pipeline.removed_tickers,
+            rs_rating=rs_rating[tickers],
+            ma_kind=ma_kind,
+            group_rs=Series(dtype=float) if group_data is None
+                else group_data["group_rs"].iloc[-1][tickers],
+            rs_ma=stocks_data["rs_ma"].iloc[-1][tickers]
+        )
+    
+    def sweep(
+        self,
+        index_name: str,
+        periods: list[tuple[datetime, datetime]],
+        ma_windows: list[int],
+        min_days_list: list[int]
+    ) -> DataFrame:
+        """
+        Method scans an index for every combination of periods, ma windows
+        and min days over one loaded panel.
+        Rs is computed once, rolling means of all windows come from one cumulative
+        sum pass and streaks are computed once per period and window.
+        Returns a tidy table with a row per passed ticker and parameter set.
+        """
+        self.load_panel(
+            index_name=index_name,
+            period=(
+                min(pd.Timestamp(start) for start, _ in periods),
+                max(pd.Timestamp(end) for _, end in periods)
+            ),
+            warmup_sessions=max(ma_windows)
+        )
+        rs_data: DataFrame = self.get_rs(index_name=index_name)
+        rs_values: np.ndarray = rs_data.to_numpy(dtype=float)
+        with self.recorder.stage("rs_ma", input_tickers=rs_values.shape[1], rows=len(rs_values)):
+            rs_ma_values: dict[int, np.ndarray] = self.metrics.rolling_means(
+                values=rs_values,
+                windows=list(ma_windows)
+            )
+        tickers: np.ndarray = rs_data.columns.to_numpy()
+        
+        columns: list[str] = [
+            "start", "end", "ma_window", "min_days", "ticker", "rs", "days_rs_above_ma"
+        ]
+        results: dict[str, list] = {column: [] for column in columns}
+        with self.recorder.stage("filters", input_tickers=len(tickers)) as stage:
+            for start, end in periods:
+                start_row, end_row = rs_data.index.searchsorted(
+                    [pd.Timestamp(start), pd.Timestamp(end)]
+                )
+                if end_row <= start_row:
+                    continue
+                
+                period_rs: np.ndarray = rs_values[start_row:end_row]
+                has_rs_grown: np.ndarray = period_rs[-1] > period_rs[0]
+                for ma_window in ma_windows:
+                    streaks: np.ndarray = DataFilter.rs_above_ma_streaks(
+                        rs_values=period_rs,
+                        ma_values=rs_ma_values[ma_window][start_row:end_row]
+                    )
+                    for min_days in min_days_list:
+                        passed: np.ndarray = np.flatnonzero(has_rs_grown & (streaks >= min_days))
+                        results["start"].append(np.full(len(passed), pd.Timestamp(start)))
+                        results["end"].append(np.full(len(passed), pd.Timestamp(end)))
+                        results["ma_window"].append(np.full(len(passed), ma_window))
+                        results["min_days"].append(np.full(len(passed), min_days))
+                        results["ticker"].append(tickers[passed])
+                        results["rs"].append(period_rs[-1][passed])
+                        results["days_rs_above_ma"].append(streaks[passed])
+            stage.set(output_rows=sum(len(passed) for passed in results["ticker"]))
+        
+        if not results["ticker"]:
+            return DataFrame(columns=columns)
+        
+        return DataFrame({
+            column: np.concatenate(column_values)
+            for column, column_values in results.items()
+        })
+    
+    @staticmethod
+    def scan_columns(
+        close_prices: np.ndarray,
+        column_range: tuple[int, int],
+        benchmark_columns: list[int],
+        period_rows: tuple[int, int],
+        ma_window: int
+    ) -> list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Method computes rs against every benchmark, its moving average and the scan
+        metrics for a range of close prices columns.
+        Returns per benchmark: whether rs has grown, the streak, the last rs,
+        the rs growth over the period and the last rs ma.
+        """
+        start_row, end_row = period_rows
+        shard_prices: np.ndarray = close_prices[:, column_range[0]:column_range[1]]
+        
+        results: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        for benchmark_column in benchmark_columns:
+            rs_values: np.ndarray = np.round(
+                shard_prices / close_prices[:, [benchmark_column]],
+                2
+            )
+            rs_ma_values: np.ndarray = MetricsCalculator.rolling_means(
+                values=rs_values,
+                windows=[ma_window]
+            )[ma_window]
+            period_rs: np.ndarray = rs_values[start_row:end_row]
+            results.append((
+                period_rs[-1] > period_rs[0],
+                DataFilter.rs_above_ma_streaks(
+                    rs_values=period_rs,
+                    ma_values=rs_ma_values[start_row:end_row]
+                ),
+                period_rs[-1],
+                period_rs[-1] / period_rs[0] - 1,
+                # A copy, so the ma of a chunk is freed with the chunk.
+                rs_ma_values[end_row - 1].copy()
+            ))
+        
+        return results
+    
+    @classmethod
+    def scan_shared_columns(
+        cls,
+        shared_name: str,
+        shape: tuple[int, int],
+        column_range: tuple[int, int],
+        benchmark_columns: list[int],
+        period_rows: tuple[int, int],
+        ma_window: int
+    ) -> list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Method runs scan_columns in a worker process over close prices kept in shared memory.
+        """
+        shared_prices = SharedMemory(name=shared_name)
+        try:
+            close_prices: np.ndarray = np.ndarray(shape, dtype=np.float64, buffer=shared_prices.buf)
+            return cls.scan_columns(
+                close_prices=close_prices,
+                column_range=column_range,
+                benchmark_columns=benchmark_columns,
+                period_rows=period_rows,
+                ma_window=ma_window
+            )
+        finally:
+            shared_prices.close()
+    
+    def streaming_scan(
+        self,
+        panel_directory: str | Path,
+        index_name: str,
+        start: datetime,
+        end: datetime,
+        ma_window: int,
+        min_days: int,
+        chunk_size: int = 500
+    ) -> ScanResult:
+        """
+        Method scans all tickers of a saved close prices panel (see PricePanel.save)
+        in column chunks. The panel is memory-mapped and only a chunk with its rs
+        and rs ma is in memory at once, so peak memory depends on the chunk size,
+        not on the universe. Only passed tickers and a rs growth per ticker are kept.
+        The result is the same as of run_scan over the panel.
+        NB! The panel must contain the index benchmark and its ma warm-up.
+        """
+        panel: PricePanel = PricePanel.load(directory=panel_directory, fields=["Close"], mmap=True)
+        close_prices: np.ndarray = panel.fields["Close"]
+        market_ticker: str = self.market_tickers[index_name]
+        benchmark_column: int = panel.tickers.get_loc(market_ticker)
+        period_rows: tuple[int, int] = tuple(
+            panel.dates.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        )
+        
+        passed_columns: list[np.ndarray] = []
+        passed_rs: list[np.ndarray] = []
+        passed_rs_ma: list[np.ndarray] = []
+        passed_streaks: list[np.ndarray] = []
+        rs_growth: np.ndarray = np.empty(len(panel.tickers))
+        removed_tickers: dict[str, int] = {"rs_grown": 0, "rs_crossed_ma": 0}
+        with self.recorder.stage(
+            "scan",
+            input_tickers=len(panel.tickers),
+            rows=len(panel),
+            chunk_size=chunk_size
+        ) as stage:
+            for first_column in range(0, len(panel.tickers), chunk_size):
+                column_range: tuple[int, int] = (
+                    first_column,
+                    min(first_column + chunk_size, len(panel.tickers))
+                )
+                [(has_rs_grown, streaks, last_rs, chunk_growth, last_rs_ma)] = self.scan_columns(
+                    close_prices=close_prices,
+                    column_range=column_range,
+                    benchmark_columns=[benchmark_column],
+                    period_rows=period_rows,
+                    ma_window=ma_window
+                )
+                # The benchmark is not a ticker of the scan.
+                is_ticker: np.ndarray = np.arange(*column_range) != benchmark_column
+                has_rs_crossed_ma: np.ndarray = streaks >= min_days
+                passed: np.ndarray = has_rs_grown & has_rs_crossed_ma & is_ticker
+                
+                rs_growth[column_range[0]:column_range[1]] = chunk_growth
+                removed_tickers["rs_grown"] += int((~has_rs_grown & is_ticker).sum())
+                removed_tickers["rs_crossed_ma"] += int(
+                    (has_rs_grown & ~has_rs_crossed_ma & is_ticker).sum()
+                )
+                passed_columns.append(first_column + np.flatnonzero(passed))
+                passed_rs.append(last_rs[passed])
+                passed_rs_ma.append(last_rs_ma[passed])
+                passed_streaks.append(streaks[passed])
+            
+            columns: np.ndarray = np.concatenate(passed_columns) if passed_columns \
+                else np.array([], dtype=int)
+            stage.set(output_tickers=len(columns))
+        
+        tickers: list[str] = list(panel.tickers[columns])
+        rs_rating: Series = RsRanker.growth_ratings(
+            rs_growth=Series(rs_growth, index=panel.tickers).drop(market_ticker)
+        )
+        
+        return ScanResult(
+            index_name=index_name,
+            period=(start, end),
+            ma_window=ma_window,
+            days_rs_holds_above_ma=min_days,
+            tickers=tickers,
+            rs=Series(np.concatenate(passed_rs) if passed_rs else [], index=tickers, dtype=float),
+            days_rs_above_ma=Series(
+                np.concatenate(passed_streaks) if passed_streaks else [],
+                index=tickers,
+                dtype=int
+            ),
+            removed_tickers=removed_tickers,
+            rs_rating=rs_rating[tickers],
+            rs_ma=Series(
+                np.concatenate(passed_rs_ma) if passed_rs_ma else [],
+                index=tickers,
+                dtype=float
+            )
+        )
+    
+    def multi_index_scan(
+        self,
+        index_names: list[str],
+        start: datetime,
+        end: datetime,
+        ma_window: int,
+        min_days: int,
+        workers: int = 1,
+        shard_size: int = 250
+    ) -> dict[str, ScanResult]:
+        """
+        Method scans several indexes at once. Every ticker of the constituents union
+        is fetched once and its rs is computed against every index benchmark.
+        With several workers ticker shards are scanned in a process pool,
+        reading close prices from shared memory instead of pickled copies.
+        """
+        with self.recorder.stage("constituents") as stage:
+            tickers_by_index: dict[str, list[str]] = {
+                index_name: list(self.get_tickers(index_name, start))
+                for index_name in index_names
+            }
+            stage.set(output_tickers=sum(len(tickers) for tickers in tickers_by_index.values()))
+        benchmarks: list[str] = [self.market_tickers[index_name] for index_name in index_names]
+        all_tickers: list[str] = list(dict.fromkeys(
+            [ticker for tickers in tickers_by_index.values() for ticker in tickers]
+            + benchmarks
+        ))
+        
+        with self.recorder.stage("prices", input_tickers=len(all_tickers)) as stage:
+            panel: DataFrame = self.price_source.get_price_data(
+                tickers=all_tickers,
+                period=(
+                    self.calendar.sessions_back(day=start, sessions_count=ma_window),
+                    pd.Timestamp(end)
+                ),
+                fields=["Close"]
+            )
+            panel = panel[self.calendar.is_session(panel.index)]
+            stage.set(output_tickers=len(panel.columns.get_level_values(1).unique()), rows=len(panel))
+        close_data: DataFrame = panel["Close"].reindex(columns=all_tickers)
+        close_prices: np.ndarray = np.ascontiguousarray(close_data.to_numpy(dtype=np.float64))
+        period_rows: tuple[int, int] = tuple(
+            close_data.index.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        )
+        benchmark_columns: list[int] = [all_tickers.index(benchmark) for benchmark in benchmarks]
+        column_ranges: list[tuple[int, int]] = [
+            (first_column, min(first_column + shard_size, len(all_tickers)))
+            for first_column in range(0, len(all_tickers), shard_size)
+        ]
+        
+        with self.recorder.stage(
+            "scan",
+            input_tickers=len(all_tickers),
+            rows=len(close_prices),
+            benchmarks=len(benchmarks)
+        ):
+            if workers > 1:
+                shared_prices = SharedMemory(create=True, size=max(close_prices.nbytes, 1))
+                try:
+                    np.ndarray(close_prices.shape, dtype=np.float64, buffer=shared_prices.buf)[:] = close_prices
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        shard_results = list(executor.map(
+                            partial(
+                                self.scan_shared_columns,
+                                shared_prices.name,
+                                close_prices.shape,
+                                benchmark_columns=benchmark_columns,
+                                period_rows=period_rows,
+                                ma_window=ma_window
+                            ),
+                            column_ranges
+                        ))
+                finally:
+                    shared_prices.close()
+                    shared_prices.unlink()
+            else:
+                shard_results = [
+                    self.scan_columns(
+                        close_prices=close_prices,
+                        column_range=column_range,
+                        benchmark_columns=benchmark_columns,
+                        period_rows=period_rows,
+                        ma_window=ma_window
+                    )
+                    for column_range in column_ranges
+                ]
+        
+        results: dict[str, ScanResult] = {}
+        for benchmark_nr, index_name in enumerate(index_names):
+            has_rs_grown, streaks, last_rs, rs_growth, last_rs_ma = (
+                Series(
+                    np.concatenate([shard[benchmark_nr][metric_nr] for shard in shard_results]),
+                    index=all_tickers
+                )[tickers_by_index[index_name]]
+                for metric_nr in range(5)
+            )
+            rs_rating: Series = RsRanker.growth_ratings(rs_growth=rs_growth)
+            has_rs_crossed_ma: Series = streaks >= min_days
+            passed: Series = has_rs_grown & has_rs_crossed_ma
+            tickers: list[str] = list(passed.index[passed])
+            
+            results[index_name] = ScanResult(
+                index_name=index_name,
+                period=(start, end),
+                ma_window=ma_window,
+                days_rs_holds_above_ma=min_days,
+                tickers=tickers,
+                rs=last_rs[tickers],
+                days_rs_above_ma=streaks[tickers],
+                removed_tickers={
+                    "rs_grown": int((~has_rs_grown).sum()),
+                    "rs_crossed_ma": int((has_rs_grown & ~has_rs_crossed_ma).sum())
+                },
+                rs_rating=rs_rating[tickers],
+                rs_ma=last_rs_ma[tickers]
+            )
+        
+        return results
+
+
+class ScreeningService:
+    """
+    Class answers scan queries from a resident screener, so loaded panels and
+    metrics stay in memory between queries. Results are kept in an LRU cache
+    keyed by (index, start, end, ma_window, min_days, ma_kind).
+    Loaded panels are refreshed in the background with new bars only,
+    cached results covering refreshed dates are dropped.
+    """
+    
+    def __init__(
+        self,
+        screener: Screener,
+        cache_size: int = 256,
+        refresh_seconds: float | None = None
+    ):
+        self.screener = screener
+        self.cache_size = cache_size
+        self.refresh_seconds = refresh_seconds
+        
+        self.results: OrderedDict[tuple[str, Timestamp, Timestamp, int, int, str], ScanResult] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Screener caches are not thread safe, scans and refreshes run one at a time.
+        # The results lock is taken within the screener lock, never the other way round.
+        self.screener_lock = threading.Lock()
+        self.results_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.refresh_thread: threading.Thread | None = None
+    
+    def scan(
+        self,
+        index_name: str,
+        start: datetime,
+        end: datetime,
+        ma_window: int,
+        min_days: int,
+        ma_kind: str = "sma"
+    ) -> tuple[ScanResult, bool]:
+        """
+        Method returns a scan result and whether it was taken from the cache.
+        """
+        key = (index_name, pd.Timestamp(start), pd.Timestamp(end), ma_window, min_days, ma_kind)
+        with self.results_lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return self.results[key], True
+        
+        # A result is cached before a refresh can change its panel,
+        # so the refresh drops it if it is outdated.
+        with self.screener_lock:
+            result: ScanResult = self.screener.run_scan(
+                index_name=index_name,
+                start=start,
+                end=end,
+                ma_window=ma_window,
+                min_days=min_days,
+                ma_kind=ma_kind
+            )
+            with self.results_lock:
+                self.misses += 1
+                self.results[key] = result
+                while len(self.results) > self.cache_size:
+                    self.results.popitem(last=False)
+        
+        return result, False
+    
+    def refresh(self, end: datetime | None = None) -> dict[str, Timestamp]:
+        """
+        Method appends new bars to every loaded panel and drops cached results
+        of periods ending after the first changed date.
+        Returns first changed dates of refreshed indexes.
+        """
+        changed_dates: dict[str, Timestamp] = {}
+        with self.screener_lock:
+            for index_name in list(self.screener.panels):
+                first_changed_date = self.screener.refresh_panel(index_name=index_name, end=end)
+                if first_changed_date is not None:
+                    changed_dates[index_name] = first_changed_date
+        
+        with self.results_lock:
+            for key in list(self.results):
+                index_name, _, period_end, *_ = key
+                if index_name in changed_dates and period_end > changed_dates[index_name]:
+                    del self.results[key]
+        
+        return changed_dates
+    
+    def refresh_forever(self) -> None:
+        """
+        Method refreshes loaded panels every refresh_seconds until the service stops.
+        A failed refresh is logged and retried on the next round.
+        """
+        while not self.stopped.wait(timeout=self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Refresh of loaded panels failed: {e}")
+    
+    def start_refreshing(self) -> None:
+        """
+        Method starts background refreshes if refresh_seconds is set.
+        """
+        if self.refresh_seconds is None or self.refresh_thread is not None:
+            return
+        
+        self.refresh_thread = threading.Thread(target=self.refresh_forever, daemon=True)
+        self.refresh_thread.start()
+    
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.refresh_thread is not None:
+            self.refresh_thread.join()
+            self.refresh_thread = None
+    
+    def stats(self) -> dict[str, Any]:
+        """
+        Method returns cache counters and loaded panels.
+        """
+        with self.results_lock:
+            return {
+                "cached_results": len(self.results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "panels": {
+                    index_name: {
+                        "tickers": len(panel.tickers),
+                        "first_date": panel.dates[0].date().isoformat(),
+                        "last_date": panel.dates[-1].date().isoformat()
+                    }
+                    for index_name, (_, panel) in list(self.screener.panels.items())
+                    if len(panel)
+                }
+            }
+    
+    def create_server(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765
+    ) -> ThreadingHTTPServer:
+        """
+        Method creates a local http server of the service, see ScreeningRequestHandler.
+        The server is started by serve_forever().
+        """
+        server = ThreadingHTTPServer((host, port), ScreeningRequestHandler)
+        server.daemon_threads = True
+        server.service = self
+        
+        return server
+
+
+class ScreeningRequestHandler(BaseHTTPRequestHandler):
+    """
+    Class handles http queries of a screening service:
+    GET /scan?index=S%26P%20500&start=2024-01-02&end=2024-03-01&ma_window=21&min_days=5&ma_kind=ema
+    GET /stats
+    Responses are json, errors have an "error" message.
+    """
+    
+    def do_GET(self) -> None:
+        service: ScreeningService = self.server.service
+        url = urlsplit(self.path)
+        query: dict[str, str] = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        
+        if url.path == "/stats":
+            self.send_json(status=200, body=service.stats())
+            return
+        if url.path != "/scan":
+            self.send_json(status=404, body={"error": f"Path {url.path} is not found."})
+            return
+        
+        try:
+            scan_kwargs: dict[str, Any] = {
+                "index_name": query["index"],
+                "start": datetime.strptime(query["start"], "%Y-%m-%d"),
+                "end": datetime.strptime(query["end"], "%Y-%m-%d"),
+                "ma_window": int(query.get("ma_window", 21)),
+                "min_days": int(query["min_days"]),
+                "ma_kind": query.get("ma_kind", "sma")
+            }
+            if scan_kwargs["ma_kind"] not in MetricsCalculator.MA_KINDS:
+                raise ValueError(f"Ma kind {scan_kwargs['ma_kind']} is not valid.")
+        except (KeyError, ValueError) as e:
+            self.send_json(status=400, body={"error": f"Invalid query: {e}"})
+            return
+        
+        try:
+            result, is_cached = service.scan(**scan_kwargs)
+        except Exception as e:
+            logger.error(f"Scan {scan_kwargs} failed: {e}")
+            self.send_json(status=500, body={"error": str(e)})
+            return
+        
+        self.send_json(status=200, body={**result.to_dict(), "cached": is_cached})
+    
+    def send_json(self, status: int, body: dict[str, Any]) -> None:
+        payload: bytes = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class ScreenerState:
+    """
+    Class keeps a screener state between daily runs: per ticker the last rs,
+    the last ma_window rs values with their running sum and the current streak
+    of days rs has been held above its moving average.
+    A new day updates the state in O(tickers) instead of recomputing the history.
+    Unlike a scan, a streak is not limited to a period, it runs since the state start.
+    Bars out of trading sessions are skipped, as they are dropped by a scan.
+    """
+    
+    def __init__(
+        self,
+        tickers: list[str],
+        market_ticker: str,
+        ma_window: int,
+        rs_window: np.ndarray,
+        streaks: np.ndarray,
+        days_seen: int,
+        last_date: Timestamp | None = None,
+        calendar: TradingCalendar | None = None
+    ):
+        self.tickers = list(tickers)
+        self.market_ticker = market_ticker
+        self.ma_window = ma_window
+        self.rs_window = rs_window # (ma_window, tickers), a ring buffer of last rs values
+        self.streaks = streaks
+        self.days_seen = days_seen
+        self.last_date = last_date
+        self.calendar = calendar or TradingCalendar()
+        self.resum_window()
+    
+    @property
+    def position(self) -> int:
+        """
+        Row of the ring buffer the next rs is written to.
+        """
+        return self.days_seen % self.ma_window
+    
+    @property
+    def last_rs(self) -> np.ndarray:
+        return self.rs_window[(self.days_seen - 1) % self.ma_window]
+    
+    @property
+    def rs_ma(self) -> np.ndarray:
+        """
+        Moving average of rs, NaN until the window is full or when it contains a NaN.
+        """
+        if self.days_seen < self.ma_window:
+            return np.full(len(self.tickers), np.nan)
+        
+        return np.where(
+            self.window_nans == 0,
+            np.round(self.window_sum / self.ma_window, 8),
+            np.nan
+        )
+    
+    def resum_window(self) -> None:
+        """
+        Method recalculates running sums from the ring buffer, dropping accumulated float error.
+        """
+        self.window_sum: np.ndarray = np.nansum(self.rs_window, axis=0)
+        self.window_nans: np.ndarray = np.isnan(self.rs_window).sum(axis=0)
+    
+    @classmethod
+    def from_data(
+        cls,
+        stocks_data: DataFrame | PricePanel,
+        market_ticker: str,
+        ma_window: int,
+        calendar: TradingCalendar | None = None
+    ) -> "ScreenerState":
+        """
+        Method builds a state from the price history, e.g. a loaded price panel.
+        NB! Data must contain the "Close" column.
+        """
+        calendar = calendar or TradingCalendar()
+        rs_data: DataFrame = MetricsCalculator().rs_on_data(
+            stocks_data=stocks_data[["Close"]],
+            market_ticker=market_ticker
+        )["rs"]
+        # Rs of a day depends on the day only, so bars out of sessions are dropped from rs.
+        rs_data = rs_data[calendar.is_session(rs_data.index)]
+        rs_values: np.ndarray = rs_data.to_numpy(dtype=float)
+        rs_ma_values: np.ndarray = MetricsCalculator.rolling_means(
+            values=rs_values,
+            windows=[ma_window]
+        )[ma_window]
+        
+        # The last rows are laid out in the ring buffer, so that the row n is at n % ma_window.
+        days_seen: int = len(rs_values)
+        rs_window: np.ndarray = np.full((ma_window, rs_values.shape[1]), np.nan)
+        for row_nr in range(max(0, days_seen - ma_window), days_seen):
+            rs_window[row_nr % ma_window] = rs_values[row_nr]
+        
+        return cls(
+            tickers=list(rs_data.columns),
+            market_ticker=market_ticker,
+            ma_window=ma_window,
+            rs_window=rs_window,
+            streaks=DataFilter.rs_above_ma_streaks(
+                rs_values=rs_values,
+                ma_values=rs_ma_values
+            ),
+            days_seen=days_seen,
+            last_date=rs_data.index[-1] if days_seen else None,
+            calendar=calendar
+        )
+    
+    def update(
+        self,
+        bar_date: datetime,
+        close_prices: Series
+    ) -> None:
+        """
+        Method applies close prices of one day (ticker: price) to the state.
+        Tickers missing in the prices get a NaN rs, unknown tickers are ignored.
+        """
+        close_prices = close_prices.reindex(self.tickers).astype(float)
+        market_price: float = close_prices[self.market_ticker]
+        rs: np.ndarray = np.round(close_prices.to_numpy() / market_price, 2)
+        
+        leaving_rs: np.ndarray = self.rs_window[self.position]
+        self.window_sum += np.nan_to_num(rs) - np.nan_to_num(leaving_rs)
+        self.window_nans += np.isnan(rs).astype(int) - np.isnan(leaving_rs).astype(int)
+        self.rs_window[self.position] = rs
+        self.days_seen += 1
+        self.last_date = pd.Timestamp(bar_date)
+        if self.position == 0:
+            self.resum_window()
+        
+        # The same rules as in DataFilter.rs_above_ma_streaks, applied to the new last day.
+        rs_ma: np.ndarray = self.rs_ma
+        with np.errstate(invalid="ignore"):
+            is_stop: np.ndarray = (rs < rs_ma) | np.isnan(rs_ma)
+            is_above: np.ndarray = rs > rs_ma
+        self.streaks = np.where(is_stop, 0, self.streaks + is_above)
+    
+    def apply_bars(self, close_prices: DataFrame) -> None:
+        """
+        Method applies daily close prices (dates x tickers) newer than the last date.
+        Bars out of trading sessions, e.g. of foreign tickers on exchange holidays, are dropped.
+        """
+        close_prices = close_prices[self.calendar.is_session(close_prices.index)]
+        if self.last_date is not None:
+            close_prices = close_prices[close_prices.index > self.last_date]
+        for bar_date, day_prices in close_prices.iterrows():
+            self.update(bar_date=bar_date, close_prices=day_prices)
+    
+    def to_frame(self) -> DataFrame:
+        """
+        Method returns the last rs, its moving average and the streak of every ticker.
+        """
+        return DataFrame(
+            {
+                "rs": self.last_rs,
+                "rs_ma": self.rs_ma,
+                "days_rs_above_ma": self.streaks
+            },
+            index=pd.Index(self.tickers, name="Ticker")
+        )
+    
+    def passed_tickers(self, min_days: int) -> list[str]:
+        """
+        Method returns tickers which rs has been held above ma at least min_days days.
+        """
+        return [
+            ticker for ticker, streak in zip(self.tickers, self.streaks)
+            if streak >= min_days
+        ]
+    
+    def save(self, path: str | Path) -> None:
+        """
+        Method writes the state to a .npz file.
+        """
+        path = Path(path)
+        temp_path: Path = path.with_suffix(".tmp.npz")
+        np.savez(
+            temp_path,
+            tickers=np.array(self.tickers, dtype=str),
+            market_ticker=np.array(self.market_ticker),
+            ma_window=np.array(self.ma_window),
+            rs_window=self.rs_window,
+            streaks=self.streaks,
+            days_seen=np.array(self.days_seen),
+            last_date=np.array("" if self.last_date is None else self.last_date.isoformat())
+        )
+        temp_path.replace(path)
+    
+    @classmethod
+    def load(cls, path: str | Path) -> "ScreenerState":
+        """
+        Method reads a state written by save.
+        """
+        with np.load(path) as state_data:
+            last_date: str = str(state_data["last_date"])
+            return cls(
+                tickers=state_data["tickers"].tolist(),
+                market_ticker=str(state_data["market_ticker"]),
+                ma_window=int(state_data["ma_window"]),
+                rs_window=state_data["rs_window"],
+                streaks=state_data["streaks"],
+                days_seen=int(state_data["days_seen"]),
+                last_date=pd.Timestamp(last_date) if last_date else None
+            )
+
+
+class Backtester:
+    """
+    Class backtests the screener rules on every date at once.
+    On a date a ticker is selected if its rs has grown over the last period_days rows
+    and has been held above its ma at least min_days days within them,
+    the same as a scan of that period. Selected baskets are measured by forward returns.
+    Rs and rs ma fields of the data, e.g. of Screener.get_metrics, are reused.
+    """
+    
+    def __init__(
+        self,
+        market_ticker: str,
+        ma_window: int,
+        period_days: int,
+        min_days: int
+    ):
+        self.market_ticker = market_ticker
+        self.ma_window = ma_window
+        self.period_days = period_days
+        self.min_days = min_days
+    
+    def signals(self, stocks_data: DataFrame | PricePanel) -> DataFrame:
+        """
+        Method returns whether a ticker passes the screener on a date (dates x tickers).
+        Dates without a full period or ma history never pass.
+        Rs and rs ma are computed from close prices unless the data has "rs"
+        and "rs_ma" fields, a given "rs_ma" must be of the backtester ma window.
+        NB! Data must contain the "Close" column or the "rs" column.
+        """
+        fields: pd.Index = stocks_data.columns.get_level_values(0)
+        rs_data: DataFrame = stocks_data["rs"] if "rs" in fields \
+            else MetricsCalculator().rs_on_data(
+                stocks_data=stocks_data[["Close"]],
+                market_ticker=self.market_ticker
+            )["rs"]
+        rs_values: np.ndarray = rs_data.to_numpy(dtype=float)
+        rs_ma_values: np.ndarray = stocks_data["rs_ma"].to_numpy(dtype=float) \
+            if "rs" in fields and "rs_ma" in fields \
+            else MetricsCalculator.rolling_means(
+                values=rs_values,
+                windows=[self.ma_window]
+            )[self.ma_window]
+        
+        # Rs on the first row of the period ending on a row.
+        period_start_rs: np.ndarray = np.full(rs_values.shape, np.nan)
+        period_start_rs[self.period_days - 1:] = rs_values[:len(rs_values) - self.period_days + 1]
+        with np.errstate(invalid="ignore"):
+            has_rs_grown: np.ndarray = rs_values > period_start_rs
+        
+        streaks: np.ndarray = DataFilter.rs_above_ma_streaks_history(
+            rs_values=rs_values,
+            ma_values=rs_ma_values,
+            max_days=self.period_days
+        )
+        
+        return DataFrame(
+            has_rs_grown & (streaks >= self.min_days),
+            index=rs_data.index,
+            columns=rs_data.columns
+        )
+    
+    def run(
+        self,
+        stocks_data: DataFrame | PricePanel,
+        horizons: list[int] | None = None,
+        step: int = 1
+    ) -> DataFrame:
+        """
+        Method measures equally weighted baskets selected every step rows.
+        Returns per date and horizon (in rows, 5, 21 and 63 by default): the basket size,
+        the mean forward return of the basket, the forward return of the market
+        and the excess return.
+        """
+        horizons = horizons or [5, 21, 63]
+        signals: DataFrame = self.signals(stocks_data=stocks_data)
+        close_data: DataFrame = stocks_data["Close"][signals.columns]
+        close_prices: np.ndarray = close_data.to_numpy(dtype=float)
+        market_column: int = signals.columns.get_loc(self.market_ticker)
+        
+        rows: np.ndarray = np.arange(0, len(signals), step)
+        selected: np.ndarray = signals.to_numpy()[rows]
+        selected[:, market_column] = False
+        
+        results: list[DataFrame] = []
+        for horizon in horizons:
+            forward_returns: np.ndarray = np.full(close_prices.shape, np.nan)
+            forward_returns[:len(close_prices) - horizon] = \
+                close_prices[horizon:] / close_prices[:len(close_prices) - horizon] - 1
+            forward_returns = forward_returns[rows]
+            
+            is_counted: np.ndarray = selected & ~np.isnan(forward_returns)
+            basket_size: np.ndarray = is_counted.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                basket_return: np.ndarray = np.where(is_counted, forward_returns, 0).sum(axis=1) \
+                    / basket_size
+            market_return: np.ndarray = forward_returns[:, market_column]
+            
+            results.append(DataFrame({
+                "date": signals.index[rows],
+                "horizon": horizon,
+                "basket_size": basket_size,
+                "basket_return": basket_return,
+                "market_return": market_return,
+                "excess_return": basket_return - market_return
+            }))
+        
+        return pd.concat(results, ignore_index=True)
+    
+    @staticmethod
+    def summary(results: DataFrame) -> DataFrame:
+        """
+        Method summarizes backtest results per horizon over dates with a basket.
+        """
+        with_basket: DataFrame = results[
+            (results["basket_size"] > 0) & results["excess_return"].notna()
+        ]
+        
+        return with_basket.groupby("horizon").agg(
+            dates=("date", "count"),
+            mean_basket_size=("basket_size", "mean"),
+            mean_basket_return=("basket_return", "mean"),
+            mean_market_return=("market_return", "mean"),
+            mean_excess_return=("excess_return", "mean"),
+            hit_rate=("excess_return", lambda excess_return: (excess_return > 0).mean())
+        )
+
+
 class WikiTickersExtractor:
     
     """
@@ -4,12 +4,37 @@ INDEXES_INFO: dict[str, dict[str, Any]] = {
         "S&P 500": {
             "url": "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies",
             "table_nr": 0,
+            "ticker_column": "Symbol",
+            "sector_column": "GICS Sector",
+            "industry_column": "GICS Sub-Industry",
             "ticker_name": "^SPX"
         },
         "NASDAQ 100": {
             "url": "https://en.wikipedia.org/wiki/Nasdaq-100",
             "table_nr": 3,
+            "ticker_column": "Ticker",
+            "sector_column": "GICS Sector",
+            "industry_column": "GICS Sub-Industry",
             "ticker_name": "^NDX"
         }
     }
 MA_WINDOW: int = 21
+MA_KIND: str = "sma" # "sma", "ema" or "wma"
+MARKET_CAPS_PATH: str | None = None # A csv of Ticker,market_cap for cap-weighted groups.
+PRICE_STORE_DIR: str = "price_store"
+DOWNLOAD_BATCH_SIZE: int = 50
+DOWNLOAD_WORKERS: int = 4
+DOWNLOAD_REQUESTS_PER_SECOND: float = 2.0
+DOWNLOAD_MAX_RETRIES: int = 3
+CONSTITUENTS_STORE_DIR: str = "constituents_store"
+CONSTITUENTS_TTL_DAYS: int = 7
+RUN_LOG_PATH: str = "runs.jsonl"
+PROFILES_DIR: str = "profiles"
+PAGE_CACHE_DIR: str = "page_cache"
+RESULTS_STORE_DIR: str = "results_store"
+PAGE_FETCH_CONCURRENCY: int = 4
+PAGE_FETCH_TIMEOUT: tuple[float, float] = (5.0, 30.0) # Connect and read seconds.
+SERVICE_HOST: str = "127.0.0.1"
+SERVICE_PORT: int = 8765
+SERVICE_CACHE_SIZE: int = 256
+SERVICE_REFRESH_SECONDS: float = 900.0
@@ -1,17 +1,226 @@
 import pandas as pd
 from pandas import DataFrame
-import requests
 from io import StringIO
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+import asyncio
+import hashlib
+import json
 
-def get_page_tables(url: str) -> list[DataFrame]:
+# Lxml and the http stack are slow to import, they are imported on a network fetch.
+if TYPE_CHECKING:
+    import requests
+    from lxml import etree
+
+# Seconds to connect and to wait for data.
+DEFAULT_TIMEOUT: tuple[float, float] = (5.0, 30.0)
+
+
+def get_page_tables(
+    url: str,
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT
+) -> list[DataFrame]:
     """
     Function extracts all tables from a web page.
     """
+    import requests
+    
     # Headers are necessary for some pages, e.g. wiki to simulate a browser visit.
     headers = {'User-Agent': 'Mozilla/5.0'}
-    response = requests.get(url, headers=headers)
+    response = requests.get(url, headers=headers, timeout=timeout)
     html = response.text
 
     tables = pd.read_html(StringIO(html))
     
-    return tables
\ No newline at end of file
+    return tables
+
+
+def get_table_cells(table: "etree._Element") -> tuple[list[str], list[list[str]]]:
+    """
+    Function returns texts of header cells and of data rows of a html table.
+    The header is the first row made of th cells only. Rows of nested tables are skipped.
+    """
+    header_names: list[str] = []
+    rows: list[list[str]] = []
+    for row in table.iter("tr"):
+        if next(row.iterancestors("table")) is not table:
+            continue
+        
+        cells = [cell for cell in row if cell.tag in ("th", "td")]
+        texts: list[str] = ["".join(cell.itertext()).strip() for cell in cells]
+        if cells and all(cell.tag == "th" for cell in cells):
+            header_names = header_names or texts
+            continue
+        rows.append(texts)
+    
+    return header_names, rows
+
+
+def extract_table(
+    html_source: IO[bytes],
+    table_nr: int | None = None,
+    table_id: str | None = None,
+    header: str | None = None,
+    columns: list[str] | None = None
+) -> DataFrame:
+    """
+    Function extracts one table from a html document.
+    The table is selected by its position, id attribute and/or a column name
+    in its header, the first table matching all given selectors is taken.
+    The document is parsed incrementally and parsing stops at the end of the table.
+    Only given columns are kept.
+    """
+    from lxml import etree
+    
+    if table_nr is None and table_id is None and header is None:
+        table_nr = 0
+    
+    tables_nr_stack: list[int] = []
+    tables_seen: int = 0
+    for event, table in etree.iterparse(
+        html_source,
+        events=("start", "end"),
+        tag="table",
+        html=True,
+        recover=True
+    ):
+        if event == "start":
+            tables_nr_stack.append(tables_seen)
+            tables_seen += 1
+            continue
+        
+        current_table_nr: int = tables_nr_stack.pop()
+        is_matching: bool = (
+            (table_nr is None or current_table_nr == table_nr)
+            and (table_id is None or table.get("id") == table_id)
+        )
+        if is_matching:
+            header_names, rows = get_table_cells(table=table)
+            is_matching = header is None or header in header_names
+        if not is_matching:
+            # Skipped top level tables are not kept in memory.
+            if not tables_nr_stack:
+                table.clear(keep_tail=True)
+            continue
+        
+        width: int = len(header_names) if header_names \
+            else max((len(row) for row in rows), default=0)
+        table_data: DataFrame = DataFrame(
+            data=[row[:width] + [None] * (width - len(row)) for row in rows],
+            columns=header_names or None
+        )
+        
+        return table_data[columns] if columns is not None else table_data
+    
+    raise ValueError(
+        f"Table (nr={table_nr}, id={table_id}, header={header}) is not found."
+    )
+
+
+def get_page_table(
+    url: str,
+    table_nr: int | None = None,
+    table_id: str | None = None,
+    header: str | None = None,
+    columns: list[str] | None = None,
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+    session: "requests.Session | None" = None,
+    cache_dir: str | Path | None = None
+) -> DataFrame:
+    """
+    Function extracts one table from a web page, see extract_table.
+    The page is streamed, so the rest of the page after the table is not downloaded.
+    With a cache directory the page is requested conditionally (ETag/Last-Modified),
+    an unchanged page is neither downloaded nor parsed, its cached table is returned.
+    """
+    import requests
+    
+    selectors: dict[str, Any] = {
+        "table_nr": table_nr,
+        "table_id": table_id,
+        "header": header,
+        "columns": columns
+    }
+    cache_path: Path | None = None
+    cached_page: dict[str, Any] = {}
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    if cache_dir is not None:
+        cache_key: str = hashlib.sha1(
+            json.dumps([url, selectors], sort_keys=True).encode()
+        ).hexdigest()
+        cache_path = Path(cache_dir) / f"{cache_key}.json"
+        if cache_path.exists():
+            cached_page = json.loads(cache_path.read_text())
+        if cached_page.get("etag"):
+            headers["If-None-Match"] = cached_page["etag"]
+        if cached_page.get("last_modified"):
+            headers["If-Modified-Since"] = cached_page["last_modified"]
+    
+    get = session.get if session is not None else requests.get
+    with get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and cached_page:
+            return pd.read_json(StringIO(cached_page["table"]), orient="split", dtype=False)
+        
+        response.raise_for_status()
+        response.raw.decode_content = True
+        table_data: DataFrame = extract_table(
+            html_source=response.raw,
+            **selectors
+        )
+        validators: dict[str, str | None] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+    
+    if cache_path is not None and any(validators.values()):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path: Path = cache_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps({
+            "url": url,
+            **validators,
+            "table": table_data.to_json(orient="split", index=False)
+        }))
+        temp_path.replace(cache_path)
+    
+    return table_data
+
+
+async def fetch_page_tables(
+    pages: dict[str, dict[str, Any]],
+    max_concurrency: int = 4,
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+    cache_dir: str | Path | None = None
+) -> dict[str, DataFrame | Exception]:
+    """
+    Function extracts tables of several pages concurrently, see get_page_table.
+    Pages are given as {name: {"url": ..., selectors of get_page_table}}.
+    At most max_concurrency pages are requested at once over one pooled session.
+    A failed page is returned as its exception, so other pages are kept.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        
+        async def fetch_page(page: dict[str, Any]) -> DataFrame:
+            # Requests is blocking, so a page is fetched in a worker thread.
+            async with semaphore:
+                return await asyncio.to_thread(
+                    get_page_table,
+                    timeout=timeout,
+                    session=session,
+                    cache_dir=cache_dir,
+                    **page
+                )
+        
+        tables: list[DataFrame | Exception] = await asyncio.gather(
+            *(fetch_page(page=page) for page in pages.values()),
+            return_exceptions=True
+        )
+    
+    return dict(zip(pages.keys(), tables))
@@ -1,14 +1,18 @@
-from classes import(
-    DataFilter,
-    Yfinance,
-    MetricsCalculator
-)
-from functions import get_page_tables
+from __future__ import annotations
 import config
-import pandas as pd
-from pandas import DataFrame
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+import argparse
 import logging
+import os
+import sys
+
+# Classes and functions pull pandas, yfinance, lxml and the http stack,
+# they are imported when needed, so help and argument errors return at once
+# and cache-only runs never import the network libraries.
+if TYPE_CHECKING:
+    from classes import ScanResult, Screener, ScreenerState, StageRecorder
+    from pandas import DataFrame, Series
 
 
 error_logger = logging.getLogger()
@@ -28,6 +32,747 @@ handler.setFormatter(
 error_logger.addHandler(hdlr=handler)
 
 
+def constituents_page(index_name: str) -> dict[str, Any]:
+    """
+    Function returns the wiki page url and table selectors of index constituents.
+    """
+    # The table is selected by its ticker column, so reordered tables on the page
+    # do not break the extraction. Only ticker and GICS group columns are parsed.
+    index_info: dict[str, Any] = config.INDEXES_INFO[index_name]
+    
+    return {
+        "url": index_info["url"],
+        "header": index_info["ticker_column"],
+        "columns": [
+            index_info[column_key]
+            for column_key in ("ticker_column", "sector_column", "industry_column")
+            if column_key in index_info
+        ]
+    }
+
+
+def prefetch_constituents(
+    index_names: list[str],
+    refresh: bool = False
+) -> None:
+    """
+    Function fetches constituents pages of indexes with stale snapshots concurrently
+    and saves new snapshots. A failed page keeps its stale snapshot.
+    """
+    from classes import ConstituentsStore
+    
+    constituents_store = ConstituentsStore(
+        directory=config.CONSTITUENTS_STORE_DIR,
+        ttl_days=config.CONSTITUENTS_TTL_DAYS
+    )
+    stale_indexes: list[str] = [
+        index_name for index_name in index_names
+        if refresh or constituents_store.is_stale(index_name=index_name)
+    ]
+    if not stale_indexes:
+        return
+    
+    import asyncio
+    from functions import fetch_page_tables
+    
+    tables = asyncio.run(fetch_page_tables(
+        pages={index_name: constituents_page(index_name=index_name) for index_name in stale_indexes},
+        max_concurrency=config.PAGE_FETCH_CONCURRENCY,
+        timeout=config.PAGE_FETCH_TIMEOUT,
+        cache_dir=config.PAGE_CACHE_DIR
+    ))
+    for index_name, table in tables.items():
+        if isinstance(table, Exception):
+            error_logger.error(
+                msg=f"Error in fetching {index_name} constituents.\nDescription: {table}"
+            )
+            continue
+        constituents_store.save(index_name=index_name, constituents=table)
+
+
+def get_constituents(
+    index_name: str,
+    as_of: datetime | None = None,
+    refresh: bool = False
+) -> DataFrame:
+    """
+    Function returns the constituents table of an index as of a date (the latest one by default).
+    """
+    # Constituents are read from local snapshots, wiki is requested only when
+    # the latest snapshot is older than the ttl or on refresh.
+    from classes import ConstituentsStore
+    
+    def fetch_constituents() -> DataFrame:
+        from functions import get_page_table
+        
+        return get_page_table(
+            timeout=config.PAGE_FETCH_TIMEOUT,
+            cache_dir=config.PAGE_CACHE_DIR,
+            **constituents_page(index_name=index_name)
+        )
+    
+    constituents_store = ConstituentsStore(
+        directory=config.CONSTITUENTS_STORE_DIR,
+        ttl_days=config.CONSTITUENTS_TTL_DAYS
+    )
+    return constituents_store.get_constituents(
+        index_name=index_name,
+        fetch_constituents=fetch_constituents,
+        as_of=as_of,
+        refresh=refresh
+    )
+
+
+def get_index_tickers(
+    index_name: str,
+    as_of: datetime,
+    refresh: bool = False
+) -> list[str]:
+    """
+    Function returns tickers of an index as of a date.
+    """
+    ticker_column: str = config.INDEXES_INFO[index_name]["ticker_column"]
+    tickers_table: DataFrame = get_constituents(index_name=index_name, as_of=as_of, refresh=refresh)
+    
+    return tickers_table[ticker_column].to_list()
+
+
+def get_index_groups(
+    index_name: str,
+    as_of: datetime,
+    group_level: str = "sector",
+    refresh: bool = False
+) -> dict[str, str]:
+    """
+    Function returns GICS groups of index tickers as of a date, {ticker: group}.
+    Group level is "sector" or "industry" (sub-industry).
+    """
+    index_info: dict[str, Any] = config.INDEXES_INFO[index_name]
+    group_column: str = index_info[f"{group_level}_column"]
+    constituents: DataFrame = get_constituents(index_name=index_name, as_of=as_of, refresh=refresh)
+    # Snapshots taken before groups were parsed keep tickers only, groups are taken
+    # from the latest snapshot then, which is fetched once if it has no groups either.
+    if group_column not in constituents.columns:
+        constituents = get_constituents(index_name=index_name)
+    if group_column not in constituents.columns:
+        constituents = get_constituents(index_name=index_name, refresh=True)
+    
+    return dict(zip(constituents[index_info["ticker_column"]], constituents[group_column]))
+
+
+def load_market_caps(path: str) -> Series:
+    """
+    Function reads market caps of tickers from a csv with Ticker and market_cap columns.
+    """
+    import pandas as pd
+    
+    return pd.read_csv(path, index_col="Ticker")["market_cap"]
+
+
+def build_screener(
+    refresh_constituents: bool = False,
+    recorder: StageRecorder | None = None,
+    market_caps_path: str | None = config.MARKET_CAPS_PATH
+) -> Screener:
+    """
+    Function builds a screener reading prices through the local price store.
+    Pipeline stages are measured by the recorder if it is given.
+    Ticker groups come from constituents tables, market caps from a csv if it is given.
+    """
+    from classes import(
+        CachedPriceSource,
+        DownloadScheduler,
+        PriceStore,
+        Screener,
+        Yfinance
+    )
+    
+    # Price data is read from the local store, only missing spans are downloaded.
+    # Missing spans are downloaded in batches, finished batches survive interruptions.
+    price_source = CachedPriceSource(
+        store=PriceStore(directory=config.PRICE_STORE_DIR),
+        source=DownloadScheduler(
+            source=Yfinance(),
+            batch_size=config.DOWNLOAD_BATCH_SIZE,
+            max_workers=config.DOWNLOAD_WORKERS,
+            requests_per_second=config.DOWNLOAD_REQUESTS_PER_SECOND,
+            max_retries=config.DOWNLOAD_MAX_RETRIES,
+            checkpoint_dir=os.path.join(config.PRICE_STORE_DIR, "checkpoints")
+        )
+    )
+    
+    # For moving average date requires a longer period.
+    # The screener fetches ma window sessions more and cuts them from scans.
+    return Screener(
+        price_source=price_source,
+        get_tickers=lambda index_name, as_of: get_index_tickers(
+            index_name=index_name,
+            as_of=as_of,
+            refresh=refresh_constituents
+        ),
+        market_tickers={
+            index_name: index_info["ticker_name"]
+            for index_name, index_info in config.INDEXES_INFO.items()
+        },
+        recorder=recorder,
+        get_groups=lambda index_name, as_of, group_level: get_index_groups(
+            index_name=index_name,
+            as_of=as_of,
+            group_level=group_level,
+            refresh=refresh_constituents
+        ),
+        market_caps=load_market_caps(path=market_caps_path) if market_caps_path else None
+    )
+
+
+_screener: Screener | None = None
+
+
+def run_scan(
+    index: str,
+    start: str | datetime,
+    end: str | datetime,
+    ma_window: int = config.MA_WINDOW,
+    min_days: int = 1,
+    screener: Screener | None = None,
+    timeframes: dict[str, tuple[int, int]] | None = None,
+    ma_kind: str = config.MA_KIND,
+    crossed_up_days: int | None = None,
+    group_level: str | None = None,
+    cap_weighted: bool = False
+) -> ScanResult:
+    """
+    Function scans an index without user interaction.
+    Scans in one process share a screener, so loaded prices and metrics are reused.
+    Dates are datetimes or strings in yyyy-mm-dd format.
+    Timeframes {"weekly" | "monthly": (ma_window, min_bars)} confirm the daily signal.
+    Ma kind is "sma", "ema" or "wma", crossed_up_days requires a recent rs cross up.
+    Group level "sector" or "industry" requires a strong GICS group of a strong stock.
+    """
+    global _screener
+    if screener is None:
+        _screener = _screener or build_screener()
+        screener = _screener
+    
+    return screener.run_scan(
+        index_name=index,
+        start=parse_date(start) if isinstance(start, str) else start,
+        end=parse_date(end) if isinstance(end, str) else end,
+        ma_window=ma_window,
+        min_days=min_days,
+        timeframes=timeframes,
+        ma_kind=ma_kind,
+        crossed_up_days=crossed_up_days,
+        group_level=group_level,
+        cap_weighted=cap_weighted
+    )
+
+
+def parse_timeframe(timeframe_args: list[str]) -> tuple[str, tuple[int, int]]:
+    """
+    Function parses a timeframe confirmation "TIMEFRAME MA_WINDOW MIN_BARS".
+    """
+    timeframe, ma_window, min_bars = timeframe_args
+    if timeframe not in ("weekly", "monthly"):
+        raise argparse.ArgumentTypeError(f"Timeframe {timeframe} is not valid.")
+    if not ma_window.isdigit() or not min_bars.isdigit():
+        raise argparse.ArgumentTypeError("Ma window and min bars must be integers.")
+    
+    return timeframe, (int(ma_window), int(min_bars))
+
+
+def update_state(
+    index: str,
+    state_path: str,
+    ma_window: int = config.MA_WINDOW,
+    screener: Screener | None = None
+) -> ScreenerState:
+    """
+    Function applies daily bars newer than a saved screener state and saves it.
+    A missing state is built from the last year of prices.
+    """
+    from classes import ScreenerState
+    
+    screener = screener or build_screener()
+    today = datetime.combine(date.today(), datetime.min.time())
+    
+    # The current day bar is not final, so bars are fetched until yesterday.
+    if os.path.exists(state_path):
+        state = ScreenerState.load(path=state_path)
+        price_data = screener.price_source.get_price_data(
+            tickers=state.tickers,
+            period=(state.last_date + timedelta(days=1), today)
+        )
+        if not price_data.empty:
+            state.apply_bars(close_prices=price_data["Close"])
+    else:
+        price_data = screener.load_panel(
+            index_name=index,
+            period=(today - timedelta(days=365), today),
+            warmup_sessions=ma_window
+        )
+        state = ScreenerState.from_data(
+            stocks_data=price_data,
+            market_ticker=config.INDEXES_INFO[index]["ticker_name"],
+            ma_window=ma_window
+        )
+    
+    state.save(path=state_path)
+    
+    return state
+
+
+def serve(
+    screener: Screener,
+    index_names: list[str],
+    period: tuple[datetime, datetime] | None = None,
+    host: str = config.SERVICE_HOST,
+    port: int = config.SERVICE_PORT
+) -> None:
+    """
+    Function runs a local scan service until it is interrupted.
+    Panels of indexes are preloaded for a period if it is given,
+    other periods are loaded by the first query.
+    """
+    from classes import ScreeningService
+    
+    service = ScreeningService(
+        screener=screener,
+        cache_size=config.SERVICE_CACHE_SIZE,
+        refresh_seconds=config.SERVICE_REFRESH_SECONDS
+    )
+    if period is not None:
+        for index_name in index_names:
+            screener.load_panel(
+                index_name=index_name,
+                period=period,
+                warmup_sessions=config.MA_WINDOW
+            )
+    
+    server = service.create_server(host=host, port=port)
+    service.start_refreshing()
+    print(f"Serving scans on http://{host}:{server.server_address[1]}/scan")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def parse_date(date_text: str) -> datetime:
+    """
+    Function parses a date in yyyy-mm-dd format.
+    """
+    try:
+        return datetime.strptime(date_text.strip(), "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Wrong date format {date_text}, yyyy-mm-dd is expected.")
+
+
+def print_scan_result(result: ScanResult, top: int | None = None) -> None:
+    """
+    Function prints tickers removed by every filter and passed tickers.
+    With top only the top rated tickers are printed with their rs rating.
+    """
+    for filter_name, removed_count in result.removed_tickers.items():
+        print(f"{filter_name}: {removed_count} tickers removed.")
+    if top is None:
+        print(", ".join(result.tickers))
+        return
+    
+    top_tickers: DataFrame = result.top(k=top)
+    print(", ".join(
+        f"{ticker} ({rs_rating:.0f})" for ticker, rs_rating in top_tickers["rs_rating"].items()
+    ))
+
+
+def store_results(
+    results: list[ScanResult],
+    store_dir: str = config.RESULTS_STORE_DIR
+) -> None:
+    """
+    Function appends scan results to the result store dated by today.
+    A failed write is logged, scan results are printed anyway.
+    """
+    from classes import ResultStore
+    
+    result_store = ResultStore(directory=store_dir)
+    for result in results:
+        try:
+            result_store.write(result=result)
+        except Exception as e:
+            error_logger.error(
+                msg=f"Error in storing the {result.index_name} scan result.\nDescription: {e}"
+            )
+
+
+def print_history(
+    index_names: list[str],
+    days: int,
+    ma_window: int | None = None,
+    min_days: int | None = None,
+    store_dir: str = config.RESULTS_STORE_DIR
+) -> None:
+    """
+    Function prints tickers passed stored scans of indexes on every scan date
+    of the last days days, scans are selected by ma window and min days if given.
+    """
+    from classes import ResultStore
+    
+    result_store = ResultStore(directory=store_dir)
+    parameters: dict[str, int] = {
+        name: value for name, value in [("ma_window", ma_window), ("min_days", min_days)]
+        if value is not None
+    }
+    for index_name in index_names:
+        print(f"{index_name}:")
+        passed_by_day = result_store.passed_by_day(index_name=index_name, days=days, **parameters)
+        for scan_date, tickers in passed_by_day.items():
+            print(f"{scan_date}: {', '.join(tickers)}")
+
+
+def cli(argv: list[str] | None = None) -> None:
+    """
+    Function runs scans with parameters from command line arguments.
+    Several ma windows or min days are swept over one loaded panel.
+    Several indexes are scanned at once with the first ma window and min days.
+    With --state the daily screener state of the first index is updated instead.
+    With --serve a local scan service keeps panels in memory between queries.
+    Scan results are appended to the result store, --history prints stored results.
+    """
+    parser = argparse.ArgumentParser(
+        description="Scans an index for stocks which relative strength has grown "
+        "and has been held above its moving average."
+    )
+    parser.add_argument(
+        "--index",
+        required=True,
+        nargs="+",
+        choices=list(config.INDEXES_INFO.keys()),
+        help="Several indexes are scanned at once over shared price data."
+    )
+    parser.add_argument("--start", type=parse_date, help="yyyy-mm-dd")
+    parser.add_argument("--end", type=parse_date, help="yyyy-mm-dd")
+    parser.add_argument(
+        "--ma-window",
+        type=int,
+        nargs="+",
+        help=f"Moving average windows of rs, {config.MA_WINDOW} by default."
+    )
+    parser.add_argument(
+        "--ma-kind",
+        choices=["sma", "ema", "wma"],
+        default=config.MA_KIND,
+        help="Simple, exponential or linearly weighted moving average of a single scan."
+    )
+    parser.add_argument(
+        "--crossed-up-within",
+        type=int,
+        metavar="DAYS",
+        help="Keep tickers which rs crossed up its ma during the last DAYS days of a single scan."
+    )
+    parser.add_argument(
+        "--group",
+        choices=["sector", "industry"],
+        help="Keep tickers of a single scan which GICS sector or sub-industry outperforms "
+        "the index and which outperform their group."
+    )
+    parser.add_argument(
+        "--market-caps",
+        help="Csv of Ticker,market_cap. Group composites are weighted by caps instead of equally."
+    )
+    parser.add_argument(
+        "--min-days",
+        type=int,
+        nargs="+",
+        help="Days the rs has been held above its ma. Required except for --serve."
+    )
+    parser.add_argument(
+        "--refresh-constituents",
+        action="store_true",
+        help="Fetch index constituents from wiki even if the snapshot is fresh."
+    )
+    parser.add_argument(
+        "--state",
+        help="Path of a screener state file. Applies new daily bars to the state "
+        "instead of scanning a period."
+    )
+    parser.add_argument(
+        "--panel-dir",
+        help="Directory of a saved close prices panel, scanned in ticker chunks."
+    )
+    parser.add_argument(
+        "--save-panel",
+        action="store_true",
+        help="Load the index panel for the period and save it to --panel-dir before the scan."
+    )
+    parser.add_argument("--chunk-size", type=int, default=500, help="Tickers per chunk.")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a local scan service, indexes are preloaded for --start and --end if given."
+    )
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes scanning ticker shards of a multi index scan."
+    )
+    parser.add_argument(
+        "--confirm",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("TIMEFRAME", "MA_WINDOW", "MIN_BARS"),
+        help="Require rs growth and rs above its ma at least MIN_BARS weekly "
+        "or monthly bars too, e.g. --confirm weekly 10 2."
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        help="Print only the top passed tickers by rs rating."
+    )
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help=f"Do not append scan results to {config.RESULTS_STORE_DIR}."
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        metavar="DAYS",
+        help="Print tickers passed stored scans on every day of the last DAYS days "
+        "without scanning, scans are selected by --ma-window and --min-days."
+    )
+    parser.add_argument(
+        "--record-run",
+        action="store_true",
+        help=f"Append time, memory and ticker counts of every stage to {config.RUN_LOG_PATH}."
+    )
+    parser.add_argument(
+        "--profile-stage",
+        choices=["constituents", "prices", "rs", "rs_ma", "crossovers", "group_rs", "filters", "scan"],
+        help=f"Dump cProfile stats of a stage to {config.PROFILES_DIR}, implies --record-run."
+    )
+    args = parser.parse_args(argv)
+    try:
+        args.confirm = dict(parse_timeframe(timeframe_args) for timeframe_args in args.confirm)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    
+    if args.history is not None:
+        print_history(
+            index_names=args.index,
+            days=args.history,
+            ma_window=args.ma_window[0] if args.ma_window else None,
+            min_days=args.min_days[0] if args.min_days else None
+        )
+        return
+    args.ma_window = args.ma_window or [config.MA_WINDOW]
+    if not args.serve and args.min_days is None:
+        parser.error("--min-days is required.")
+    if not args.serve and args.state is None and (args.start is None or args.end is None):
+        parser.error("--start and --end are required for scans.")
+    # Services, state updates, chunked, multi index scans and sweeps apply the base rules only.
+    single_scan_options: list[str] = [
+        option for option, is_given in [
+            ("--confirm", bool(args.confirm)),
+            ("--ma-kind", args.ma_kind != config.MA_KIND),
+            ("--crossed-up-within", args.crossed_up_within is not None),
+            ("--group", args.group is not None)
+        ]
+        if is_given
+    ]
+    is_single_scan: bool = not (args.serve or args.state or args.panel_dir) \
+        and len(args.index) == 1 and len(args.ma_window) == 1 and len(args.min_days) == 1
+    if single_scan_options and not is_single_scan:
+        parser.error(f"{', '.join(single_scan_options)} apply to a single scan only.")
+    
+    from classes import StageRecorder
+    
+    recorder = StageRecorder(
+        enabled=args.record_run or args.profile_stage is not None,
+        profile_stage=args.profile_stage,
+        profile_dir=config.PROFILES_DIR
+    )
+    # Stale constituents pages of all indexes are fetched at once,
+    # so the screener reads fresh snapshots without refreshing them again.
+    with recorder.stage("constituents_pages"):
+        prefetch_constituents(index_names=args.index, refresh=args.refresh_constituents)
+    screener = build_screener(
+        recorder=recorder,
+        market_caps_path=args.market_caps or config.MARKET_CAPS_PATH
+    )
+    try:
+        run_command(args=args, screener=screener)
+    finally:
+        recorder.write(
+            path=config.RUN_LOG_PATH,
+            command={
+                key: value for key, value in vars(args).items()
+                if key not in ("record_run", "profile_stage")
+            }
+        )
+
+
+def run_command(args: argparse.Namespace, screener: Screener) -> None:
+    """
+    Function runs a scan, sweep, multi index scan, chunked scan of a saved panel
+    or state update for parsed arguments.
+    """
+    index: str = args.index[0]
+    
+    if args.serve:
+        try:
+            serve(
+                screener=screener,
+                index_names=args.index,
+                period=(args.start, args.end) if args.start and args.end else None,
+                port=args.port
+            )
+        except Exception as e:
+            error_msg = "Error in serving scans."
+            error_logger.critical(
+                msg=error_msg + f"\nDescription: {e}"
+            )
+            print(error_msg + "See logs.")
+        return
+    
+    if args.state:
+        try:
+            state = update_state(
+                index=index,
+                state_path=args.state,
+                ma_window=args.ma_window[0],
+                screener=screener
+            )
+        except Exception as e:
+            error_msg = f"Error in updating the {index} state."
+            error_logger.critical(
+                msg=error_msg + f"\nDescription: {e}"
+            )
+            print(error_msg + "See logs.")
+            return
+        
+        for min_days in args.min_days:
+            print(f"{state.last_date.date()}, min days {min_days}:")
+            print(", ".join(state.passed_tickers(min_days=min_days)))
+        return
+    
+    # A saved panel is scanned in ticker chunks, so the universe is never held in memory.
+    if args.panel_dir:
+        try:
+            if args.save_panel:
+                screener.load_panel(
+                    index_name=index,
+                    period=(args.start, args.end),
+                    warmup_sessions=args.ma_window[0]
+                ).save(directory=args.panel_dir, ticker_major=True)
+            result = screener.streaming_scan(
+                panel_directory=args.panel_dir,
+                index_name=index,
+                start=args.start,
+                end=args.end,
+                ma_window=args.ma_window[0],
+                min_days=args.min_days[0],
+                chunk_size=args.chunk_size
+            )
+        except Exception as e:
+            error_msg = f"Error in scanning the {index} panel in chunks."
+            error_logger.critical(
+                msg=error_msg + f"\nDescription: {e}"
+            )
+            print(error_msg + "See logs.")
+            return
+        
+        print_scan_result(result=result, top=args.top)
+        if not args.no_store:
+            store_results(results=[result])
+        return
+    
+    # Constituents of several indexes are fetched once and scanned against every benchmark.
+    if len(args.index) > 1:
+        try:
+            results = screener.multi_index_scan(
+                index_names=args.index,
+                start=args.start,
+                end=args.end,
+                ma_window=args.ma_window[0],
+                min_days=args.min_days[0],
+                workers=args.workers
+            )
+        except Exception as e:
+            error_msg = f"Error in scanning {', '.join(args.index)}."
+            error_logger.critical(
+                msg=error_msg + f"\nDescription: {e}"
+            )
+            print(error_msg + "See logs.")
+            return
+        
+        for index_name, result in results.items():
+            print(f"{index_name}:")
+            print_scan_result(result=result, top=args.top)
+        if not args.no_store:
+            store_results(results=list(results.values()))
+        return
+    
+    # A single scan reports filter counts, several combinations are swept in one pass.
+    if len(args.ma_window) == 1 and len(args.min_days) == 1:
+        try:
+            result = run_scan(
+                index=index,
+                start=args.start,
+                end=args.end,
+                ma_window=args.ma_window[0],
+                min_days=args.min_days[0],
+                screener=screener,
+                timeframes=args.confirm,
+                ma_kind=args.ma_kind,
+                crossed_up_days=args.crossed_up_within,
+                group_level=args.group,
+                cap_weighted=screener.market_caps is not None
+            )
+        except Exception as e:
+            error_msg = f"Error in scanning {index}."
+            error_logger.critical(
+                msg=error_msg + f"\nDescription: {e}"
+            )
+            print(error_msg + "See logs.")
+            return
+        
+        print_scan_result(result=result, top=args.top)
+        if not args.no_store:
+            store_results(results=[result])
+        return
+    
+    try:
+        sweep_results = screener.sweep(
+            index_name=index,
+            periods=[(args.start, args.end)],
+            ma_windows=args.ma_window,
+            min_days_list=args.min_days
+        )
+    except Exception as e:
+        error_msg = f"Error in sweeping {index}."
+        error_logger.critical(
+            msg=error_msg + f"\nDescription: {e}"
+        )
+        print(error_msg + "See logs.")
+        return
+    
+    for ma_window in args.ma_window:
+        for min_days in args.min_days:
+            passed_tickers = sweep_results[
+                (sweep_results["ma_window"] == ma_window)
+                & (sweep_results["min_days"] == min_days)
+            ]["ticker"]
+            print(f"ma window {ma_window}, min days {min_days}:")
+            print(", ".join(passed_tickers))
+
+
 def main() -> None:
     ### Getting period and checking format
 
@@ -77,50 +822,16 @@ def main() -> None:
         ) else print("Invalid input.")
     
     chosen_index: str = indexes[int(index_nr)]
-    chosen_index_url: str = indexes_info[chosen_index]["url"]
-    chosen_index_table_nr: int = indexes_info[chosen_index]["table_nr"]
-    chosen_index_ticker_name: str = indexes_info[chosen_index]["ticker_name"]
     
-    ## Extracting the chosen index tickers from wiki.
+    ### Extracting the chosen index tickers and their stock data.
     
-    try:
-        wiki_page_tables = get_page_tables(url=chosen_index_url)
-    except Exception as e:
-        error_msg = f"Error in extracting tables from {chosen_index_url}."
-        error_logger.critical(
-            msg=error_msg + f"\nDescription: {e}"
-        )
-        print(error_msg + "See logs.")
-        return
+    screener = build_screener()
     
     try:
-        tickers_table = wiki_page_tables[chosen_index_table_nr]
-    except Exception as e:
-        error_msg = f"Error in extracting table nr {chosen_index_table_nr} from \
-            {chosen_index_url}."
-        error_logger.critical(
-            msg=error_msg + f"\nDescription: {e}"
-        )
-        print(error_msg + "See logs.")
-        return
-    
-    tickers: list[str] = tickers_table[tickers_table.columns[0]] \
-        .to_list()
-    tickers.append(chosen_index_ticker_name) # For rs calculating.
-
-    ### Extracting tickers' stock data and index_data.
-    
-    yahoo_fin = Yfinance()
-
-    # For moving average date requires a longer period.
-    # Redudant 21 days data will be deleted.
-    try:
-        stocks_data_for_ma = yahoo_fin.get_price_data(
-            tickers=tickers,
-            period=(
-                start_period_dt - timedelta(days=21),
-                end_period_dt
-            )
+        stocks_data_for_ma = screener.load_panel(
+            index_name=chosen_index,
+            period=(start_period_dt, end_period_dt),
+            warmup_sessions=config.MA_WINDOW
         )
     except Exception as e:
         error_msg = "Error in extracting the index stocks data."
@@ -130,59 +841,11 @@ def main() -> None:
         print(error_msg + "See logs.")
         return
     
-    ## Calculating metrics.
-    
-    metrics = MetricsCalculator()
-    
-    try:
-        stocks_data_for_ma = metrics.rs_on_data(
-            stocks_data=stocks_data_for_ma,
-            market_ticker=chosen_index_ticker_name
-        )
-    except Exception as e:
-        error_msg = "Error in calculating rs."
-        error_logger.critical(
-            msg=error_msg + f"\nDescription: {e}"
-        )
-        print(error_msg + "See logs.")
-        return
-    
-    ma_window = config.MA_WINDOW
-        
-    try: 
-        stocks_data_for_ma = metrics.rs_ma_on_data(
-            stocks_data=stocks_data_for_ma,
-            ma_window=ma_window
-        )
-    except Exception as e:
-        error_msg = "Error in calculating moving average."
-        error_logger.critical(
-            msg=error_msg + f"\nDescription: {e}"
-        )
-        print(error_msg + "See logs.")
-        return
-
-    # Cutting the tail with 21 days for ma calculating.
-
-    stocks_data = stocks_data_for_ma[stocks_data_for_ma.index >= start_period]
-    
     ## Filterting stocks
     
-    stock_filter = DataFilter()
-
-    try:
-        rs_filtered_stocks_data = stock_filter.has_rs_grown(
-            stocks_data=stocks_data
-        )
-    except Exception as e:
-        error_msg = "Error in filtering stocks by rs."
-        error_logger.critical(
-            msg=error_msg + f"\nDescription: {e}"
-        )
-        print(error_msg + "See logs.")
-        return
-    
-    max_days_rs_holds_above_ma = len(stocks_data)
+    max_days_rs_holds_above_ma = int(
+        (stocks_data_for_ma.index >= start_period_dt).sum()
+    )
     days_val_is_digit: bool = False
     while not days_val_is_digit:
         days_rs_holds_above_ma = input("Moving average window: ")
@@ -193,13 +856,18 @@ def main() -> None:
             days_rs_holds_above_ma = int(days_rs_holds_above_ma)
             days_val_is_digit = True
     
+    # Rs and its moving average are calculated on the loaded panel, then stocks are filtered.
     try:
-        full_filtered_stocks_data = stock_filter.has_rs_crossed_ma(
-            stocks_data=rs_filtered_stocks_data,
-            days_rs_holds_above_ma=days_rs_holds_above_ma
+        result = run_scan(
+            index=chosen_index,
+            start=start_period_dt,
+            end=end_period_dt,
+            ma_window=config.MA_WINDOW,
+            min_days=days_rs_holds_above_ma,
+            screener=screener
         )
     except Exception as e:
-        error_msg = "Error in filtering stocks by rs that crossed ma."
+        error_msg = "Error in calculating metrics and filtering stocks."
         error_logger.critical(
             msg=error_msg + f"\nDescription: {e}"
         )
@@ -207,14 +875,11 @@ def main() -> None:
         return
     
     ## Result
-    print(
-        ", ".join(
-            list(
-                full_filtered_stocks_data.columns.get_level_values(1).unique()
-            )
-        )
-    )
+    print_scan_result(result=result)
+    store_results(results=[result])
 
 if __name__ == "__main__":
-    main()
-    
\ No newline at end of file
+    if len(sys.argv) > 1:
+        cli()
+    else:
+        main()
@@ -1,8 +1,26 @@
 import unittest
 from robot.classes import(
+    Backtester,
     Yfinance,
     MetricsCalculator,
-    DataFilter
+    DataFilter,
+    FilterPipeline,
+    PriceStore,
+    LocalPriceSource,
+    CachedPriceSource,
+    ConstituentsStore,
+    CrossoverIndex,
+    DownloadScheduler,
+    PricePanel,
+    PriceSource,
+    ResultStore,
+    RsRanker,
+    ScanResult,
+    Screener,
+    ScreenerState,
+    ScreeningService,
+    StageRecorder,
+    TradingCalendar
 )
 from pandas import(
     DataFrame,
@@ -10,8 +28,18 @@ from pandas import(
 )
 import pandas as pd
 import numpy as np
-from datetime import datetime
+import pyarrow as pa
+from datetime import date, datetime
+from pathlib import Path
 from typing import Callable
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import json
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest import mock
 
 
 class TestYfinanceClass(unittest.TestCase):
@@ -199,10 +227,2033 @@ class TestMetricsClass(unittest.TestCase):
             second=np.float64,
             msg=f"Type of the second row is not float, but {type(row_2_ma)}"
         )
+
+
+
+class TestRsOnData(unittest.TestCase):
+    
+    def setUp(self):
+        columns = pd.MultiIndex.from_product(
+            [["Close", "Open"], ["NVDA", "TSLA", "^SPX", "^NDX"]],
+            names=["Price", "Ticker"]
+        )
+        self.df: DataFrame = DataFrame(
+            data=[
+                [22.7, 20.3, 10.0, 5.0, 22.0, 20.0, 10.0, 5.0],
+                [18.4, 17.1, 8.0, 4.0, 18.0, 17.0, 8.0, 4.0],
+                [29.1, 26.4, 12.0, 6.0, 29.0, 26.0, 12.0, 6.0]
+            ],
+            columns=columns
+        )
+    
+    def test_rs_on_data_single_benchmark(self):
+        df: DataFrame = MetricsCalculator().rs_on_data(
+            stocks_data=self.df,
+            market_ticker="^SPX"
+        )
+        for ticker in ["NVDA", "TSLA"]:
+            rs_must_be: Series = MetricsCalculator.rs(
+                stock_price=self.df[("Close", ticker)],
+                market_price=self.df[("Close", "^SPX")]
+            )
+            self.assertListEqual(
+                list1=list(df[("rs", ticker)]),
+                list2=list(rs_must_be),
+                msg=f"Rs is calculated wrongly for {ticker}."
+            )
+        self.assertTrue(
+            expr=df[("Close", "NVDA")].equals(self.df[("Close", "NVDA")]),
+            msg="Price columns have been changed."
+        )
+    
+    def test_rs_on_data_several_benchmarks(self):
+        df: DataFrame = MetricsCalculator().rs_on_data(
+            stocks_data=self.df,
+            market_ticker=["^SPX", "^NDX"]
+        )
+        self.assertIn(
+            member="rs_^SPX",
+            container=df.columns.get_level_values(0),
+            msg="Rs against ^SPX is missing."
+        )
+        self.assertListEqual(
+            list1=list(df[("rs_^NDX", "TSLA")]),
+            list2=[4.06, 4.28, 4.4],
+            msg="Rs against ^NDX is calculated wrongly."
+        )
+
+
+
+class TestResample(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=2)
+        dates = pd.bdate_range("2024-01-01", "2024-06-28", name="Date")
+        values: np.ndarray = rng.random((len(dates), 3))
+        values[rng.random(values.shape) < 0.3] = np.nan
+        self.stocks_data = DataFrame(
+            values,
+            index=dates,
+            columns=pd.MultiIndex.from_product(
+                [["Close"], ["A", "B", "C"]],
+                names=["Price", "Ticker"]
+            )
+        )
+    
+    def test_resample(self):
+        for timeframe, rule in [("weekly", "W-FRI"), ("monthly", "ME")]:
+            expected: DataFrame = self.stocks_data.resample(rule).last()
+            for stocks_data in [self.stocks_data, PricePanel.from_price_data(self.stocks_data)]:
+                bars = MetricsCalculator.resample(stocks_data=stocks_data, timeframe=timeframe)
+                
+                np.testing.assert_allclose(
+                    actual=bars["Close"].to_numpy(),
+                    desired=expected["Close"].to_numpy(),
+                    err_msg=f"{timeframe} bars must keep the last valid close."
+                )
+                self.assertTrue(
+                    expr=set(bars.index) <= set(self.stocks_data.index),
+                    msg="Bars must be dated by trading days."
+                )
+    
+    def test_invalid_timeframe(self):
+        with self.assertRaises(ValueError):
+            MetricsCalculator.resample(stocks_data=self.stocks_data, timeframe="hourly")
+
+
+class TestMovingAverages(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=4)
+        self.values: np.ndarray = 1 + rng.random((120, 6))
+        self.values[rng.random(self.values.shape) < 0.05] = np.nan
+        self.values[:15, 2] = np.nan # Listed later.
+        self.window = 10
+    
+    def test_exponential_means_match_pandas(self):
+        values = DataFrame(self.values)
+        expected: DataFrame = values \
+            .ewm(span=self.window, adjust=False, ignore_na=True, min_periods=self.window) \
+            .mean() \
+            .where(values.notna())
+        
+        np.testing.assert_allclose(
+            actual=MetricsCalculator.moving_averages(
+                values=self.values,
+                window=self.window,
+                ma_kind="ema"
+            ),
+            desired=expected.to_numpy(),
+            atol=1e-8,
+            err_msg="Ema differs from pandas ewm."
+        )
+    
+    def test_weighted_means_match_pandas(self):
+        weights: np.ndarray = np.arange(1, self.window + 1)
+        expected: DataFrame = DataFrame(self.values) \
+            .rolling(self.window) \
+            .apply(lambda window: np.dot(window, weights) / weights.sum(), raw=True)
+        
+        np.testing.assert_allclose(
+            actual=MetricsCalculator.moving_averages(
+                values=self.values,
+                window=self.window,
+                ma_kind="wma"
+            ),
+            desired=expected.to_numpy(),
+            atol=1e-8,
+            err_msg="Wma differs from pandas rolling weighted means."
+        )
+    
+    def test_rs_ma_kinds(self):
+        stocks_data = DataFrame(
+            self.values,
+            index=pd.bdate_range("2024-01-01", periods=len(self.values), name="Date"),
+            columns=pd.MultiIndex.from_product(
+                [["rs"], list("ABCDEF")],
+                names=["Price", "Ticker"]
+            )
+        )
+        simple_data: DataFrame = MetricsCalculator.rs_ma_on_data(
+            stocks_data=stocks_data,
+            ma_window=self.window
+        )
+        
+        np.testing.assert_allclose(
+            actual=simple_data["rs_ma"].to_numpy(),
+            desired=stocks_data["rs"].rolling(self.window).mean().to_numpy(),
+            atol=1e-8,
+            err_msg="Sma must stay the default kind."
+        )
+        with self.assertRaises(ValueError):
+            MetricsCalculator.rs_ma_on_data(
+                stocks_data=stocks_data,
+                ma_window=self.window,
+                ma_kind="hma"
+            )
+
+
+class TestGroupRs(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=6)
+        dates = pd.bdate_range("2024-01-01", periods=60, name="Date")
+        tickers: list[str] = ["A", "B", "C", "D", "E", "^SPX"]
+        close_values: np.ndarray = 50 * np.exp(rng.normal(0, 0.02, (len(dates), 6)).cumsum(axis=0))
+        close_values[:10, 2] = np.nan # Listed later.
+        close_values[30, 3] = np.nan # A missing bar.
+        self.stocks_data = DataFrame(
+            close_values,
+            index=dates,
+            columns=pd.MultiIndex.from_product([["Close"], tickers], names=["Price", "Ticker"])
+        )
+        self.groups: dict[str, str] = {"A": "Tech", "B": "Tech", "C": "Tech", "D": "Energy", "E": "Energy"}
+        self.market_caps = Series({"A": 3e12, "B": 1e11, "C": 5e10, "D": 4e11, "E": 2e10})
+    
+    def expected_group_rs(self, market_caps: Series | None) -> DataFrame:
+        # A composite per group, chained from weighted daily returns of its members.
+        close_data: DataFrame = self.stocks_data["Close"]
+        returns: DataFrame = close_data.pct_change(fill_method=None)
+        market_levels: Series = close_data["^SPX"] / close_data["^SPX"].iloc[0]
+        expected: dict[str, Series] = {}
+        for group in ["Tech", "Energy"]:
+            members: list[str] = [ticker for ticker, name in self.groups.items() if name == group]
+            weights: DataFrame = DataFrame(1.0, index=close_data.index, columns=members) \
+                if market_caps is None \
+                else close_data[members].shift(1) * market_caps[members] / close_data[members].ffill().iloc[-1]
+            weights = weights.where(returns[members].notna())
+            group_returns: Series = (returns[members] * weights).sum(axis=1) \
+                / weights.sum(axis=1).replace(0, np.nan)
+            expected[group] = 100 * (1 + group_returns.fillna(0)).cumprod() / market_levels
+        
+        return DataFrame(expected)
+    
+    def test_group_rs(self):
+        for market_caps in [None, self.market_caps]:
+            group_rs_data: DataFrame = MetricsCalculator.group_rs(
+                stocks_data=self.stocks_data,
+                groups=self.groups,
+                market_ticker="^SPX",
+                market_caps=market_caps
+            )
+            
+            np.testing.assert_allclose(
+                actual=group_rs_data[["Tech", "Energy"]].to_numpy(),
+                desired=self.expected_group_rs(market_caps=market_caps).to_numpy(),
+                atol=0.005,
+                err_msg=f"Group rs is wrong with market caps {market_caps is not None}."
+            )
+    
+    def test_group_rs_on_data(self):
+        for stocks_data in [self.stocks_data, PricePanel.from_price_data(self.stocks_data)]:
+            group_data = MetricsCalculator.group_rs_on_data(
+                stocks_data=stocks_data,
+                groups=self.groups,
+                market_ticker="^SPX"
+            )
+            group_rs_data: DataFrame = group_data["group_rs"]
+            rs_vs_group: DataFrame = group_data["rs_vs_group"]
+            
+            np.testing.assert_allclose(
+                actual=group_rs_data[["A", "B", "C"]].to_numpy(),
+                desired=np.repeat(
+                    self.expected_group_rs(market_caps=None)[["Tech"]].to_numpy(),
+                    3,
+                    axis=1
+                ),
+                atol=0.005,
+                err_msg="Tickers must get the rs of their group."
+            )
+            self.assertTrue(
+                expr=group_rs_data["^SPX"].isna().all() and rs_vs_group["^SPX"].isna().all(),
+                msg="A ticker out of groups must get NaN."
+            )
+            self.assertEqual(
+                first=rs_vs_group["C"].first_valid_index(),
+                second=self.stocks_data.index[10],
+                msg="Rs against a group starts at the first close."
+            )
+            self.assertAlmostEqual(
+                first=rs_vs_group["C"].loc[self.stocks_data.index[10]],
+                second=100.0,
+                delta=0.01,
+                msg="Rs against a group must be based at 100."
+            )
+            self.assertTrue(
+                expr=DataFilter.rs_grown_mask(stocks_data=group_data, field="rs_vs_group").name
+                    == "rs_vs_group_grown",
+                msg="A mask of another rs field is named by the field."
+            )
+
+
+class TestRsRanker(unittest.TestCase):
+    
+    def test_percentile_ranks(self):
+        values = np.array([
+            [1.0, 3.0, 2.0, np.nan],
+            [2.0, 2.0, 1.0, 3.0],
+            [np.nan, 5.0, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, np.nan]
+        ])
+        expected = np.array([
+            [0.0, 100.0, 50.0, np.nan],
+            [50.0, 50.0, 0.0, 100.0],
+            [np.nan, 100.0, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, np.nan]
+        ])
+        
+        np.testing.assert_allclose(
+            actual=RsRanker.percentile_ranks(values=values),
+            desired=expected,
+            err_msg="Percentiles with ties and NaN values are wrong."
+        )
+    
+    def test_percentile_ranks_match_pandas_rank(self):
+        rng = np.random.default_rng(seed=1)
+        values: np.ndarray = np.round(rng.random((50, 30)) * 3, 1)
+        values[rng.random(values.shape) < 0.1] = np.nan
+        values_data = DataFrame(values)
+        expected: DataFrame = (values_data.rank(axis=1) - 1) \
+            .div(values_data.count(axis=1) - 1, axis=0) * 100
+        
+        np.testing.assert_allclose(
+            actual=RsRanker.percentile_ranks(values=values),
+            desired=expected.to_numpy(),
+            err_msg="Percentiles differ from pandas average ranks."
+        )
+    
+    def test_rs_ratings(self):
+        rs_data = DataFrame(
+            {"A": [1.0, 1.1, 1.2], "B": [1.0, 1.0, 1.0], "C": [1.0, 0.9, 0.5]},
+            index=pd.bdate_range("2024-01-01", periods=3)
+        )
+        ratings: DataFrame = RsRanker.rs_ratings(rs_data=rs_data, lookback=1)
+        
+        self.assertTrue(expr=ratings.iloc[0].isna().all(), msg="No rs lookback days back.")
+        self.assertListEqual(
+            list1=list(ratings.iloc[-1]),
+            list2=[99.0, 50.0, 1.0],
+            msg="Ratings are wrong."
+        )
+    
+    def test_top_k(self):
+        scores = Series([5.0, np.nan, 9.0, 1.0, 7.0], index=["A", "B", "C", "D", "E"])
+        
+        self.assertListEqual(
+            list1=list(RsRanker.top_k(scores=scores, k=3).index),
+            list2=["C", "E", "A"],
+            msg="Top tickers are wrong."
+        )
+        self.assertListEqual(
+            list1=list(RsRanker.top_k(scores=scores, k=10).index),
+            list2=["C", "E", "A", "D"],
+            msg="NaN scores must not be selected."
+        )
+
+
+class TestDaysRsAboveMa(unittest.TestCase):
+    
+    def setUp(self):
+        columns = pd.MultiIndex.from_product(
+            [["rs", "rs_ma"], ["AAA", "BBB", "CCC"]],
+            names=["Price", "Ticker"]
+        )
+        self.df: DataFrame = DataFrame(
+            data=[
+                [1.0, 1.0, 1.0, np.nan, np.nan, np.nan],
+                [1.2, 0.9, 1.0, 1.1, 1.0, 1.0],
+                [1.3, 1.1, 1.2, 1.2, 1.0, 1.2],
+                [1.4, 1.2, 1.3, 1.3, 1.3, 1.2]
+            ],
+            columns=columns
+        )
+    
+    def test_days_rs_above_ma(self):
+        streaks: Series = DataFilter().days_rs_above_ma(stocks_data=self.df)
+        
+        # AAA stops at the NaN ma, BBB at rs < ma, CCC skips the rs == ma day.
+        self.assertDictEqual(
+            d1=streaks.to_dict(),
+            d2={"AAA": 3, "BBB": 0, "CCC": 1},
+            msg=f"Streaks are counted wrongly - {streaks.to_dict()}"
+        )
+    
+    def test_has_rs_crossed_ma_keeps_long_streaks(self):
+        df: DataFrame = DataFilter().has_rs_crossed_ma(
+            stocks_data=self.df,
+            days_rs_holds_above_ma=2
+        )
+        self.assertListEqual(
+            list1=list(df.columns.get_level_values(1).unique()),
+            list2=["AAA"],
+            msg="Only AAA has held rs above ma for 2 days."
+        )
+
+
+
+class TestCrossoverIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.dates = pd.bdate_range("2024-01-01", periods=8, name="Date")
+        self.tickers = pd.Index(["A", "B", "C"], name="Ticker")
+        self.ma_values: np.ndarray = np.ones((8, 3))
+        self.rs_values: np.ndarray = np.array([
+            [0.9, 1.1, np.nan],
+            [1.1, 1.0, 0.9],  # A crosses up, B touches its ma.
+            [1.2, 1.1, 1.1],  # C crosses up.
+            [0.8, 0.9, np.nan],  # A and B cross down, C has no rs.
+            [0.9, 1.1, 1.2],  # B crosses up, C starts again.
+            [1.1, 1.2, 0.8],  # A crosses up, C crosses down.
+            [1.2, 1.0, 0.9],
+            [1.3, 0.9, 1.1]   # B crosses down, C crosses up.
+        ])
+        self.index = CrossoverIndex.from_values(
+            rs_values=self.rs_values,
+            ma_values=self.ma_values,
+            dates=self.dates,
+            tickers=self.tickers
+        )
+    
+    def test_events(self):
+        events: DataFrame = self.index.to_frame()
+        
+        self.assertListEqual(
+            list1=list(zip(events["ticker"], events["date"].dt.day, events["direction"])),
+            list2=[
+                ("A", 2, 1), ("C", 3, 1), ("A", 4, -1), ("B", 4, -1),
+                ("B", 5, 1), ("A", 8, 1), ("C", 8, -1), ("B", 10, -1), ("C", 10, 1)
+            ],
+            msg="Crossovers are wrong."
+        )
+    
+    def test_crossed_within(self):
+        self.assertListEqual(
+            list1=self.index.crossed_within(days=4),
+            list2=["B", "A", "C"],
+            msg="Tickers crossed up in the last 4 days are wrong."
+        )
+        self.assertListEqual(
+            list1=self.index.crossed_within(days=2, direction=CrossoverIndex.DOWN),
+            list2=["B"],
+            msg="Tickers crossed down in the last 2 days are wrong."
+        )
+        self.assertListEqual(
+            list1=self.index.crossed_within(days=2, as_of=self.dates[2]),
+            list2=["A", "C"],
+            msg="Crossovers after as_of must not be seen."
+        )
+    
+    def test_lookups_match_rescans(self):
+        rng = np.random.default_rng(seed=5)
+        rs_values: np.ndarray = np.round(1 + rng.normal(0, 0.05, (250, 40)).cumsum(axis=0), 2)
+        rs_values[rng.random(rs_values.shape) < 0.02] = np.nan
+        ma_values: np.ndarray = MetricsCalculator.rolling_means(values=rs_values, windows=[10])[10]
+        index = CrossoverIndex.from_values(
+            rs_values=rs_values,
+            ma_values=ma_values,
+            dates=pd.bdate_range("2023-01-02", periods=250),
+            tickers=pd.Index([f"T{column}" for column in range(40)])
+        )
+        
+        for days in [1, 5, 20]:
+            # A rescan: a cross up is the first day of a streak after a day below ma.
+            expected: list[str] = []
+            for column in range(40):
+                sides: list[float] = []
+                for rs, ma in zip(rs_values[:, column], ma_values[:, column]):
+                    side: float = np.sign(rs - ma)
+                    sides.append(sides[-1] if side == 0 and sides else side)
+                if any(
+                    sides[row - 1] == -1 and sides[row] == 1
+                    for row in range(250 - days, 250)
+                ):
+                    expected.append(f"T{column}")
+            
+            self.assertCountEqual(
+                first=index.crossed_within(days=days),
+                second=expected,
+                msg=f"Lookup of {days} days differs from a rescan."
+            )
+
+
+class TestFilterPipeline(unittest.TestCase):
+    
+    def setUp(self):
+        columns = pd.MultiIndex.from_product(
+            [["rs", "rs_ma"], ["AAA", "BBB", "CCC"]],
+            names=["Price", "Ticker"]
+        )
+        # AAA has grown and held rs above ma, BBB has only grown, CCC has only held.
+        self.df: DataFrame = DataFrame(
+            data=[
+                [1.0, 1.0, 1.5, 0.9, 0.9, 1.0],
+                [1.2, 1.1, 1.3, 1.1, 1.2, 1.2]
+            ],
+            columns=columns
+        )
+    
+    def test_and_pipeline(self):
+        pipeline = FilterPipeline() \
+            .add_filter(
+                name="rs_grown",
+                mask_filter=DataFilter.rs_grown_mask
+            ) \
+            .add_filter(
+                name="rs_crossed_ma",
+                mask_filter=DataFilter.rs_crossed_ma_mask,
+                days_rs_holds_above_ma=2
+            )
+        df: DataFrame = pipeline.run(stocks_data=self.df)
+        
+        self.assertListEqual(
+            list1=list(df.columns.get_level_values(1).unique()),
+            list2=["AAA"],
+            msg="Only AAA passes both filters."
+        )
+        self.assertDictEqual(
+            d1=pipeline.removed_tickers,
+            d2={"rs_grown": 1, "rs_crossed_ma": 1},
+            msg=f"Removed tickers are counted wrongly - {pipeline.removed_tickers}"
+        )
+    
+    def test_or_pipeline(self):
+        pipeline = FilterPipeline() \
+            .add_filter(
+                name="rs_grown",
+                mask_filter=DataFilter.rs_grown_mask
+            ) \
+            .add_filter(
+                name="rs_crossed_ma",
+                mask_filter=DataFilter.rs_crossed_ma_mask,
+                how="or",
+                days_rs_holds_above_ma=2
+            )
+        mask: Series = pipeline.get_mask(stocks_data=self.df)
+        
+        self.assertDictEqual(
+            d1=mask.to_dict(),
+            d2={"AAA": True, "BBB": True, "CCC": True},
+            msg="All tickers pass one of the filters."
+        )
+        self.assertEqual(
+            first=pipeline.removed_tickers["rs_crossed_ma"],
+            second=-1,
+            msg="The or stage must return CCC."
+        )
+
+
+
+class CountingPriceSource(LocalPriceSource):
+    """
+    Local source that records requested spans.
+    """
+    
+    def __init__(self, store: PriceStore):
+        super().__init__(store=store)
+        self.requests: list[tuple[list[str], tuple]] = []
+    
+    def get_price_data(self, tickers, period, fields=None) -> DataFrame:
+        self.requests.append((list(tickers), period))
+        return super().get_price_data(tickers=tickers, period=period, fields=fields)
+
+
+class TestCachedPriceSource(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        remote_store = PriceStore(directory=Path(self.temp_dir.name) / "remote")
+        dates = pd.bdate_range("2024-01-01", "2024-03-29", name="Date")
+        for n, ticker in enumerate(["AAPL", "TSLA", "^SPX"]):
+            remote_store.write(
+                ticker=ticker,
+                ticker_data=DataFrame(
+                    data={"Close": np.arange(len(dates)) + n * 100.0},
+                    index=dates
+                ),
+                period=("2024-01-01", "2024-03-30")
+            )
+        self.remote_source = CountingPriceSource(store=remote_store)
+        self.source = CachedPriceSource(
+            store=PriceStore(directory=Path(self.temp_dir.name) / "local"),
+            source=self.remote_source
+        )
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_fetches_only_missing_spans(self):
+        tickers: list[str] = ["AAPL", "TSLA", "^SPX"]
+        self.source.get_price_data(
+            tickers=tickers,
+            period=("2024-01-01", "2024-02-01")
+        )
+        df: DataFrame = self.source.get_price_data(
+            tickers=tickers,
+            period=("2024-01-15", "2024-03-01")
+        )
+        
+        self.assertListEqual(
+            list1=[period for _, period in self.remote_source.requests],
+            list2=[
+                (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01")),
+                (pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-01"))
+            ],
+            msg="Only the missing span must be fetched."
+        )
+        self.assertEqual(
+            first=str(df.index[0].date()),
+            second="2024-01-15",
+            msg="Period is read incorrectly."
+        )
+        self.assertEqual(
+            first=str(df.index[-1].date()),
+            second="2024-02-29",
+            msg="Period end must be exclusive."
+        )
+        self.assertCountEqual(
+            first=tickers,
+            second=set(df.columns.get_level_values(level=1)),
+            msg="Stocks data is read incorrecly."
+        )
+    
+    def test_cached_period_is_not_fetched(self):
+        period: tuple[str] = ("2024-01-01", "2024-02-01")
+        self.source.get_price_data(tickers=["AAPL"], period=period)
+        self.source.get_price_data(tickers=["AAPL"], period=period)
+        
+        self.assertEqual(
+            first=len(self.remote_source.requests),
+            second=1,
+            msg="Cached period must not be fetched again."
+        )
+    
+    def test_failed_download_is_not_covered(self):
+        period: tuple[str] = ("2024-01-01", "2024-02-01")
+        # Both tickers fail all 3 attempts of the first download.
+        provider = FakeProvider(tickers=["AAPL", "TSLA"], flaky_tickers={"AAPL": 3, "TSLA": 3})
+        source = CachedPriceSource(
+            store=PriceStore(directory=Path(self.temp_dir.name) / "scheduled"),
+            source=DownloadScheduler(
+                source=provider,
+                max_workers=1,
+                requests_per_second=None,
+                max_retries=2,
+                backoff_seconds=0
+            )
+        )
+        failed_df: DataFrame = source.get_price_data(tickers=["AAPL", "TSLA"], period=period)
+        df: DataFrame = source.get_price_data(tickers=["AAPL", "TSLA"], period=period)
+        source.get_price_data(tickers=["AAPL", "TSLA"], period=period)
+        
+        self.assertTrue(expr=failed_df.empty, msg="A failed download has no prices.")
+        self.assertCountEqual(
+            first=set(df.columns.get_level_values(1)),
+            second=["AAPL", "TSLA"],
+            msg="A failed span must be fetched again."
+        )
+        self.assertEqual(
+            first=len(provider.requests),
+            second=4,
+            msg="A fetched span must be covered."
+        )
+    
+    def test_source_error_is_not_covered(self):
+        provider = FailingProvider()
+        source = CachedPriceSource(
+            store=PriceStore(directory=Path(self.temp_dir.name) / "failing"),
+            source=provider
+        )
+        for _ in range(2):
+            df: DataFrame = source.get_price_data(
+                tickers=["AAPL"],
+                period=("2024-01-01", "2024-02-01")
+            )
+        
+        self.assertTrue(expr=df.empty, msg="A failed span has no prices.")
+        self.assertEqual(
+            first=len(provider.requests),
+            second=2,
+            msg="A span of a source error must be fetched again."
+        )
+
+
+
+class FakeProvider(PriceSource):
+    """
+    Local provider with flaky tickers that records requested tickers.
+    """
+    
+    def __init__(
+        self,
+        tickers: list[str],
+        flaky_tickers: dict[str, int] | None = None,
+        interrupting_ticker: str | None = None
+    ):
+        self.tickers = tickers
+        self.flaky_tickers = dict(flaky_tickers or {}) # ticker: failures before success
+        self.interrupting_ticker = interrupting_ticker
+        self.requests: list[list[str]] = []
+    
+    def get_price_data(self, tickers, period, fields=None) -> DataFrame:
+        self.requests.append(list(tickers))
+        if self.interrupting_ticker in tickers:
+            raise KeyboardInterrupt
+        
+        dates = pd.bdate_range(period[0], period[1], inclusive="left", name="Date")
+        prices: dict[tuple[str, str], np.ndarray] = {}
+        for ticker in tickers:
+            has_failed: bool = self.flaky_tickers.get(ticker, 0) > 0
+            if has_failed:
+                self.flaky_tickers[ticker] -= 1
+            prices[("Close", ticker)] = np.full(len(dates), np.nan) \
+                if has_failed or ticker not in self.tickers else np.arange(len(dates), dtype=float)
+        
+        return DataFrame(prices, index=dates)
+
+
+class FailingProvider(PriceSource):
+    """
+    Local provider which connection always fails.
+    """
+    
+    def __init__(self):
+        self.requests: list[list[str]] = []
+    
+    def get_price_data(self, tickers, period, fields=None) -> DataFrame:
+        self.requests.append(list(tickers))
+        raise ConnectionError("Connection refused.")
+
+
+class TestDownloadScheduler(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.period: tuple[str] = ("2024-01-01", "2024-02-01")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def make_scheduler(self, provider: PriceSource) -> DownloadScheduler:
+        return DownloadScheduler(
+            source=provider,
+            batch_size=2,
+            max_workers=1,
+            requests_per_second=None,
+            max_retries=2,
+            backoff_seconds=0,
+            checkpoint_dir=self.temp_dir.name
+        )
+    
+    def test_retries_and_normalizes_tickers(self):
+        provider = FakeProvider(
+            tickers=["AAPL", "BRK-B", "TSLA"],
+            flaky_tickers={"TSLA": 1}
+        )
+        scheduler = self.make_scheduler(provider=provider)
+        df: DataFrame = scheduler.get_price_data(
+            tickers=["AAPL", "BRK.B", "TSLA", "XXXX"],
+            period=self.period
+        )
+        
+        self.assertCountEqual(
+            first=set(df.columns.get_level_values(1)),
+            second=["AAPL", "BRK.B", "TSLA"],
+            msg="Requested symbols must be kept in columns."
+        )
+        self.assertListEqual(
+            list1=provider.requests,
+            list2=[["AAPL", "BRK-B"], ["TSLA", "XXXX"], ["TSLA", "XXXX"], ["XXXX"]],
+            msg="Only tickers without data must be retried."
+        )
+        self.assertListEqual(
+            list1=scheduler.failed_tickers,
+            list2=["XXXX"],
+            msg="XXXX must be reported as failed."
+        )
+    
+    def test_resumes_from_checkpoint(self):
+        tickers: list[str] = ["AAPL", "MSFT", "TSLA", "NVDA"]
+        interrupting_provider = FakeProvider(tickers=tickers, interrupting_ticker="TSLA")
+        with self.assertRaises(KeyboardInterrupt):
+            self.make_scheduler(provider=interrupting_provider).get_price_data(
+                tickers=tickers,
+                period=self.period
+            )
+        
+        provider = FakeProvider(tickers=tickers)
+        df: DataFrame = self.make_scheduler(provider=provider).get_price_data(
+            tickers=tickers,
+            period=self.period
+        )
+        
+        self.assertListEqual(
+            list1=provider.requests,
+            list2=[["TSLA", "NVDA"]],
+            msg="The finished batch must be read from its checkpoint."
+        )
+        self.assertCountEqual(
+            first=set(df.columns.get_level_values(1)),
+            second=tickers,
+            msg="Resumed download misses tickers."
+        )
+    
+    def test_batch_with_failed_tickers_is_not_checkpointed(self):
+        tickers: list[str] = ["AAPL", "XXXX", "TSLA", "NVDA"]
+        with self.assertRaises(KeyboardInterrupt):
+            self.make_scheduler(
+                provider=FakeProvider(tickers=["AAPL", "TSLA", "NVDA"], interrupting_ticker="TSLA")
+            ).get_price_data(tickers=tickers, period=self.period)
+        
+        provider = FakeProvider(tickers=["AAPL", "XXXX", "TSLA", "NVDA"])
+        df: DataFrame = self.make_scheduler(provider=provider).get_price_data(
+            tickers=tickers,
+            period=self.period
+        )
+        
+        self.assertListEqual(
+            list1=provider.requests,
+            list2=[["AAPL", "XXXX"], ["TSLA", "NVDA"]],
+            msg="A batch with a failed ticker must be downloaded again."
+        )
+        self.assertCountEqual(
+            first=set(df.columns.get_level_values(1)),
+            second=tickers,
+            msg="Resumed download misses tickers."
+        )
+    
+    def test_span_without_sessions(self):
+        provider = FakeProvider(tickers=["AAPL", "TSLA"])
+        scheduler = self.make_scheduler(provider=provider)
+        source = CachedPriceSource(
+            store=PriceStore(directory=Path(self.temp_dir.name) / "store"),
+            source=scheduler
+        )
+        source.get_price_data(tickers=["AAPL", "TSLA"], period=("2024-01-01", "2024-01-06"))
+        # 2024-01-06 and 2024-01-07 are a weekend.
+        df: DataFrame = source.get_price_data(
+            tickers=["AAPL", "TSLA"],
+            period=("2024-01-01", "2024-01-08")
+        )
+        
+        self.assertListEqual(
+            list1=provider.requests,
+            list2=[["AAPL", "TSLA"], ["AAPL", "TSLA"]],
+            msg="An empty span must be requested once without retries."
+        )
+        self.assertListEqual(
+            list1=scheduler.failed_tickers,
+            list2=[],
+            msg="Tickers of an empty span have not failed."
+        )
+        self.assertEqual(
+            first=len(df),
+            second=5,
+            msg="Cached bars must be read."
+        )
+    
+    def test_failed_span(self):
+        provider = FailingProvider()
+        scheduler = self.make_scheduler(provider=provider)
+        df: DataFrame = scheduler.get_price_data(tickers=["AAPL", "TSLA"], period=self.period)
+        cached_df: DataFrame = CachedPriceSource(
+            store=PriceStore(directory=Path(self.temp_dir.name) / "store"),
+            source=scheduler
+        ).get_price_data(tickers=["AAPL", "TSLA"], period=self.period)
+        
+        for price_data in [df, cached_df]:
+            self.assertTrue(expr=price_data.empty, msg="A failed span has no prices.")
+            self.assertListEqual(
+                list1=list(price_data.columns.names),
+                list2=["Price", "Ticker"],
+                msg="Empty price data must keep (Price, Ticker) columns."
+            )
+        self.assertListEqual(
+            list1=scheduler.failed_tickers,
+            list2=["AAPL", "TSLA"],
+            msg="Tickers of a failed span must be reported."
+        )
+        self.assertEqual(
+            first=len(provider.requests),
+            second=6,
+            msg="A failed span must be retried."
+        )
+
+
+
+class TestConstituentsStore(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ConstituentsStore(directory=self.temp_dir.name, ttl_days=7)
+        self.store.save(
+            index_name="S&P 500",
+            constituents=DataFrame({"Symbol": ["AAPL", "BRK.B"]}),
+            snapshot_date=date(2024, 1, 2)
+        )
+        self.store.save(
+            index_name="S&P 500",
+            constituents=DataFrame({"Symbol": ["AAPL", "NVDA"]}),
+            snapshot_date=date(2024, 6, 3)
+        )
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_load_as_of(self):
+        snapshot: DataFrame = self.store.load(
+            index_name="S&P 500",
+            as_of=datetime(2024, 3, 1)
+        )
+        latest_snapshot: DataFrame = self.store.load(index_name="S&P 500")
+        
+        self.assertListEqual(
+            list1=snapshot["Symbol"].to_list(),
+            list2=["AAPL", "BRK.B"],
+            msg="Membership as of a date is loaded wrongly."
+        )
+        self.assertListEqual(
+            list1=latest_snapshot["Symbol"].to_list(),
+            list2=["AAPL", "NVDA"],
+            msg="The latest membership is loaded wrongly."
+        )
+    
+    def test_get_constituents_refreshes_stale_snapshot(self):
+        fetched: list[bool] = []
+        def fetch_constituents() -> DataFrame:
+            fetched.append(True)
+            return DataFrame({"Symbol": ["AAPL", "MSFT"]})
+        
+        self.store.get_constituents(
+            index_name="S&P 500",
+            fetch_constituents=fetch_constituents
+        )
+        constituents: DataFrame = self.store.get_constituents(
+            index_name="S&P 500",
+            fetch_constituents=fetch_constituents
+        )
+        
+        self.assertEqual(
+            first=len(fetched),
+            second=1,
+            msg="A fresh snapshot must not be fetched again."
+        )
+        self.assertListEqual(
+            list1=constituents["Symbol"].to_list(),
+            list2=["AAPL", "MSFT"],
+            msg="The refreshed membership is not returned."
+        )
+
+
+
+class TestPricePanel(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=2)
+        dates = pd.bdate_range("2024-01-01", periods=40, name="Date")
+        columns = pd.MultiIndex.from_product(
+            [["Close", "Open", "Volume"], ["AAA", "BBB", "^SPX"]],
+            names=["Price", "Ticker"]
+        )
+        self.df: DataFrame = DataFrame(
+            data=100 + rng.normal(0, 1, (len(dates), len(columns))).cumsum(axis=0),
+            index=dates,
+            columns=columns
+        )
+    
+    def test_keeps_requested_fields(self):
+        panel = PricePanel.from_price_data(
+            price_data=self.df,
+            fields=["Close"],
+            dtype=np.float32
+        )
+        close_view: DataFrame = panel["Close"]
+        
+        self.assertListEqual(
+            list1=list(panel.fields.keys()),
+            list2=["Close"],
+            msg="Only the Close field must be kept."
+        )
+        self.assertEqual(
+            first=panel.fields["Close"].dtype,
+            second=np.float32,
+            msg="Prices must be kept as float32."
+        )
+        self.assertTrue(
+            expr=np.shares_memory(close_view.to_numpy(), panel.fields["Close"]),
+            msg="A field view must not copy the array."
+        )
+    
+    def test_metrics_and_filters_accept_panel(self):
+        panel = PricePanel.from_price_data(price_data=self.df, fields=["Close"])
+        metrics = MetricsCalculator()
+        panel = metrics.rs_ma_on_data(
+            stocks_data=metrics.rs_on_data(stocks_data=panel, market_ticker="^SPX"),
+            ma_window=5
+        )
+        df: DataFrame = metrics.rs_ma_on_data(
+            stocks_data=metrics.rs_on_data(stocks_data=self.df[["Close"]], market_ticker="^SPX"),
+            ma_window=5
+        )
+        
+        self.assertTrue(
+            expr=panel.to_frame().equals(df),
+            msg="Panel metrics differ from dataframe metrics."
+        )
+        self.assertTrue(
+            expr=DataFilter.days_rs_above_ma(stocks_data=panel).equals(
+                DataFilter.days_rs_above_ma(stocks_data=df)
+            ),
+            msg="Panel streaks differ from dataframe streaks."
+        )
+        filtered_panel = DataFilter.has_rs_crossed_ma(
+            stocks_data=panel,
+            days_rs_holds_above_ma=1
+        )
+        self.assertListEqual(
+            list1=list(filtered_panel.tickers),
+            list2=list(
+                DataFilter.has_rs_crossed_ma(stocks_data=df, days_rs_holds_above_ma=1)
+                .columns.get_level_values(1).unique()
+            ),
+            msg="Panel is filtered differently."
+        )
+    
+    def test_save_and_memory_map(self):
+        panel = PricePanel.from_price_data(price_data=self.df, fields=["Close", "Volume"])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            panel.save(directory=temp_dir)
+            loaded_panel = PricePanel.load(directory=temp_dir, fields=["Close"])
+            
+            self.assertIsInstance(
+                obj=loaded_panel.fields["Close"],
+                cls=np.memmap,
+                msg="Field must be memory-mapped."
+            )
+            self.assertTrue(
+                expr=loaded_panel["Close"].equals(panel["Close"]),
+                msg="Loaded panel differs from the saved one."
+            )
+            del loaded_panel
+
+
+class TestScreener(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        store = PriceStore(directory=self.temp_dir.name)
+        dates = pd.bdate_range("2024-01-01", "2024-03-29", name="Date")
+        trend = np.arange(len(dates), dtype=float)
+        prices: dict[str, np.ndarray] = {
+            "UP": 100 + 2 * trend,
+            "DOWN": 100 - 0.5 * trend,
+            "^SPX": 100 + trend
+        }
+        for ticker, close_prices in prices.items():
+            store.write(
+                ticker=ticker,
+                ticker_data=DataFrame({"Close": close_prices}, index=dates),
+                period=("2024-01-01", "2024-03-30")
+            )
+        self.price_source = CountingPriceSource(store=store)
+        self.screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["UP", "DOWN"],
+            market_tickers={"TEST": "^SPX"}
+        )
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_run_scan(self):
+        result: ScanResult = self.screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 1),
+            end=datetime(2024, 3, 1),
+            ma_window=5,
+            min_days=3
+        )
+        
+        self.assertListEqual(
+            list1=result.tickers,
+            list2=["UP"],
+            msg=f"Only UP has outperformed the market - {result.tickers}"
+        )
+        self.assertGreaterEqual(
+            a=result.days_rs_above_ma["UP"],
+            b=3,
+            msg="The streak of UP is too short."
+        )
+        self.assertListEqual(
+            list1=list(result.to_frame().columns),
+            list2=["rs", "rs_ma", "days_rs_above_ma", "rs_rating"],
+            msg="Result frame columns are wrong."
+        )
+    
+    def test_scan_uses_members_as_of_its_start(self):
+        # UP joins the index on 2024-02-15.
+        screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["DOWN"] if as_of < datetime(2024, 2, 15)
+                else ["UP", "DOWN"],
+            market_tickers={"TEST": "^SPX"}
+        )
+        scan_kwargs: dict = {"index_name": "TEST", "end": datetime(2024, 3, 1), "ma_window": 5, "min_days": 3}
+        early_result: ScanResult = screener.run_scan(start=datetime(2024, 2, 1), **scan_kwargs)
+        late_result: ScanResult = screener.run_scan(start=datetime(2024, 2, 20), **scan_kwargs)
+        early_again_result: ScanResult = screener.run_scan(start=datetime(2024, 2, 1), **scan_kwargs)
+        
+        self.assertListEqual(
+            list1=[early_result.tickers, late_result.tickers, early_again_result.tickers],
+            list2=[[], ["UP"], []],
+            msg="Scans do not use members as of their start."
+        )
+        self.assertListEqual(
+            list1=list(screener.members),
+            list2=[("TEST", pd.Timestamp("2024-02-01")), ("TEST", pd.Timestamp("2024-02-20"))],
+            msg="Members of a date must be read once."
+        )
+    
+    def test_scans_reuse_loaded_panel(self):
+        # The warm-up of the longest window is loaded first.
+        for ma_window, min_days in [(10, 1), (5, 1), (5, 3)]:
+            self.screener.run_scan(
+                index_name="TEST",
+                start=datetime(2024, 2, 1),
+                end=datetime(2024, 3, 1),
+                ma_window=ma_window,
+                min_days=min_days
+            )
+        rs_panel: DataFrame = self.screener.rs_panels["TEST"]
+        self.screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 15),
+            end=datetime(2024, 3, 1),
+            ma_window=10,
+            min_days=2
+        )
+        
+        self.assertEqual(
+            first=len(self.price_source.requests),
+            second=1,
+            msg="Prices must be fetched once."
+        )
+        self.assertIs(
+            expr1=self.screener.rs_panels["TEST"],
+            expr2=rs_panel,
+            msg="Rs must be computed once."
+        )
+        self.assertCountEqual(
+            first=self.screener.rs_ma_panels.keys(),
+            second=[("TEST", 5, "sma"), ("TEST", 10, "sma")],
+            msg="Rs ma must be computed once per window."
+        )
+    
+    def test_sweep_matches_scans(self):
+        periods: list[tuple[datetime, datetime]] = [
+            (datetime(2024, 1, 15), datetime(2024, 3, 1)),
+            (datetime(2024, 2, 1), datetime(2024, 3, 29))
+        ]
+        sweep_results: DataFrame = self.screener.sweep(
+            index_name="TEST",
+            periods=periods,
+            ma_windows=[3, 5, 10],
+            min_days_list=[1, 5, 30]
+        )
+        
+        for start, end in periods:
+            for ma_window in [3, 5, 10]:
+                for min_days in [1, 5, 30]:
+                    result: ScanResult = self.screener.run_scan(
+                        index_name="TEST",
+                        start=start,
+                        end=end,
+                        ma_window=ma_window,
+                        min_days=min_days
+                    )
+                    swept_tickers = sweep_results[
+                        (sweep_results["start"] == start)
+                        & (sweep_results["ma_window"] == ma_window)
+                        & (sweep_results["min_days"] == min_days)
+                    ]["ticker"]
+                    self.assertListEqual(
+                        list1=list(swept_tickers),
+                        list2=result.tickers,
+                        msg=f"Sweep differs from a scan for {start}, {ma_window}, {min_days}."
+                    )
+        self.assertEqual(
+            first=len(self.price_source.requests),
+            second=1,
+            msg="Prices must be fetched once."
+        )
+
+    
+    def test_multi_index_scan_matches_scans(self):
+        tickers_by_index: dict[str, list[str]] = {"TEST": ["UP", "DOWN"], "OTHER": ["UP"]}
+        screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: tickers_by_index[index_name],
+            market_tickers={"TEST": "^SPX", "OTHER": "DOWN"}
+        )
+        scan_kwargs: dict = {
+            "start": datetime(2024, 2, 1),
+            "end": datetime(2024, 3, 1),
+            "ma_window": 5,
+            "min_days": 3
+        }
+        results: dict[str, ScanResult] = screener.multi_index_scan(
+            index_names=["TEST", "OTHER"],
+            workers=2,
+            shard_size=1,
+            **scan_kwargs
+        )
+        
+        self.assertEqual(
+            first=len(self.price_source.requests),
+            second=1,
+            msg="The union of constituents must be fetched once."
+        )
+        self.assertCountEqual(
+            first=self.price_source.requests[0][0],
+            second=["UP", "DOWN", "^SPX"],
+            msg="Every ticker must be fetched once."
+        )
+        for index_name in ["TEST", "OTHER"]:
+            result: ScanResult = screener.run_scan(index_name=index_name, **scan_kwargs)
+            self.assertListEqual(
+                list1=results[index_name].tickers,
+                list2=result.tickers,
+                msg=f"Multi index scan differs from a scan of {index_name}."
+            )
+            self.assertTrue(
+                expr=results[index_name].days_rs_above_ma.equals(result.days_rs_above_ma),
+                msg=f"Streaks differ from a scan of {index_name}."
+            )
+            self.assertTrue(
+                expr=results[index_name].rs_rating.equals(result.rs_rating),
+                msg=f"Rs ratings differ from a scan of {index_name}."
+            )
+            np.testing.assert_array_equal(
+                actual=results[index_name].rs_ma.to_numpy(),
+                desired=result.rs_ma.to_numpy(),
+                err_msg=f"Rs ma differs from a scan of {index_name}."
+            )
+    
+    def test_timeframe_confirmations(self):
+        scan_kwargs: dict = {
+            "index_name": "TEST",
+            "start": datetime(2024, 2, 1),
+            "end": datetime(2024, 3, 1),
+            "ma_window": 5,
+            "min_days": 3
+        }
+        # The longest warm-up is loaded first, so the next scan reuses the panel.
+        strict_result: ScanResult = self.screener.run_scan(
+            timeframes={"weekly": (2, 1), "monthly": (1, 5)},
+            **scan_kwargs
+        )
+        result: ScanResult = self.screener.run_scan(
+            timeframes={"weekly": (2, 1)},
+            **scan_kwargs
+        )
+        weekly_data: PricePanel = self.screener.get_metrics(
+            index_name="TEST",
+            ma_window=2,
+            timeframe="weekly"
+        )
+        
+        self.assertListEqual(list1=result.tickers, list2=["UP"], msg="UP holds on weekly bars.")
+        self.assertListEqual(
+            list1=strict_result.tickers,
+            list2=[],
+            msg="A period of a month has no five monthly bars."
+        )
+        self.assertEqual(
+            first=strict_result.removed_tickers["rs_grown_monthly"]
+            + strict_result.removed_tickers["rs_crossed_ma_monthly"],
+            second=1,
+            msg="Monthly filters must remove UP."
+        )
+        self.assertTrue(
+            expr=(weekly_data.index[:-1].dayofweek == 4).all(),
+            msg="Full weekly bars are dated by Fridays."
+        )
+        self.assertEqual(
+            first=len(self.price_source.requests),
+            second=1,
+            msg="Timeframes must be resampled from the loaded panel."
+        )
+    
+    def test_streaming_scan_matches_scan(self):
+        scan_kwargs: dict = {
+            "index_name": "TEST",
+            "start": datetime(2024, 2, 1),
+            "end": datetime(2024, 3, 1),
+            "ma_window": 5,
+            "min_days": 0
+        }
+        result: ScanResult = self.screener.run_scan(**scan_kwargs)
+        _, panel = self.screener.panels["TEST"]
+        panel.save(directory=self.temp_dir.name + "/panel", ticker_major=True)
+        
+        for chunk_size in [1, 2, 10]:
+            streamed_result: ScanResult = self.screener.streaming_scan(
+                panel_directory=self.temp_dir.name + "/panel",
+                chunk_size=chunk_size,
+                **scan_kwargs
+            )
+            self.assertListEqual(
+                list1=streamed_result.tickers,
+                list2=result.tickers,
+                msg=f"Tickers of chunks of {chunk_size} differ from the scan."
+            )
+            for metric in ["rs", "rs_ma", "days_rs_above_ma", "rs_rating"]:
+                np.testing.assert_array_equal(
+                    actual=getattr(streamed_result, metric).to_numpy(),
+                    desired=getattr(result, metric).to_numpy(),
+                    err_msg=f"{metric} of chunks of {chunk_size} differs from the scan."
+                )
+    
+    def test_streaming_scan_memory_is_bounded_by_chunk(self):
+        rng = np.random.default_rng(seed=3)
+        dates = pd.bdate_range("2020-01-01", periods=500, name="Date")
+        tickers: list[str] = [f"T{ticker_nr}" for ticker_nr in range(1000)] + ["^SPX"]
+        close_prices: np.ndarray = 100 * np.exp(
+            np.cumsum(rng.normal(0, 0.01, (len(dates), len(tickers))), axis=0)
+        )
+        panel = PricePanel(fields={"Close": close_prices}, dates=dates, tickers=pd.Index(tickers))
+        panel.save(directory=self.temp_dir.name + "/panel", ticker_major=True)
+        del close_prices, panel
+        
+        tracemalloc.start()
+        try:
+            self.screener.streaming_scan(
+                panel_directory=self.temp_dir.name + "/panel",
+                index_name="TEST",
+                start=dates[100],
+                end=dates[-1],
+                ma_window=21,
+                min_days=1,
+                chunk_size=50
+            )
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        self.assertLess(
+            a=peak_bytes,
+            b=len(dates) * len(tickers) * 8 / 2,
+            msg=f"Peak memory {peak_bytes} is not bounded by the chunk size."
+        )
+    
+    def test_warmup_is_ma_window_sessions(self):
+        self.screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 1),
+            end=datetime(2024, 3, 1),
+            ma_window=5,
+            min_days=1
+        )
+        metrics_data: PricePanel = self.screener.get_metrics(index_name="TEST", ma_window=5)
+        
+        self.assertEqual(
+            first=metrics_data.index[0],
+            second=pd.Timestamp("2024-01-25"),
+            msg="Five sessions before the period must be loaded."
+        )
+        self.assertFalse(
+            expr=metrics_data.loc_dates(start=datetime(2024, 2, 1))["rs_ma"].iloc[0].isna().any(),
+            msg="Rs ma must be known on the first day of the period."
+        )
+        self.assertNotIn(
+            member=pd.Timestamp("2024-02-19"),
+            container=metrics_data.index,
+            msg="Presidents day is not a session."
+        )
+    
+    def test_top_rated_tickers(self):
+        screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["UP", "DOWN"],
+            market_tickers={"TEST": "^SPX"}
+        )
+        result: ScanResult = screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 1),
+            end=datetime(2024, 3, 1),
+            ma_window=5,
+            min_days=0
+        )
+        
+        self.assertDictEqual(
+            d1=result.rs_rating.to_dict(),
+            d2={"UP": 99.0},
+            msg="UP has the highest rs growth of the index."
+        )
+        self.assertListEqual(
+            list1=list(result.top(k=1, by="days_rs_above_ma").index),
+            list2=["UP"],
+            msg="Top tickers are wrong."
+        )
+
+
+    def test_ma_kinds_and_crossovers(self):
+        results: dict[str, ScanResult] = {
+            ma_kind: self.screener.run_scan(
+                index_name="TEST",
+                start=datetime(2024, 2, 1),
+                end=datetime(2024, 3, 1),
+                ma_window=5,
+                min_days=3,
+                ma_kind=ma_kind
+            )
+            for ma_kind in MetricsCalculator.MA_KINDS
+        }
+        crossed_result: ScanResult = self.screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 1),
+            end=datetime(2024, 3, 1),
+            ma_window=5,
+            min_days=3,
+            crossed_up_days=5
+        )
+        
+        for ma_kind, result in results.items():
+            self.assertListEqual(
+                list1=result.tickers,
+                list2=["UP"],
+                msg=f"Only UP has outperformed the market with {ma_kind}."
+            )
+            self.assertEqual(
+                first=result.to_dict()["ma_kind"],
+                second=ma_kind,
+                msg="Ma kind is not kept in the result."
+            )
+        self.assertCountEqual(
+            first=self.screener.rs_ma_panels.keys(),
+            second=[("TEST", 5, ma_kind) for ma_kind in MetricsCalculator.MA_KINDS],
+            msg="Rs ma must be computed once per kind."
+        )
+        self.assertListEqual(
+            list1=crossed_result.tickers,
+            list2=[],
+            msg="Rs of UP has been above its ma since the warm-up."
+        )
+        self.assertEqual(
+            first=crossed_result.removed_tickers["rs_crossed_up"],
+            second=1,
+            msg="UP must be removed by the crossover filter."
+        )
+        self.assertIs(
+            expr1=self.screener.get_crossovers(index_name="TEST", ma_window=5),
+            expr2=self.screener.crossover_indexes[("TEST", 5, "sma")],
+            msg="Crossovers must be found once per panel."
+        )
+
+
+    def test_strong_stock_in_strong_sector(self):
+        screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["UP", "DOWN"],
+            market_tickers={"TEST": "^SPX"},
+            get_groups=lambda index_name, as_of, group_level: {"UP": "Tech", "DOWN": "Tech"},
+            market_caps=Series({"UP": 1e12, "DOWN": 1e9})
+        )
+        scan_kwargs: dict = {
+            "index_name": "TEST",
+            "start": datetime(2024, 2, 1),
+            "end": datetime(2024, 3, 1),
+            "ma_window": 5,
+            "min_days": 3,
+            "group_level": "sector"
+        }
+        equal_result: ScanResult = screener.run_scan(**scan_kwargs)
+        cap_result: ScanResult = screener.run_scan(**scan_kwargs, cap_weighted=True)
+        
+        self.assertListEqual(
+            list1=equal_result.tickers,
+            list2=[],
+            msg="An equally weighted sector of UP and DOWN lags the market."
+        )
+        self.assertEqual(
+            first=equal_result.removed_tickers["sector_rs_grown"],
+            second=1,
+            msg="UP must be removed by the sector filter."
+        )
+        self.assertListEqual(
+            list1=cap_result.tickers,
+            list2=["UP"],
+            msg="A sector weighted by the cap of UP beats the market and UP beats the sector."
+        )
+        self.assertListEqual(
+            list1=list(cap_result.to_frame().columns),
+            list2=["rs", "rs_ma", "days_rs_above_ma", "rs_rating", "group_rs"],
+            msg="Group rs must be added to the result."
+        )
+        self.assertCountEqual(
+            first=screener.group_panels.keys(),
+            second=[("TEST", "sector", False), ("TEST", "sector", True)],
+            msg="Group metrics must be computed once per weighting."
+        )
+
+
+class TestResultStore(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ResultStore(directory=self.temp_dir.name)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    @staticmethod
+    def make_result(tickers: list[str], index_name: str = "S&P 500", ma_window: int = 21) -> ScanResult:
+        return ScanResult(
+            index_name=index_name,
+            period=(datetime(2024, 1, 2), datetime(2024, 3, 1)),
+            ma_window=ma_window,
+            days_rs_holds_above_ma=3,
+            tickers=tickers,
+            rs=Series(1.5, index=tickers, dtype=float),
+            days_rs_above_ma=Series(4, index=tickers, dtype=int),
+            rs_rating=Series(90.0, index=tickers, dtype=float),
+            rs_ma=Series(1.4, index=tickers, dtype=float)
+        )
+    
+    def test_write_and_read(self):
+        result_path: Path = self.store.write(
+            result=self.make_result(tickers=["A", "B"]),
+            scan_date=date(2024, 3, 1)
+        )
+        self.store.write(
+            result=self.make_result(tickers=["C"], index_name="NASDAQ 100"),
+            scan_date=date(2024, 3, 1)
+        )
+        results: DataFrame = self.store.read(index_name="S&P 500").to_pandas()
+        
+        self.assertEqual(
+            first=result_path.parent.relative_to(self.temp_dir.name).as_posix(),
+            second="index=S%26P%20500/scan_date=2024-03-01",
+            msg="Results must be partitioned by index and scan date."
+        )
+        self.assertListEqual(
+            list1=list(results["ticker"]),
+            list2=["A", "B"],
+            msg="Only results of the index must be read."
+        )
+        self.assertDictEqual(
+            d1=results.drop(columns=["run_id", "written_at"]).iloc[0].to_dict(),
+            d2={
+                "start": date(2024, 1, 2),
+                "end": date(2024, 3, 1),
+                "ma_window": 21,
+                "ma_kind": "sma",
+                "min_days": 3,
+                "ticker": "A",
+                "rs": 1.5,
+                "rs_ma": 1.4,
+                "days_rs_above_ma": 4,
+                "rs_rating": 90.0,
+                "index": "S&P 500",
+                "scan_date": date(2024, 3, 1)
+            },
+            msg="Metrics and parameters of a ticker are wrong."
+        )
+        self.assertEqual(
+            first=ResultStore(directory=self.temp_dir.name + "/missing").read().num_rows,
+            second=0,
+            msg="A missing store must read as empty."
+        )
+    
+    def test_passed_by_day(self):
+        for scan_date, tickers, ma_window in [
+            (date(2024, 1, 15), ["OLD"], 21),
+            (date(2024, 2, 28), ["A", "B"], 21),
+            (date(2024, 2, 29), [], 21),
+            (date(2024, 3, 1), ["C"], 21),
+            (date(2024, 3, 1), ["D"], 21), # A rerun replaces the earlier scan.
+            (date(2024, 3, 1), ["E"], 10)
+        ]:
+            self.store.write(
+                result=self.make_result(tickers=tickers, ma_window=ma_window),
+                scan_date=scan_date
+            )
+        passed_by_day: Series = self.store.passed_by_day(
+            index_name="S&P 500",
+            days=30,
+            as_of=date(2024, 3, 1),
+            ma_window=21
+        )
+        
+        self.assertDictEqual(
+            d1=passed_by_day.to_dict(),
+            d2={date(2024, 2, 28): ["A", "B"], date(2024, 2, 29): [], date(2024, 3, 1): ["D"]},
+            msg="Passed tickers of the last 30 days are wrong."
+        )
+    
+    def test_read_is_memory_mapped(self):
+        tickers: list[str] = [f"T{ticker_nr}" for ticker_nr in range(100_000)]
+        for day in [1, 2]:
+            self.store.write(result=self.make_result(tickers=tickers), scan_date=date(2024, 3, day))
+        
+        allocated_bytes: int = pa.total_allocated_bytes()
+        results = self.store.read(index_name="S&P 500", since=date(2024, 3, 2))
+        allocated_bytes = pa.total_allocated_bytes() - allocated_bytes
+        
+        self.assertEqual(first=results.num_rows, second=100_000, msg="Only one date must be read.")
+        # Only partition columns are built, stored columns are mapped from files.
+        self.assertLess(
+            a=allocated_bytes,
+            b=results.nbytes / 4,
+            msg=f"Reading allocated {allocated_bytes} of {results.nbytes} bytes."
+        )
+
+
+class TestTradingCalendar(unittest.TestCase):
+    
+    def setUp(self):
+        self.calendar = TradingCalendar()
+    
+    def test_sessions_per_year(self):
+        for year, sessions_count in [(2019, 252), (2022, 251), (2023, 250), (2024, 252)]:
+            self.assertEqual(
+                first=len(self.calendar.sessions_in(
+                    start=datetime(year, 1, 1),
+                    end=datetime(year + 1, 1, 1)
+                )),
+                second=sessions_count,
+                msg=f"Sessions of {year} are wrong."
+            )
+    
+    def test_holidays(self):
+        days = pd.DatetimeIndex([
+            "2024-03-29", # Good friday
+            "2022-06-20", # Juneteenth on sunday is observed on monday
+            "2021-12-31", # New year's day on saturday is not moved to friday
+            "2012-10-29", # Hurricane Sandy
+            "2024-07-03"
+        ])
+        
+        self.assertListEqual(
+            list1=list(self.calendar.is_session(days)),
+            list2=[False, False, True, False, True],
+            msg="Holidays are wrong."
+        )
+    
+    def test_sessions_back(self):
+        self.assertEqual(
+            first=self.calendar.sessions_back(day=datetime(2024, 1, 16), sessions_count=2),
+            second=pd.Timestamp("2024-01-11"),
+            msg="MLK day and the weekend are not sessions."
+        )
+        self.assertEqual(
+            first=self.calendar.sessions_back(day=datetime(2024, 1, 13), sessions_count=0),
+            second=pd.Timestamp("2024-01-16"),
+            msg="A weekend day starts at the next session."
+        )
+
+
+class TestStageRecorder(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        store = PriceStore(directory=self.temp_dir.name)
+        dates = pd.bdate_range("2024-01-01", "2024-03-29", name="Date")
+        trend = np.arange(len(dates), dtype=float)
+        for ticker, close_prices in {"UP": 100 + 2 * trend, "^SPX": 100 + trend}.items():
+            store.write(
+                ticker=ticker,
+                ticker_data=DataFrame({"Close": close_prices}, index=dates),
+                period=("2024-01-01", "2024-03-30")
+            )
+        self.price_source = LocalPriceSource(store=store)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def scan(self, recorder: StageRecorder) -> ScanResult:
+        screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["UP"],
+            market_tickers={"TEST": "^SPX"},
+            recorder=recorder
+        )
+        return screener.run_scan(
+            index_name="TEST",
+            start=datetime(2024, 2, 1),
+            end=datetime(2024, 3, 1),
+            ma_window=5,
+            min_days=1
+        )
+    
+    def test_stages_are_recorded(self):
+        recorder = StageRecorder()
+        self.scan(recorder=recorder)
+        stages: dict[str, dict] = {stage["name"]: stage for stage in recorder.stages}
+        
+        self.assertListEqual(
+            list1=list(stages.keys()),
+            list2=["constituents", "prices", "rs", "rs_ma", "filters"],
+            msg=f"Stages are wrong - {list(stages.keys())}"
+        )
+        self.assertEqual(
+            first=stages["prices"]["input_tickers"],
+            second=2,
+            msg="Tickers with the market ticker are fetched."
+        )
+        self.assertEqual(
+            first=stages["filters"]["output_tickers"],
+            second=1,
+            msg="UP passes the filters."
+        )
+        for stage in stages.values():
+            self.assertGreaterEqual(a=stage["seconds"], b=0, msg=f"No time of {stage['name']}.")
+            self.assertIn(member="peak_mb", container=stage, msg=f"No memory of {stage['name']}.")
+    
+    def test_run_record_is_written(self):
+        recorder = StageRecorder(
+            trace_memory=False,
+            profile_stage="rs",
+            profile_dir=self.temp_dir.name
+        )
+        self.scan(recorder=recorder)
+        run_log = Path(self.temp_dir.name) / "runs.jsonl"
+        recorder.write(path=run_log, command={"index": "TEST"})
+        recorder.write(path=run_log, command={"index": "TEST"})
+        records: list[dict] = [json.loads(line) for line in run_log.read_text().splitlines()]
+        
+        self.assertEqual(first=len(records), second=2, msg="A run is one json line.")
+        self.assertEqual(
+            first=records[0]["command"],
+            second={"index": "TEST"},
+            msg="Run info is not in the record."
+        )
+        self.assertNotIn(
+            member="peak_mb",
+            container=records[0]["stages"][0],
+            msg="Memory is traced while it is off."
+        )
+        self.assertEqual(first=len(recorder.profile_paths), second=1, msg="One stage is profiled.")
+        self.assertTrue(expr=recorder.profile_paths[0].exists(), msg="No profile dump.")
+    
+    def test_disabled_recorder(self):
+        recorder = StageRecorder(enabled=False)
+        result = self.scan(recorder=recorder)
+        run_log = Path(self.temp_dir.name) / "runs.jsonl"
+        recorder.write(path=run_log)
+        
+        self.assertListEqual(list1=result.tickers, list2=["UP"], msg="Scan result is changed.")
+        self.assertListEqual(list1=recorder.stages, list2=[], msg="Disabled recorder records.")
+        self.assertFalse(expr=run_log.exists(), msg="Disabled recorder writes a record.")
+
+
+class TestScreeningService(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        store = PriceStore(directory=self.temp_dir.name)
+        dates = pd.bdate_range("2024-01-01", "2024-03-29", name="Date")
+        trend = np.arange(len(dates), dtype=float)
+        for ticker, close_prices in {
+            "UP": 100 + 2 * trend,
+            "DOWN": 100 - 0.5 * trend,
+            "^SPX": 100 + trend
+        }.items():
+            store.write(
+                ticker=ticker,
+                ticker_data=DataFrame({"Close": close_prices}, index=dates),
+                period=("2024-01-01", "2024-03-30")
+            )
+        self.price_source = CountingPriceSource(store=store)
+        self.screener = Screener(
+            price_source=self.price_source,
+            get_tickers=lambda index_name, as_of: ["UP", "DOWN"],
+            market_tickers={"TEST": "^SPX"}
+        )
+        self.service = ScreeningService(screener=self.screener, cache_size=2)
+        self.scan_kwargs: dict = {
+            "index_name": "TEST",
+            "start": datetime(2024, 2, 1),
+            "end": datetime(2024, 3, 1),
+            "ma_window": 5,
+            "min_days": 3
+        }
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_results_are_cached(self):
+        result, is_cached = self.service.scan(**self.scan_kwargs)
+        cached_result, is_cached_again = self.service.scan(**self.scan_kwargs)
+        
+        self.assertFalse(expr=is_cached, msg="The first scan cannot be cached.")
+        self.assertTrue(expr=is_cached_again, msg="The repeated scan must be cached.")
+        self.assertIs(expr1=cached_result, expr2=result, msg="A cached result is not reused.")
+        self.assertListEqual(list1=result.tickers, list2=["UP"], msg="Scan result is wrong.")
+    
+    def test_least_recently_used_result_is_evicted(self):
+        for min_days in [1, 2, 1, 3]:
+            self.service.scan(**{**self.scan_kwargs, "min_days": min_days})
+        
+        self.assertListEqual(
+            list1=[key[4] for key in self.service.results],
+            list2=[1, 3],
+            msg="Min days 2 was used least recently."
+        )
+    
+    def test_refresh_appends_new_bars(self):
+        self.service.scan(**self.scan_kwargs)
+        self.service.scan(**{**self.scan_kwargs, "end": datetime(2024, 2, 15)})
+        changed_dates: dict = self.service.refresh(end=datetime(2024, 3, 30))
+        _, panel = self.screener.panels["TEST"]
+        
+        self.assertEqual(
+            first=changed_dates["TEST"],
+            second=pd.Timestamp("2024-02-29"),
+            msg="The last loaded bar must be refreshed."
+        )
+        self.assertTupleEqual(
+            tuple1=self.price_source.requests[-1][1],
+            tuple2=(pd.Timestamp("2024-02-29"), pd.Timestamp("2024-03-30")),
+            msg="Only new bars must be fetched."
+        )
+        self.assertEqual(
+            first=panel.dates[-1],
+            second=pd.Timestamp("2024-03-28"),
+            msg="New bars are not appended, 2024-03-29 is good friday."
+        )
+        self.assertTrue(expr=panel.dates.is_unique, msg="The refreshed bar is duplicated.")
+        self.assertListEqual(
+            list1=[key[2] for key in self.service.results],
+            list2=[pd.Timestamp("2024-02-15")],
+            msg="Only results covering refreshed dates must be dropped."
+        )
+    
+    def test_refresh_during_scan_drops_its_result(self):
+        self.service.scan(**{**self.scan_kwargs, "min_days": 1})
+        run_scan = self.screener.run_scan
+        refresh_thread = threading.Thread(
+            target=self.service.refresh,
+            kwargs={"end": datetime(2024, 3, 30)}
+        )
+        
+        def run_scan_then_refresh(**scan_kwargs) -> ScanResult:
+            result: ScanResult = run_scan(**scan_kwargs)
+            # The refresh waits for the scan, which computed its result on the old panel.
+            refresh_thread.start()
+            time.sleep(0.1)
+            return result
+        
+        self.screener.run_scan = run_scan_then_refresh
+        self.service.scan(**self.scan_kwargs)
+        refresh_thread.join()
+        
+        self.assertDictEqual(
+            d1=dict(self.service.results),
+            d2={},
+            msg="A result of the old panel outlives the refresh."
+        )
+    
+    def test_http_queries(self):
+        server = self.service.create_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            query: str = "/scan?index=TEST&start=2024-02-01&end=2024-03-01&ma_window=5&min_days=3"
+            with urlopen(base_url + query) as response:
+                body: dict = json.loads(response.read())
+            with urlopen(base_url + query) as response:
+                cached_body: dict = json.loads(response.read())
+            with self.assertRaises(HTTPError) as error:
+                urlopen(base_url + "/scan?index=TEST&start=2024-02-01")
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        self.assertListEqual(list1=body["tickers"], list2=["UP"], msg="Scan result is wrong.")
+        self.assertEqual(
+            first=body["metrics"][0]["Ticker"],
+            second="UP",
+            msg="Metrics of passed tickers are missing."
+        )
+        self.assertTrue(expr=cached_body["cached"], msg="The repeated query must be cached.")
+        self.assertEqual(first=error.exception.code, second=400, msg="An invalid query is accepted.")
+
+
+class TestBacktester(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=3)
+        dates = pd.bdate_range("2023-01-02", periods=200, name="Date")
+        tickers: list[str] = ["AAA", "BBB", "CCC", "DDD", "^SPX"]
+        self.df: DataFrame = DataFrame(
+            data=100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), len(tickers))), axis=0)),
+            index=dates,
+            columns=pd.MultiIndex.from_product([["Close"], tickers], names=["Price", "Ticker"])
+        )
+        self.backtester = Backtester(
+            market_ticker="^SPX",
+            ma_window=10,
+            period_days=30,
+            min_days=3
+        )
+    
+    def test_signals_match_filters(self):
+        signals: DataFrame = self.backtester.signals(stocks_data=self.df)
+        metrics = MetricsCalculator()
+        metrics_data: DataFrame = metrics.rs_ma_on_data(
+            stocks_data=metrics.rs_on_data(stocks_data=self.df, market_ticker="^SPX"),
+            ma_window=10
+        )
+        
+        for row_nr in [40, 120, 199]:
+            period_data: DataFrame = metrics_data.iloc[row_nr - 29:row_nr + 1]
+            mask: Series = FilterPipeline() \
+                .add_filter(name="rs_grown", mask_filter=DataFilter.rs_grown_mask) \
+                .add_filter(
+                    name="rs_crossed_ma",
+                    mask_filter=DataFilter.rs_crossed_ma_mask,
+                    days_rs_holds_above_ma=3
+                ) \
+                .get_mask(stocks_data=period_data)
+            self.assertDictEqual(
+                d1=signals.iloc[row_nr].to_dict(),
+                d2=mask.to_dict(),
+                msg=f"Signals differ from filters on row {row_nr}."
+            )
+    
+    def test_precomputed_metrics_are_reused(self):
+        metrics = MetricsCalculator()
+        metrics_data: DataFrame = metrics.rs_ma_on_data(
+            stocks_data=metrics.rs_on_data(stocks_data=self.df, market_ticker="^SPX"),
+            ma_window=10
+        )
+        signals: DataFrame = self.backtester.signals(stocks_data=self.df)
+        
+        for stocks_data in [metrics_data, PricePanel.from_price_data(price_data=metrics_data)]:
+            with mock.patch.object(MetricsCalculator, "rs_on_data") as rs_on_data, \
+                    mock.patch.object(MetricsCalculator, "rolling_means") as rolling_means:
+                metrics_signals: DataFrame = self.backtester.signals(stocks_data=stocks_data)
+            
+            self.assertFalse(
+                expr=rs_on_data.called or rolling_means.called,
+                msg=f"Metrics of {type(stocks_data).__name__} are recomputed."
+            )
+            self.assertTrue(
+                expr=metrics_signals.equals(signals),
+                msg=f"Signals of precomputed metrics of {type(stocks_data).__name__} differ."
+            )
+    
+    def test_run(self):
+        results: DataFrame = self.backtester.run(stocks_data=self.df, horizons=[5], step=5)
+        signals: DataFrame = self.backtester.signals(stocks_data=self.df)
         
+        row_nr: int = 100
+        selected: list[str] = list(signals.columns[signals.iloc[row_nr]])
+        close_data: DataFrame = self.df["Close"]
+        returns_must_be: Series = close_data.iloc[row_nr + 5] / close_data.iloc[row_nr] - 1
+        result = results[results["date"] == self.df.index[row_nr]].iloc[0]
         
+        self.assertEqual(
+            first=len(results),
+            second=40,
+            msg="Every fifth date must be backtested."
+        )
+        self.assertEqual(
+            first=result["basket_size"],
+            second=len(selected),
+            msg="Basket size is wrong."
+        )
+        self.assertAlmostEqual(
+            first=result["basket_return"],
+            second=returns_must_be[selected].mean(),
+            msg="Basket return is wrong."
+        )
+
+
+class TestScreenerState(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(seed=1)
+        dates = pd.bdate_range("2024-01-01", periods=120, name="Date")
+        tickers: list[str] = ["AAA", "BBB", "CCC", "^SPX"]
+        close_prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), len(tickers))), axis=0))
+        close_prices[50, 1] = np.nan
+        self.df: DataFrame = DataFrame(
+            data=close_prices,
+            index=dates,
+            columns=pd.MultiIndex.from_product([["Close"], tickers], names=["Price", "Ticker"])
+        )
+    
+    def test_daily_updates_match_full_history(self):
+        state = ScreenerState.from_data(
+            stocks_data=self.df.iloc[:70],
+            market_ticker="^SPX",
+            ma_window=10
+        )
+        state.apply_bars(close_prices=self.df["Close"])
+        full_state = ScreenerState.from_data(
+            stocks_data=self.df,
+            market_ticker="^SPX",
+            ma_window=10
+        )
+        
+        self.assertEqual(
+            first=state.last_date,
+            second=self.df.index[-1],
+            msg="The last date is not updated."
+        )
+        self.assertTrue(
+            expr=state.to_frame().equals(full_state.to_frame()),
+            msg="Daily updates differ from the full history state."
+        )
+    
+    def test_holiday_bar_is_skipped(self):
+        # 2024-05-27 is Memorial day, a bar on it comes e.g. from a foreign ticker.
+        holiday = pd.Timestamp("2024-05-27")
+        self.assertIn(member=holiday, container=self.df.index)
+        state = ScreenerState.from_data(
+            stocks_data=self.df.iloc[:70],
+            market_ticker="^SPX",
+            ma_window=10
+        )
+        state.apply_bars(close_prices=self.df["Close"])
+        scan_state = ScreenerState.from_data(
+            stocks_data=self.df.drop(index=holiday),
+            market_ticker="^SPX",
+            ma_window=10
+        )
         
+        self.assertEqual(
+            first=state.days_seen,
+            second=scan_state.days_seen,
+            msg="The holiday bar is applied."
+        )
+        self.assertTrue(
+            expr=state.to_frame().equals(scan_state.to_frame()),
+            msg="Daily updates differ from the scan without the holiday bar."
+        )
+    
+    def test_save_and_load(self):
+        state = ScreenerState.from_data(
+            stocks_data=self.df,
+            market_ticker="^SPX",
+            ma_window=10
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            state_path: Path = Path(temp_dir) / "state.npz"
+            state.save(path=state_path)
+            loaded_state = ScreenerState.load(path=state_path)
         
+        self.assertTrue(
+            expr=loaded_state.to_frame().equals(state.to_frame()),
+            msg="The loaded state differs from the saved one."
+        )
+        self.assertEqual(
+            first=loaded_state.last_date,
+            second=state.last_date,
+            msg="The last date is not saved."
+        )
+    
     
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,13 @@
 import unittest
-from robot.functions import get_page_tables
+from robot.functions import get_page_tables, extract_table, fetch_page_tables
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pandas as pd
+import asyncio
+import requests
+import tempfile
+import threading
+import time
+from io import BytesIO
 
 class TestGetPageTablesFunction(unittest.TestCase):
     
@@ -23,6 +30,187 @@ class TestGetPageTablesFunction(unittest.TestCase):
             expr2=pd.DataFrame,
             msg="The items in the list should be DataFrames."
         )
+
+
+
+class TestExtractTableFunction(unittest.TestCase):
+    
+    def setUp(self):
+        self.html: bytes = b"""
+            <html><body>
+            <table id="summary"><tr><th>Index</th></tr><tr><td>S&amp;P 500</td></tr></table>
+            <table id="constituents">
+                <tr><th>Symbol</th><th>Security</th><th>GICS Sector</th></tr>
+                <tr><td><a href="#">MMM</a></td><td>3M</td><td>Industrials</td></tr>
+                <tr><td><a href="#">BRK.B</a></td><td>Berkshire Hathaway</td><td>Financials</td></tr>
+            </table>
+            <table><tr><th>Date</th><th>Symbol</th></tr></table>
+            </body></html>
+        """
+    
+    def test_extract_table_by_header(self):
+        table = extract_table(
+            html_source=BytesIO(self.html),
+            header="Symbol",
+            columns=["Symbol", "GICS Sector"]
+        )
+        
+        self.assertListEqual(
+            list1=list(table.columns),
+            list2=["Symbol", "GICS Sector"],
+            msg="Only requested columns must be extracted."
+        )
+        self.assertListEqual(
+            list1=table["Symbol"].to_list(),
+            list2=["MMM", "BRK.B"],
+            msg="Tickers are extracted wrongly."
+        )
+    
+    def test_extract_table_by_nr_and_id(self):
+        table_by_nr = extract_table(html_source=BytesIO(self.html), table_nr=1)
+        table_by_id = extract_table(html_source=BytesIO(self.html), table_id="constituents")
         
+        self.assertTrue(
+            expr=table_by_nr.equals(table_by_id),
+            msg="The same table must be selected by nr and by id."
+        )
+        with self.assertRaises(ValueError):
+            extract_table(html_source=BytesIO(self.html), header="Ticker")
+
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in of wiki pages. Pages support ETag and can be slow.
+    """
+    
+    pages: dict[str, bytes] = {}
+    delay: float = 0.0
+    lock = threading.Lock()
+    active_requests: int = 0
+    max_active_requests: int = 0
+    statuses: list[tuple[str, int]] = []
+    
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active_requests += 1
+            cls.max_active_requests = max(cls.max_active_requests, cls.active_requests)
+        try:
+            time.sleep(cls.delay)
+            body: bytes = cls.pages[self.path]
+            etag: str = f'"{hash(body)}"'
+            status: int = 304 if self.headers.get("If-None-Match") == etag else 200
+            cls.statuses.append((self.path, status))
+            
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            if status == 200:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status == 200:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with cls.lock:
+                cls.active_requests -= 1
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFetchPageTablesFunction(unittest.TestCase):
+    
+    def setUp(self):
+        PageHandler.pages = {
+            f"/index_{page_nr}": (
+                "<html><body><table><tr><th>Symbol</th><th>Sector</th></tr>"
+                + "".join(
+                    f"<tr><td>T{page_nr}{row}</td><td>Tech</td></tr>" for row in range(3)
+                )
+                + "</table></body></html>"
+            ).encode()
+            for page_nr in range(4)
+        }
+        PageHandler.delay = 0.0
+        PageHandler.active_requests = 0
+        PageHandler.max_active_requests = 0
+        PageHandler.statuses = []
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+    
+    def fetch(self, page_paths: list[str], **fetch_kwargs) -> dict:
+        return asyncio.run(fetch_page_tables(
+            pages={
+                page_path: {
+                    "url": self.base_url + page_path,
+                    "header": "Symbol",
+                    "columns": ["Symbol"]
+                }
+                for page_path in page_paths
+            },
+            cache_dir=self.temp_dir.name,
+            **fetch_kwargs
+        ))
+    
+    def test_pages_are_fetched_concurrently(self):
+        PageHandler.delay = 0.2
+        tables: dict = self.fetch(page_paths=list(PageHandler.pages), max_concurrency=2)
+        
+        self.assertListEqual(
+            list1=list(tables["/index_1"]["Symbol"]),
+            list2=["T10", "T11", "T12"],
+            msg="The table is extracted wrong."
+        )
+        self.assertEqual(
+            first=PageHandler.max_active_requests,
+            second=2,
+            msg="Pages must be fetched concurrently, at most 2 at once."
+        )
+    
+    def test_unchanged_pages_are_not_downloaded(self):
+        first_tables: dict = self.fetch(page_paths=["/index_0", "/index_1"])
+        PageHandler.pages["/index_1"] = PageHandler.pages["/index_1"].replace(b"T12", b"NEW")
+        second_tables: dict = self.fetch(page_paths=["/index_0", "/index_1"])
+        
+        self.assertCountEqual(
+            first=PageHandler.statuses[2:],
+            second=[("/index_0", 304), ("/index_1", 200)],
+            msg="Only the changed page must be downloaded."
+        )
+        pd.testing.assert_frame_equal(
+            left=second_tables["/index_0"],
+            right=first_tables["/index_0"],
+            obj="Cached table"
+        )
+        self.assertListEqual(
+            list1=list(second_tables["/index_1"]["Symbol"]),
+            list2=["T10", "T11", "NEW"],
+            msg="The changed page must be parsed again."
+        )
+    
+    def test_hung_page_times_out(self):
+        PageHandler.delay = 1.0
+        started: float = time.perf_counter()
+        tables: dict = self.fetch(page_paths=["/index_0"], timeout=(1.0, 0.2))
+        
+        self.assertIsInstance(
+            obj=tables["/index_0"],
+            cls=requests.exceptions.Timeout,
+            msg="A hung page must fail with a timeout."
+        )
+        self.assertLess(a=time.perf_counter() - started, b=1.0, msg="The timeout is not applied.")
+    
+    
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,254 @@
+import unittest
+from pathlib import Path
+import os
+import subprocess
+import sys
+import tempfile
+
+ROBOT_DIR: Path = Path(__file__).resolve().parents[1] / "robot"
+# Cumulative import time of the cli module without classes and functions.
+IMPORT_BUDGET_SECONDS: float = 0.25
+NETWORK_MODULES: list[str] = ["yfinance", "lxml", "requests", "urllib3", "curl_cffi"]
+
+
+def run_python(args: list[str], cwd: str) -> dict[str, float]:
+    """
+    Function runs python with robot modules importable and returns
+    cumulative import seconds of every imported module.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(ROBOT_DIR)},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    import_seconds: dict[str, float] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module_name = line.split("|")
+        import_seconds[module_name.strip()] = int(cumulative_us) / 1e6
+    
+    return import_seconds
+
+
+class TestImports(unittest.TestCase):
+    
+    def setUp(self):
+        # Logs and stores of the cli are created in a temporary working directory.
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_help_imports_no_heavy_modules(self):
+        import_seconds: dict[str, float] = run_python(
+            args=[str(ROBOT_DIR / "implementation.py"), "--help"],
+            cwd=self.temp_dir.name
+        )
+        
+        for module_name in ["pandas", "numpy", *NETWORK_MODULES]:
+            self.assertNotIn(
+                member=module_name,
+                container=import_seconds,
+                msg=f"Help output must not import {module_name}."
+            )
+    
+    def test_cache_only_run_imports_no_network_modules(self):
+        import_seconds: dict[str, float] = run_python(
+            args=["-c", "import implementation; implementation.build_screener()"],
+            cwd=self.temp_dir.name
+        )
+        
+        self.assertIn(member="pandas", container=import_seconds, msg="Classes are not imported.")
+        for module_name in NETWORK_MODULES:
+            self.assertNotIn(
+                member=module_name,
+                container=import_seconds,
+                msg=f"{module_name} must be imported only on a network fetch."
+            )
+    
+    def test_import_time_budget(self):
+        import_seconds: dict[str, float] = run_python(
+            args=["-c", "import implementation"],
+            cwd=self.temp_dir.name
+        )
+        
+        self.assertLess(
+            a=import_seconds["implementation"],
+            b=IMPORT_BUDGET_SECONDS,
+            msg=f"Import of the cli takes {import_seconds['implementation']:.3f}s."
+        )
+
+
+class TestCli(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_single_scan_options_are_rejected(self):
+        scan_args: list[str] = [
+            str(ROBOT_DIR / "implementation.py"), "--start", "2024-01-01", "--end", "2024-06-01"
+        ]
+        for command_args in [
+            ["--index", "S&P 500", "NASDAQ 100", "--min-days", "5", "--group", "sector"],
+            ["--index", "S&P 500", "--min-days", "5", "10", "--ma-kind", "ema"],
+            ["--index", "S&P 500", "--min-days", "5", "--panel-dir", "panel", "--confirm", "weekly", "10", "2"],
+            ["--index", "S&P 500", "--min-days", "5", "--state", "state.npz", "--crossed-up-within", "3"]
+        ]:
+            completed = subprocess.run(
+                [sys.executable, *scan_args, *command_args],
+                cwd=self.temp_dir.name,
+                env={**os.environ, "PYTHONPATH": str(ROBOT_DIR)},
+                capture_output=True,
+                text=True
+            )
+            
+            self.assertEqual(
+                first=completed.returncode,
+                second=2,
+                msg=f"{command_args} is not rejected."
+            )
+            self.assertIn(
+                member="apply to a single scan only",
+                container=completed.stderr,
+                msg=f"{command_args} is rejected with a wrong error."
+            )
+    
+    def test_history_is_filtered_by_given_options_only(self):
+        for command_args, expected_ma_window in [
+            (["--history", "30"], "None"),
+            (["--history", "30", "--ma-window", "50"], "50")
+        ]:
+            completed = subprocess.run(
+                [
+                    sys.executable, "-c",
+                    "import sys, implementation\n"
+                    "from unittest import mock\n"
+                    "with mock.patch.object(implementation, 'print_history') as print_history:\n"
+                    "    implementation.cli(['--index', 'S&P 500', *sys.argv[1:]])\n"
+                    "print(print_history.call_args.kwargs['ma_window'])",
+                    *command_args
+                ],
+                cwd=self.temp_dir.name,
+                env={**os.environ, "PYTHONPATH": str(ROBOT_DIR)},
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            
+            self.assertEqual(
+                first=completed.stdout.strip(),
+                second=expected_ma_window,
+                msg=f"History of {command_args} is selected by a wrong ma window."
+            )
+
+
+
+class TestUpdateState(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_new_state_is_built_from_panel(self):
+        # A missing state is built from the PricePanel of Screener.load_panel.
+        completed = subprocess.run(
+            [
+                sys.executable, "-c",
+                "from datetime import date\n"
+                "import numpy as np, pandas as pd\n"
+                "import implementation\n"
+                "from classes import LocalPriceSource, PriceStore, Screener, ScreenerState\n"
+                "store = PriceStore(directory='prices')\n"
+                "dates = pd.date_range(end=pd.Timestamp(date.today()), periods=500, freq='D', name='Date')\n"
+                "rng = np.random.default_rng(seed=1)\n"
+                "for ticker in ['AAA', 'BBB', '^SPX']:\n"
+                "    close_prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))\n"
+                "    store.write(ticker=ticker, ticker_data=pd.DataFrame({'Close': close_prices}, index=dates),\n"
+                "        period=(dates[0], dates[-1] + pd.Timedelta(days=1)))\n"
+                "screener = Screener(price_source=LocalPriceSource(store=store),\n"
+                "    get_tickers=lambda index_name, as_of: ['AAA', 'BBB'], market_tickers={'S&P 500': '^SPX'})\n"
+                "state = implementation.update_state(index='S&P 500', state_path='state.npz', ma_window=10,\n"
+                "    screener=screener)\n"
+                "panel_state = ScreenerState.from_data(stocks_data=screener.panels['S&P 500'][1].to_frame(),\n"
+                "    market_ticker='^SPX', ma_window=10)\n"
+                "print(state.to_frame().equals(panel_state.to_frame()), bool(state.calendar.is_session([state.last_date])[0]))"
+            ],
+            cwd=self.temp_dir.name,
+            env={**os.environ, "PYTHONPATH": str(ROBOT_DIR)},
+            capture_output=True,
+            text=True
+        )
+        
+        self.assertEqual(
+            first=completed.returncode,
+            second=0,
+            msg=f"The state is not built from a panel.\n{completed.stderr}"
+        )
+        self.assertEqual(
+            first=completed.stdout.split(),
+            second=["True", "True"],
+            msg="The state of a panel differs from the state of its frame."
+        )
+
+
+
+class TestGetIndexGroups(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_groups_of_tickers_only_snapshot(self):
+        # Snapshots taken before groups were parsed keep tickers only.
+        for snapshot_age, as_of_age in [(30, 10), (3, 0)]:
+            run_dir: Path = Path(self.temp_dir.name) / str(snapshot_age)
+            run_dir.mkdir()
+            completed = subprocess.run(
+                [
+                    sys.executable, "-c",
+                    "import sys\n"
+                    "from datetime import date, datetime, timedelta\n"
+                    "from unittest import mock\n"
+                    "import pandas as pd\n"
+                    "import config, functions, implementation\n"
+                    "from classes import ConstituentsStore\n"
+                    "snapshot_age, as_of_age = int(sys.argv[1]), int(sys.argv[2])\n"
+                    "ConstituentsStore(directory=config.CONSTITUENTS_STORE_DIR).save(index_name='S&P 500',\n"
+                    "    constituents=pd.DataFrame({'Symbol': ['AAA', 'BBB']}),\n"
+                    "    snapshot_date=date.today() - timedelta(days=snapshot_age))\n"
+                    "table = pd.DataFrame({'Symbol': ['AAA', 'BBB'], 'GICS Sector': ['Energy', 'Utilities'],\n"
+                    "    'GICS Sub-Industry': ['Oil', 'Water']})\n"
+                    "with mock.patch.object(functions, 'get_page_table', return_value=table) as get_page_table:\n"
+                    "    groups = implementation.get_index_groups(index_name='S&P 500',\n"
+                    "        as_of=datetime.today() - timedelta(days=as_of_age))\n"
+                    "print(get_page_table.call_count, groups['AAA'], groups['BBB'])",
+                    str(snapshot_age),
+                    str(as_of_age)
+                ],
+                cwd=run_dir,
+                env={**os.environ, "PYTHONPATH": str(ROBOT_DIR)},
+                capture_output=True,
+                text=True
+            )
+            
+            self.assertEqual(
+                first=completed.returncode,
+                second=0,
+                msg=f"Groups of a {snapshot_age} days old snapshot fail.\n{completed.stderr}"
+            )
+            self.assertEqual(
+                first=completed.stdout.split(),
+                second=["1", "Energy", "Utilities"],
+                msg=f"Groups of a {snapshot_age} days old snapshot are wrong or fetched again."
+            )